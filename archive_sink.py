@@ -0,0 +1,140 @@
+from abc import ABC, abstractmethod
+from enum import StrEnum
+from io import BytesIO
+import ntpath
+import posixpath
+from types import TracebackType
+from typing import TYPE_CHECKING, BinaryIO, override
+
+# tarfile and zipfile take longer to import than the rest of the CLI, so only the sink that is used loads its module
+if TYPE_CHECKING:
+    import gzip
+    import tarfile
+    import zipfile
+
+# Every member gets the same timestamp and permissions, so the same input always makes the same archive.
+# Zip timestamps cannot go back further than 1980
+ARCHIVE_DATE_TIME: tuple[int, int, int, int, int, int] = (1980, 1, 1, 0, 0, 0)
+ARCHIVE_MTIME: int = 315532800
+ARCHIVE_FILE_MODE: int = 0o644
+
+
+class ArchiveFormat(StrEnum):
+    TAR = "tar"
+    TAR_GZ = "tar.gz"
+    ZIP = "zip"
+
+
+def guess_archive_format(path: str) -> ArchiveFormat:
+    if path.endswith(".zip"):
+        return ArchiveFormat.ZIP
+    elif path.endswith(".tar.gz") or path.endswith(".tgz"):
+        return ArchiveFormat.TAR_GZ
+    elif path.endswith(".tar"):
+        return ArchiveFormat.TAR
+    raise ValueError(f"Cannot tell the archive format of {path}. Expected a .zip, .tar, .tar.gz or .tgz file")
+
+
+def check_member_name(name: str) -> str:
+    # Member names are always relative posix paths, whatever the platform. The CLI also uses this for
+    # output file names, so names with a drive like C: are rejected as well
+    name = name.replace("\\", "/")
+    normalized = posixpath.normpath(name)
+    if name.startswith("/") or ntpath.splitdrive(name)[0] or normalized == "." or normalized == ".." or normalized.startswith("../"):
+        raise ValueError(f"Cannot add {name!r} to an archive. Expected a relative path inside the archive")
+    return normalized
+
+
+class ArchiveSink(ABC):
+    # Appends members to an archive that is written front to back, so stream can be a pipe or socket.
+    # Closing the sink finishes the archive but leaves stream open
+    stream: BinaryIO
+    member_count: int
+
+    def __init__(self, stream: BinaryIO):
+        self.stream = stream
+        self.member_count = 0
+
+    def add(self, name: str, data: bytes) -> None:
+        self._add(check_member_name(name), data)
+        self.member_count += 1
+
+    @abstractmethod
+    def _add(self, name: str, data: bytes) -> None:
+        pass
+
+    @abstractmethod
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "ArchiveSink":
+        return self
+
+    def __exit__(self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None) -> None:
+        self.close()
+
+
+class TarSink(ArchiveSink):
+    _tar: "tarfile.TarFile"
+    _gzip: "gzip.GzipFile | None"
+
+    def __init__(self, stream: BinaryIO, compress: bool = False):
+        import gzip
+        import tarfile
+
+        super().__init__(stream)
+        # gzip compresses the whole stream instead of each member. tarfile's own "w|gz" mode
+        # puts the current time and the file name in the gzip header, so the gzip layer is added here without them
+        self._gzip = gzip.GzipFile(filename="", fileobj=stream, mode="wb", mtime=0) if compress else None
+        # The "|" mode never seeks
+        self._tar = tarfile.open(fileobj=self._gzip or stream, mode="w|", format=tarfile.PAX_FORMAT)
+
+    @override
+    def _add(self, name: str, data: bytes) -> None:
+        info = self._tar.tarinfo(name)
+        info.size = len(data)
+        info.mtime = ARCHIVE_MTIME
+        info.mode = ARCHIVE_FILE_MODE
+        self._tar.addfile(info, BytesIO(data))
+
+    @override
+    def close(self) -> None:
+        self._tar.close()
+        if self._gzip is not None:
+            self._gzip.close()
+
+
+class ZipSink(ArchiveSink):
+    _zip: "zipfile.ZipFile"
+    _compress_type: int
+
+    def __init__(self, stream: BinaryIO, compress: bool = True):
+        import zipfile
+
+        super().__init__(stream)
+        # Stored members skip deflating data that is already compressed, like PNGs
+        self._compress_type = zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED
+        self._zip = zipfile.ZipFile(stream, mode="w", compression=self._compress_type)
+
+    @override
+    def _add(self, name: str, data: bytes) -> None:
+        import zipfile
+
+        info = zipfile.ZipInfo(name, date_time=ARCHIVE_DATE_TIME)
+        info.compress_type = self._compress_type
+        info.external_attr = ARCHIVE_FILE_MODE << 16
+        self._zip.writestr(info, data)
+
+    @override
+    def close(self) -> None:
+        self._zip.close()
+
+
+def open_archive_sink(stream: BinaryIO, archive_format: ArchiveFormat, compress: bool = True) -> ArchiveSink:
+    if archive_format == ArchiveFormat.ZIP:
+        return ZipSink(stream, compress=compress)
+    elif archive_format == ArchiveFormat.TAR:
+        return TarSink(stream, compress=False)
+    elif archive_format == ArchiveFormat.TAR_GZ:
+        return TarSink(stream, compress=True)
+    raise ValueError(f"Cannot write archive format {archive_format}")
@@ -0,0 +1,182 @@
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from functools import partial
+from itertools import islice
+from time import perf_counter
+from typing import TYPE_CHECKING, TypeVar, override
+
+from encoding import get_codeword_block_information
+from error_correction import ErrorCorrection
+from mask_pattern import get_mask_bitplanes
+from qrcode import SimpleQRCode
+from reed_solomon import generator_polynomials
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+    from symbol_cache import SymbolStore
+
+T = TypeVar("T")
+
+# Memory for the symbols and renders of one batch, so repeated payloads are only generated and rendered
+# once. Least recently used payloads are dropped beyond it, so inputs larger than memory still stream
+BATCH_CACHE_BYTES: int = 16 * 1024 * 1024
+
+# The batch cache of a worker process, set up by _start_worker for each pool
+_worker_symbol_cache: "SymbolStore | None" = None
+
+
+class BatchStatistics:
+    code_count: int
+    elapsed: float
+
+    def __init__(self):
+        self.code_count = 0
+        self.elapsed = 0.0
+
+    @property
+    def codes_per_second(self) -> float:
+        if self.elapsed == 0:
+            return 0.0
+        return self.code_count / self.elapsed
+
+    @override
+    def __str__(self) -> str:
+        return f"{self.code_count} codes in {self.elapsed:.3f}s ({self.codes_per_second:.1f} codes/s)"
+
+
+def warm_caches(version: int | None, error_correction_level: ErrorCorrection | None) -> None:
+    # Builds everything that is shared between codes of one version up front, once per process.
+    # With an automatic version the caches fill up as versions are first used instead
+    if version is None or error_correction_level is None:
+        return
+    generator_polynomials.preload([get_codeword_block_information(version, error_correction_level).ec_codewords_per_block])
+    _ = get_mask_bitplanes((4 * version) + 17)
+
+
+def make_batch_cache() -> "SymbolStore":
+    from symbol_cache import SymbolCache
+
+    return SymbolCache(max_bytes=BATCH_CACHE_BYTES)
+
+
+def _start_worker(version: int | None, error_correction_level: ErrorCorrection | None) -> None:
+    global _worker_symbol_cache
+    warm_caches(version, error_correction_level)
+    _worker_symbol_cache = make_batch_cache()
+
+
+def generate_one(
+    payload: str,
+    version: int | None,
+    error_correction_level: ErrorCorrection | None,
+    mask_pattern: int | None = None,
+    symbol_cache: "SymbolStore | None" = None,
+) -> SimpleQRCode:
+    qrcode = SimpleQRCode(version=version, error_correction_level=error_correction_level, mask_pattern=mask_pattern, symbol_cache=symbol_cache)
+    qrcode.add_data(payload)
+    qrcode.generate()
+    return qrcode
+
+
+def _keep_code(qrcode: SimpleQRCode) -> SimpleQRCode:
+    return qrcode
+
+
+def _render_chunk(
+    payloads: list[str],
+    render: Callable[[SimpleQRCode], T],
+    version: int | None,
+    error_correction_level: ErrorCorrection | None,
+    mask_pattern: int | None,
+    symbol_cache: "SymbolStore | None" = None,
+    batch_cache: "SymbolStore | None" = None,
+) -> list[T]:
+    # Every payload gets its own code object. Repeated payloads are restored from the cache instead of generated again
+    cache = symbol_cache
+    if cache is None:
+        cache = batch_cache if batch_cache is not None else _worker_symbol_cache
+    results: list[T] = []
+    for payload in payloads:
+        qrcode = generate_one(payload, version, error_correction_level, mask_pattern, cache)
+        results.append(render(qrcode))
+        # The batch cache only lives as long as the batch, and cannot be sent back from a worker process
+        qrcode.symbol_cache = symbol_cache
+    return results
+
+
+def _chunked(payloads: Iterable[str], chunk_size: int) -> Iterator[list[str]]:
+    iterator = iter(payloads)
+    while chunk := list(islice(iterator, chunk_size)):
+        yield chunk
+
+
+def generate_many(
+    payloads: Iterable[str],
+    version: int | None,
+    error_correction_level: ErrorCorrection | None,
+    mask_pattern: int | None = None,
+    processes: int | None = None,
+    chunk_size: int = 64,
+    statistics: BatchStatistics | None = None,
+    symbol_cache: "SymbolStore | None" = None,
+) -> Iterator[SimpleQRCode]:
+    yield from render_many(payloads, _keep_code, version, error_correction_level, mask_pattern, processes, chunk_size, statistics, symbol_cache)
+
+
+def render_many(
+    payloads: Iterable[str],
+    render: Callable[[SimpleQRCode], T],
+    version: int | None,
+    error_correction_level: ErrorCorrection | None,
+    mask_pattern: int | None = None,
+    processes: int | None = None,
+    chunk_size: int = 64,
+    statistics: BatchStatistics | None = None,
+    symbol_cache: "SymbolStore | None" = None,
+) -> Iterator[T]:
+    # Yields render(code) for every payload, in the same order as payloads. Payloads are read lazily, so the
+    # input can be larger than memory. With processes > 1, chunks of chunk_size payloads are
+    # handed to a process pool, keeping at most two chunks per process in flight. render runs in the
+    # worker processes too, so it has to be picklable (a module level function or a partial of one).
+    # symbol_cache is used by every code and its renders, and has to be picklable too with processes > 1.
+    # A DiskSymbolCache is, and every process then reads and writes the same file. Without one, repeated
+    # payloads are generated once per batch, or once per worker process with processes > 1
+    if chunk_size < 1:
+        raise ValueError(f"Cannot generate in chunks of {chunk_size}. Expected a positive chunk size")
+
+    start = perf_counter()
+    render_chunk = partial(
+        _render_chunk,
+        render=render,
+        version=version,
+        error_correction_level=error_correction_level,
+        mask_pattern=mask_pattern,
+        symbol_cache=symbol_cache,
+    )
+
+    def record(results: list[T]) -> list[T]:
+        if statistics is not None:
+            statistics.code_count += len(results)
+            statistics.elapsed = perf_counter() - start
+        return results
+
+    if processes is None or processes <= 1:
+        warm_caches(version, error_correction_level)
+        if symbol_cache is None:
+            render_chunk = partial(render_chunk, batch_cache=make_batch_cache())
+        for chunk in _chunked(payloads, chunk_size):
+            yield from record(render_chunk(chunk))
+        return
+
+    # Loading multiprocessing takes longer than a small single process batch, so only pools pay for it
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=processes, initializer=_start_worker, initargs=(version, error_correction_level)) as executor:
+        pending: deque[Future[list[T]]] = deque()
+        for chunk in _chunked(payloads, chunk_size):
+            pending.append(executor.submit(render_chunk, chunk))
+            if len(pending) >= 2 * processes:
+                yield from record(pending.popleft().result())
+        while pending:
+            yield from record(pending.popleft().result())
@@ -0,0 +1,22 @@
+# Run from the repository root with `python -m benchmarks.bench_codeword_block_information`
+from timeit import repeat
+
+from encoding import get_codeword_block_information
+from error_correction import ErrorCorrection
+
+
+def main() -> None:
+    keys = [(version, ec_level) for version in range(1, 41) for ec_level in ErrorCorrection]
+    number = 200
+
+    def lookup_all() -> None:
+        for version, ec_level in keys:
+            _ = get_codeword_block_information(version, ec_level)
+
+    best = min(repeat(lookup_all, number=number, repeat=5))
+    per_call_ns = best / (number * len(keys)) * 1e9
+    print(f"get_codeword_block_information: {per_call_ns:.1f} ns per call ({len(keys) * number} calls, best of 5)")
+
+
+if __name__ == "__main__":
+    main()
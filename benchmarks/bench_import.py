@@ -0,0 +1,183 @@
+# Run from the repository root with `python -m benchmarks.bench_import`
+#
+# Imports each module in a fresh interpreter under `python -X importtime` and reports how long the
+# import took, with the slowest modules it pulled in. Bytecode is compiled into a temporary
+# pycache first, so the numbers are a cold start with a warm disk, like a deployed CLI or worker.
+#
+# --budget exits with 1 if a module takes longer than IMPORT_BUDGETS or loads anything in
+# FORBIDDEN_IMPORTS, which are only needed by optional features and should stay lazily imported.
+# Timings depend on the machine, so the test suite only checks FORBIDDEN_IMPORTS
+from argparse import ArgumentParser
+import os
+import subprocess
+import sys
+import tempfile
+
+# Milliseconds, with headroom for slower machines. Modules the interpreter loaded at startup (like
+# typing, when a sitecustomize imports it) are not counted, so the same code measures differently
+# between environments. Compare numbers from the same machine and Python version only
+IMPORT_BUDGETS: dict[str, float] = {
+    "qrcode": 60.0,
+    "main": 100.0,
+}
+
+FORBIDDEN_IMPORTS: dict[str, tuple[str, ...]] = {
+    "qrcode": (
+        "turtle",
+        "tkinter",
+        "concurrent.futures",
+        "logging",
+        "tracemalloc",
+        "hashlib",
+        "json",
+        "zlib",
+        "png_writer",
+        "vector_renderer",
+        "text_renderer",
+        "symbol_cache",
+    ),
+    "main": (
+        "turtle",
+        "tkinter",
+        "multiprocessing",
+        "concurrent.futures.process",
+        "tarfile",
+        "zipfile",
+        "sqlite3",
+    ),
+}
+
+REPOSITORY_ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ImportRecord:
+    # One line of -X importtime output. Times are in microseconds, cumulative includes everything it imported
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+    def __init__(self, name: str, self_us: int, cumulative_us: int, depth: int):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.depth = depth
+
+
+def parse_importtime(output: str) -> list[ImportRecord]:
+    # Lines look like "import time:       125 |        862 |     encoding", nested imports indented two spaces deeper
+    records: list[ImportRecord] = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_column, cumulative_column, name_column = line.removeprefix("import time:").split("|")
+        if not self_column.strip().isdigit():
+            # The header line
+            continue
+        name = name_column.rstrip()
+        depth = (len(name) - len(name.lstrip(" ")) - 1) // 2
+        records.append(ImportRecord(name.strip(), int(self_column), int(cumulative_column), depth))
+    return records
+
+
+def make_environment(pycache_folder: str) -> dict[str, str]:
+    environment = dict(os.environ)
+    environment.pop("PYTHONDONTWRITEBYTECODE", None)
+    environment["PYTHONPYCACHEPREFIX"] = pycache_folder
+    # The child finds the repository modules the same way this process does
+    environment["PYTHONPATH"] = os.pathsep.join([REPOSITORY_ROOT, *(path for path in sys.path if path)])
+    return environment
+
+
+def run_import(module: str, environment: dict[str, str]) -> list[ImportRecord]:
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=REPOSITORY_ROOT,
+        env=environment,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{completed.stderr}")
+    return parse_importtime(completed.stderr)
+
+
+def measure_import(module: str, pycache_folder: str, repeat: int = 5) -> tuple[float, list[ImportRecord]]:
+    # Returns the best import time in milliseconds and the records of that run
+    environment = make_environment(pycache_folder)
+    # Writes the bytecode, so the timed runs do not compile anything
+    run_import(module, environment)
+    best: tuple[float, list[ImportRecord]] | None = None
+    for _ in range(repeat):
+        records = run_import(module, environment)
+        milliseconds = next(record.cumulative_us for record in reversed(records) if record.name == module) / 1e3
+        if best is None or milliseconds < best[0]:
+            best = (milliseconds, records)
+    if best is None:
+        raise ValueError(f"Cannot import {module} {repeat} times. Expected a positive repeat")
+    return best
+
+
+def imported_modules(records: list[ImportRecord], module: str) -> set[str]:
+    # Everything importing module loaded that was not loaded by interpreter startup already
+    names: set[str] = set()
+    collecting = False
+    for record in reversed(records):
+        if record.name == module and record.depth == 0:
+            collecting = True
+            names.add(record.name)
+        elif collecting and record.depth == 0:
+            break
+        elif collecting:
+            names.add(record.name)
+    return names
+
+
+def check_forbidden_imports(module: str, records: list[ImportRecord]) -> list[str]:
+    loaded = imported_modules(records, module)
+    return [
+        f"import {module} loads {forbidden}, which should only be imported when it is used"
+        for forbidden in FORBIDDEN_IMPORTS.get(module, ())
+        if forbidden in loaded
+    ]
+
+
+def check_budget(module: str, milliseconds: float, records: list[ImportRecord]) -> list[str]:
+    problems: list[str] = []
+    budget = IMPORT_BUDGETS.get(module)
+    if budget is not None and milliseconds > budget:
+        problems.append(f"import {module} took {milliseconds:.1f} ms, over its {budget:.1f} ms budget")
+    return problems + check_forbidden_imports(module, records)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = ArgumentParser(description="Time importing the package modules in a fresh interpreter")
+    parser.add_argument("--modules", default=",".join(IMPORT_BUDGETS), help="comma separated (default: qrcode,main)")
+    parser.add_argument("--repeat", type=int, default=5, help="imports per module, the fastest one is reported")
+    parser.add_argument("--top", type=int, default=10, help="slowest imported modules to list per module")
+    parser.add_argument("--budget", action="store_true", help="exit with 1 if a module is over budget or loads a forbidden module")
+    arguments = parser.parse_args(argv)
+
+    problems: list[str] = []
+    with tempfile.TemporaryDirectory() as pycache_folder:
+        for module in arguments.modules.split(","):
+            milliseconds, records = measure_import(module, pycache_folder, arguments.repeat)
+            budget = IMPORT_BUDGETS.get(module)
+            print(f"import {module}: {milliseconds:.2f} ms" + (f" (budget {budget:.1f} ms)" if budget is not None else ""))
+
+            loaded = imported_modules(records, module)
+            slowest = sorted((record for record in records if record.name in loaded and record.name != module), key=lambda record: record.self_us, reverse=True)
+            for record in slowest[: arguments.top]:
+                print(f"  {record.name:<32}{record.self_us / 1e3:>8.2f} ms self{record.cumulative_us / 1e3:>10.2f} ms cumulative")
+            problems.extend(check_budget(module, milliseconds, records))
+
+    for problem in problems:
+        print(f"budget: {problem}", file=sys.stderr)
+    if arguments.budget and problems:
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
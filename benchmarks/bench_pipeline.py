@@ -0,0 +1,243 @@
+# Run from the repository root with `python -m benchmarks.bench_pipeline`
+#
+# Times every stage of making a code, for every version and error correction level:
+#   encode.<mode>  encode_to_buffer with a payload that fills the version in that mode
+#   reed_solomon   error correction codewords for every block
+#   placement      QRCodeDrawer.push_bits of a full data region onto the function patterns
+#   mask_search    select_best_mask over all 8 masks
+#   render.png     write_png at 4 pixels per module
+#   render.svg     write_svg
+#   generate       SimpleQRCode.generate end to end, the codes/second number
+#
+# --json writes the results for diffing between releases, and --compare checks them against an
+# earlier --json file, exiting with 1 if any stage got slower than the threshold
+from argparse import ArgumentParser
+from collections.abc import Callable
+from functools import partial
+from io import BytesIO
+import json
+import platform
+import random
+from statistics import median
+import sys
+from time import perf_counter
+import tracemalloc
+
+from bit_buffer import BitBuffer
+from encoding import (
+    ALPHANUMERIC_CHARACTERS,
+    encode_to_buffer,
+    get_character_count_indicator_length,
+    get_codeword_block_information,
+    get_data_bit_capacity,
+)
+from error_correction import ErrorCorrection
+from mask_selection import select_best_mask
+from mode import Mode
+from png_writer import write_png
+from qrcode import SimpleQRCode
+from qrcode_drawer import QRCodeDrawer, get_data_module_positions
+from reed_solomon import generate_error_correction_bytes
+from vector_renderer import write_svg
+
+ERROR_CORRECTION_LEVELS: dict[str, ErrorCorrection] = {
+    "L": ErrorCorrection.LOW,
+    "M": ErrorCorrection.MEDIUM,
+    "Q": ErrorCorrection.QUARTILE,
+    "H": ErrorCorrection.HIGH,
+}
+
+# Bits per character for filling a version in each mode, numeric and alphanumeric rounded up
+MODE_CHARACTER_BITS: dict[Mode, float] = {
+    Mode.NUMERIC: 10 / 3,
+    Mode.ALPHANUMERIC: 11 / 2,
+    Mode.BINARY: 8,
+    Mode.KANJI: 13,
+}
+KANJI_CHARACTERS: str = "茗荷漢字点"
+
+# A benchmark result is one stage of one version and error correction level
+Result = dict[str, str | int | float]
+
+
+def make_payload(mode: Mode, version: int, error_correction_level: ErrorCorrection, generator: random.Random) -> str:
+    data_bits = get_data_bit_capacity(version, error_correction_level) - 4 - get_character_count_indicator_length(mode, version)
+    length = max(1, int(data_bits / MODE_CHARACTER_BITS[mode]) - 1)
+    if mode == Mode.NUMERIC:
+        alphabet = "0123456789"
+    elif mode == Mode.ALPHANUMERIC:
+        alphabet = ALPHANUMERIC_CHARACTERS
+    elif mode == Mode.KANJI:
+        alphabet = KANJI_CHARACTERS
+    else:
+        alphabet = "abcdefghijklmnopqrstuvwxyz!?#"
+    return "".join(generator.choice(alphabet) for _ in range(length))
+
+
+def time_stage(function: Callable[[], object], number: int, repeat: int) -> tuple[float, float]:
+    # Returns the best and median seconds per call over repeat runs of number calls
+    timings: list[float] = []
+    for _ in range(repeat):
+        start = perf_counter()
+        for _ in range(number):
+            function()
+        timings.append((perf_counter() - start) / number)
+    return min(timings), median(timings)
+
+
+def measure_peak_bytes(function: Callable[[], object]) -> int:
+    # A separate untimed call, since tracing every allocation slows everything down
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def make_stages(version: int, error_correction_level: ErrorCorrection, generator: random.Random) -> dict[str, Callable[[], object]]:
+    stages: dict[str, Callable[[], object]] = {}
+    for mode in MODE_CHARACTER_BITS:
+        payload = make_payload(mode, version, error_correction_level, generator)
+        stages[f"encode.{mode.name.lower()}"] = partial(encode_to_buffer, payload, version, mode)
+
+    block_information = get_codeword_block_information(version, error_correction_level)
+    blocks = [
+        generator.randbytes(group.codeword_count_per_block)
+        for group in (block_information.group_1, block_information.group_2)
+        for _ in range(group.block_count)
+    ]
+    stages["reed_solomon"] = lambda: [generate_error_correction_bytes(block, block_information.ec_codewords_per_block) for block in blocks]
+
+    payload = make_payload(Mode.BINARY, version, error_correction_level, generator)
+    qrcode = SimpleQRCode(version=version, error_correction_level=error_correction_level)
+    qrcode.add_data(payload)
+    qrcode._add_function_patterns()
+    template = qrcode.matrix.copy()
+    # Placement does not depend on the bits, only on how many there are
+    module_count = len(get_data_module_positions(template.size, tuple(template.reserved)))
+    data_region = BitBuffer(generator.randbytes(module_count // 8))
+    data_region.append(0, module_count % 8)
+    stages["placement"] = lambda: QRCodeDrawer(template.copy()).push_bits(data_region)
+
+    qrcode._add_data()
+    unmasked = qrcode.matrix.copy()
+    stages["mask_search"] = lambda: select_best_mask(unmasked, error_correction_level)
+
+    qrcode.matrix = unmasked.copy()
+    qrcode._add_data_mask()
+    qrcode._add_format_information_area()
+    stages["render.png"] = lambda: write_png(qrcode.matrix, BytesIO(), scale=4)
+    stages["render.svg"] = lambda: write_svg(qrcode.matrix, BytesIO())
+
+    def generate() -> None:
+        code = SimpleQRCode(version=version, error_correction_level=error_correction_level)
+        code.add_data(payload)
+        code.generate()
+
+    stages["generate"] = generate
+    return stages
+
+
+def run(versions: list[int], levels: list[str], number: int, repeat: int, seed: int) -> list[Result]:
+    results: list[Result] = []
+    for version in versions:
+        for level in levels:
+            # Seeded per version and level, so running a subset measures the same payloads
+            generator = random.Random(f"{seed}-{version}-{level}")
+            for stage, function in make_stages(version, ERROR_CORRECTION_LEVELS[level], generator).items():
+                function()
+                best, middle = time_stage(function, number, repeat)
+                results.append(
+                    {
+                        "stage": stage,
+                        "version": version,
+                        "error_correction": level,
+                        "best_seconds": best,
+                        "median_seconds": middle,
+                        "calls_per_second": 1 / best if best > 0 else 0.0,
+                        "peak_bytes": measure_peak_bytes(function),
+                    }
+                )
+    return results
+
+
+def result_key(result: Result) -> tuple[str, int, str]:
+    return (str(result["stage"]), int(result["version"]), str(result["error_correction"]))
+
+
+def compare(baseline: list[Result], results: list[Result], threshold: float) -> list[str]:
+    # Returns a line for every stage that is more than threshold (0.1 is 10%) slower than the baseline
+    baseline_by_key = {result_key(result): result for result in baseline}
+    regressions: list[str] = []
+    for result in results:
+        before = baseline_by_key.get(result_key(result))
+        if before is None or float(before["best_seconds"]) <= 0:
+            continue
+        ratio = float(result["best_seconds"]) / float(before["best_seconds"])
+        if ratio > 1 + threshold:
+            stage, version, level = result_key(result)
+            regressions.append(f"{stage} v{version}-{level}: {ratio:.2f}x slower ({float(before['best_seconds']) * 1e3:.3f} ms -> {float(result['best_seconds']) * 1e3:.3f} ms)")
+    return regressions
+
+
+def parse_versions(value: str) -> list[int]:
+    # "1-40", "1,10,40" or a mix like "1-5,40"
+    versions: list[int] = []
+    for part in value.split(","):
+        start, _, end = part.partition("-")
+        versions.extend(range(int(start), int(end or start) + 1))
+    if not all(1 <= version <= 40 for version in versions):
+        raise ValueError(f"Cannot benchmark versions {value}. Expected versions 1-40")
+    return versions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = ArgumentParser(description="Time every stage of making a code across versions and error correction levels")
+    parser.add_argument("--versions", type=parse_versions, default=parse_versions("1-40"), help="like 1-40 (default) or 1,10,40")
+    parser.add_argument("--levels", default="LMQH", help="error correction levels to run (default: LMQH)")
+    parser.add_argument("--number", type=int, default=3, help="calls per timing")
+    parser.add_argument("--repeat", type=int, default=3, help="timings per stage, the best one is reported")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", default=None, help="write the results to this file")
+    parser.add_argument("--compare", default=None, help="an earlier --json file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.1, help="slowdown that counts as a regression (default: 0.1)")
+    arguments = parser.parse_args(argv)
+
+    levels = [level for level in arguments.levels.upper() if level in ERROR_CORRECTION_LEVELS]
+    results = run(arguments.versions, levels, arguments.number, arguments.repeat, arguments.seed)
+
+    print(f"{'stage':<22}{'version':>8}{'ec':>4}{'best ms':>12}{'median ms':>12}{'calls/s':>12}{'peak KiB':>12}")
+    for result in results:
+        print(
+            f"{result['stage']:<22}{result['version']:>8}{result['error_correction']:>4}"
+            f"{float(result['best_seconds']) * 1e3:>12.3f}{float(result['median_seconds']) * 1e3:>12.3f}"
+            f"{float(result['calls_per_second']):>12.1f}{int(result['peak_bytes']) / 1024:>12.1f}"
+        )
+
+    if arguments.json is not None:
+        report = {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "number": arguments.number,
+            "repeat": arguments.repeat,
+            "seed": arguments.seed,
+            "results": results,
+        }
+        with open(arguments.json, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+    if arguments.compare is not None:
+        with open(arguments.compare, encoding="utf-8") as file:
+            baseline = json.load(file)["results"]
+        regressions = compare(baseline, results, arguments.threshold)
+        for regression in regressions:
+            print(f"regression: {regression}", file=sys.stderr)
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
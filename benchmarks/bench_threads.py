@@ -0,0 +1,49 @@
+# Run from the repository root with `python -m benchmarks.bench_threads`
+#
+# Generates the same codes from 1, 2, 4 and 8 threads sharing one process. With the GIL the
+# throughput stays about flat. On a free-threaded build it should grow with the thread count
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+import sys
+from time import perf_counter
+
+from error_correction import ErrorCorrection
+from qrcode import SimpleQRCode
+
+THREAD_COUNTS: tuple[int, ...] = (1, 2, 4, 8)
+
+
+def generate(payload: str) -> None:
+    qrcode = SimpleQRCode(error_correction_level=ErrorCorrection.MEDIUM)
+    qrcode.add_data(payload)
+    qrcode.generate()
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = ArgumentParser(description="Generation throughput from several threads")
+    parser.add_argument("--codes", type=int, default=400, help="codes per thread count")
+    parser.add_argument("--payload-length", type=int, default=100)
+    arguments = parser.parse_args(argv)
+
+    payloads = [f"https://example.com/{index:06d}/".ljust(arguments.payload_length, "x") for index in range(arguments.codes)]
+    # Warm the shared caches first, so the first thread count does not pay for them
+    for payload in payloads[:8]:
+        generate(payload)
+
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(f"Python {sys.version.split()[0]}, GIL {'enabled' if is_gil_enabled else 'disabled'}")
+
+    baseline = 0.0
+    for thread_count in THREAD_COUNTS:
+        with ThreadPoolExecutor(max_workers=thread_count) as executor:
+            start = perf_counter()
+            for _ in executor.map(generate, payloads):
+                pass
+            elapsed = perf_counter() - start
+        codes_per_second = arguments.codes / elapsed
+        baseline = baseline or codes_per_second
+        print(f"{thread_count} threads: {codes_per_second:.1f} codes/s ({codes_per_second / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+from collections.abc import Iterator
+from typing import override
+
+
+class BitBuffer:
+    # Complete bytes, most significant bit first
+    _data: bytearray
+    # Bits that do not fill a byte yet, kept as the low _pending_length bits of an int
+    _pending: int
+    _pending_length: int
+
+    def __init__(self, data: bytes = b""):
+        self._data = bytearray(data)
+        self._pending = 0
+        self._pending_length = 0
+
+    def append(self, value: int, length: int) -> None:
+        if length < 0 or value < 0 or value >> length != 0:
+            raise ValueError(f"Cannot append {value} as {length} bits")
+
+        self._pending = (self._pending << length) | value
+        self._pending_length += length
+        if self._pending_length >= 8:
+            byte_count, remaining = divmod(self._pending_length, 8)
+            self._data += (self._pending >> remaining).to_bytes(byte_count, "big")
+            self._pending &= (1 << remaining) - 1
+            self._pending_length = remaining
+
+    def append_bytes(self, data: bytes | bytearray) -> None:
+        if self._pending_length == 0:
+            self._data += data
+        else:
+            self.append(int.from_bytes(data, "big"), 8 * len(data))
+
+    def extend(self, other: "BitBuffer") -> None:
+        self.append_bytes(other._data)
+        self.append(other._pending, other._pending_length)
+
+    def align_to_byte(self) -> None:
+        if self._pending_length != 0:
+            self.append(0, 8 - self._pending_length)
+
+    def is_aligned(self) -> bool:
+        return self._pending_length == 0
+
+    def to_bytes(self) -> bytes:
+        # A partial final byte is padded with 0s on the right
+        if self._pending_length == 0:
+            return bytes(self._data)
+        return bytes(self._data) + bytes([self._pending << (8 - self._pending_length)])
+
+    def getbuffer(self) -> memoryview:
+        if self._pending_length != 0:
+            raise ValueError("Cannot view a BitBuffer that does not end on a byte boundary")
+        return memoryview(self._data).toreadonly()
+
+    def iter_bits(self) -> Iterator[int]:
+        for byte in self._data:
+            for shift in range(7, -1, -1):
+                yield (byte >> shift) & 1
+        for shift in range(self._pending_length - 1, -1, -1):
+            yield (self._pending >> shift) & 1
+
+    def __len__(self) -> int:
+        return 8 * len(self._data) + self._pending_length
+
+    @override
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, BitBuffer):
+            return False
+        return self._data == other._data and self._pending == other._pending and self._pending_length == other._pending_length
+
+    @override
+    def __str__(self) -> str:
+        # The same "0"/"1" string the encoders used to build
+        bits = "".join(format(byte, "08b") for byte in self._data)
+        if self._pending_length == 0:
+            return bits
+        return bits + format(self._pending, f"0{self._pending_length}b")
@@ -0,0 +1,251 @@
+import os
+import sqlite3
+import struct
+from threading import Lock, local
+import time
+from typing import TypedDict, override
+
+from error_correction import ErrorCorrection
+from symbol_cache import CachedSymbol, RenderKey, SymbolStore
+
+# Version, error correction level, mask pattern and size in front of the packed rows
+SYMBOL_HEADER = struct.Struct(">BBBH")
+# Render entries are stored next to symbols, keyed by the symbol key followed by this and the render key
+RENDER_KEY_SEPARATOR: bytes = b"\x00"
+# Reads only move last_used forward once it is this many seconds old, so most hits are not writes
+TOUCH_INTERVAL: int = 60
+# Evicting goes down to this fraction of max_bytes, so it does not run again on the next write
+EVICTION_LOW_WATER: float = 0.9
+
+SCHEMA: str = """
+BEGIN IMMEDIATE;
+CREATE TABLE IF NOT EXISTS entries (
+    key BLOB PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    last_used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_last_used ON entries (last_used);
+CREATE TABLE IF NOT EXISTS usage (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    total_bytes INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO usage (id, total_bytes) VALUES (0, 0);
+CREATE TRIGGER IF NOT EXISTS entries_insert AFTER INSERT ON entries BEGIN
+    UPDATE usage SET total_bytes = total_bytes + new.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_update AFTER UPDATE OF size ON entries BEGIN
+    UPDATE usage SET total_bytes = total_bytes + new.size - old.size WHERE id = 0;
+END;
+CREATE TRIGGER IF NOT EXISTS entries_delete AFTER DELETE ON entries BEGIN
+    UPDATE usage SET total_bytes = total_bytes - old.size WHERE id = 0;
+END;
+COMMIT;
+"""
+
+
+class DiskSymbolCacheState(TypedDict):
+    # What a DiskSymbolCache is pickled as
+    path: str
+    max_bytes: int
+    mmap_size: int
+    cache_renders: bool
+    timeout: float
+
+
+def pack_symbol(symbol: CachedSymbol) -> bytes:
+    return SYMBOL_HEADER.pack(symbol.version, symbol.error_correction_level.value, symbol.mask_pattern, symbol.size) + symbol.rows
+
+
+def unpack_symbol(value: bytes) -> CachedSymbol:
+    version, error_correction_value, mask_pattern, size = SYMBOL_HEADER.unpack_from(value)
+    return CachedSymbol(version, ErrorCorrection(error_correction_value), mask_pattern, size, bytes(value[SYMBOL_HEADER.size :]))
+
+
+def make_render_entry_key(key: bytes, render_key: RenderKey) -> bytes:
+    name, scale, border = render_key
+    return key + RENDER_KEY_SEPARATOR + f"{name}|{scale}|{border}".encode("utf-8")
+
+
+class DiskSymbolCache(SymbolStore):
+    # Finished codes and their renders in an SQLite file, shared by every process that opens the same path.
+    # Writes are transactions in WAL mode, so processes writing at once never see half written entries.
+    # The least recently used entries are deleted once the entries take more than max_bytes.
+    # With mmap_size > 0, SQLite reads up to that many bytes of the file through a memory map
+    path: str
+    max_bytes: int
+    mmap_size: int
+    timeout: float
+    hits: int
+    misses: int
+    render_hits: int
+    render_misses: int
+    evictions: int
+    _local: local
+    _pid: int
+    _lock: Lock
+
+    def __init__(self, path: str, max_bytes: int = 256 * 1024 * 1024, mmap_size: int = 0, cache_renders: bool = True, timeout: float = 30.0):
+        if max_bytes < 1:
+            raise ValueError(f"Cannot limit a cache to {max_bytes} bytes. Expected a positive size")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.mmap_size = mmap_size
+        self.cache_renders = cache_renders
+        self.timeout = timeout
+        self._reset_counters()
+        self._reset_connection()
+        # Creates the file and schema up front, so a bad path fails here instead of on the first lookup
+        self._connect()
+
+    def _reset_counters(self) -> None:
+        self.hits = 0
+        self.misses = 0
+        self.render_hits = 0
+        self.render_misses = 0
+        self.evictions = 0
+
+    def _reset_connection(self) -> None:
+        # Forgets every connection and the lock, which belong to the process that made them
+        self._local = local()
+        self._pid = os.getpid()
+        self._lock = Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        # One connection per thread, and new ones after a fork since SQLite connections must not cross processes
+        if self._pid != os.getpid():
+            self._reset_connection()
+        connection: sqlite3.Connection | None = getattr(self._local, "connection", None)
+        if connection is not None:
+            return connection
+
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        # Transactions are started explicitly with BEGIN IMMEDIATE
+        connection = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        connection.execute(f"PRAGMA busy_timeout = {int(self.timeout * 1000)}")
+        connection.execute("PRAGMA journal_mode = WAL")
+        connection.execute("PRAGMA synchronous = NORMAL")
+        if self.mmap_size > 0:
+            connection.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        # In one transaction, so processes opening a new file at once do not race each other
+        connection.executescript(SCHEMA)
+        self._local.connection = connection
+        return connection
+
+    def _read(self, entry_key: bytes) -> bytes | None:
+        connection = self._connect()
+        row = connection.execute("SELECT value, last_used FROM entries WHERE key = ?", (entry_key,)).fetchone()
+        if row is None:
+            return None
+        value, last_used = row
+        now = int(time.time())
+        if now - last_used >= TOUCH_INTERVAL:
+            connection.execute("UPDATE entries SET last_used = ? WHERE key = ?", (now, entry_key))
+        return value
+
+    def _write(self, entry_key: bytes, value: bytes) -> None:
+        connection = self._connect()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.execute(
+                "INSERT INTO entries (key, value, size, last_used) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size, last_used = excluded.last_used",
+                (entry_key, value, len(entry_key) + len(value), int(time.time())),
+            )
+            (total_bytes,) = connection.execute("SELECT total_bytes FROM usage WHERE id = 0").fetchone()
+            evicted = 0
+            if total_bytes > self.max_bytes:
+                evicted = self._evict(connection, entry_key)
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        if evicted:
+            with self._lock:
+                self.evictions += evicted
+
+    def _evict(self, connection: sqlite3.Connection, keep_key: bytes) -> int:
+        # Keeps the most recently used entries that fit under the low water mark, and always the entry just written
+        low_water = int(self.max_bytes * EVICTION_LOW_WATER)
+        cursor = connection.execute(
+            "DELETE FROM entries WHERE key IN ("
+            "SELECT key FROM (SELECT key, SUM(size) OVER (ORDER BY key = ? DESC, last_used DESC, rowid DESC) AS running FROM entries) "
+            "WHERE running > ?"
+            ") AND key != ?",
+            (keep_key, low_water, keep_key),
+        )
+        return cursor.rowcount
+
+    @override
+    def get(self, key: bytes) -> CachedSymbol | None:
+        value = self._read(key)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return unpack_symbol(value)
+
+    @override
+    def put(self, key: bytes, symbol: CachedSymbol) -> None:
+        self._write(key, pack_symbol(symbol))
+
+    @override
+    def get_render(self, key: bytes, render_key: RenderKey) -> bytes | None:
+        value = self._read(make_render_entry_key(key, render_key))
+        with self._lock:
+            if value is None:
+                self.render_misses += 1
+                return None
+            self.render_hits += 1
+        return value
+
+    @override
+    def put_render(self, key: bytes, render_key: RenderKey, data: bytes) -> None:
+        if not self.cache_renders:
+            return
+        self._write(make_render_entry_key(key, render_key), data)
+
+    def clear(self) -> None:
+        connection = self._connect()
+        connection.execute("DELETE FROM entries")
+
+    @property
+    def total_bytes(self) -> int:
+        (total_bytes,) = self._connect().execute("SELECT total_bytes FROM usage WHERE id = 0").fetchone()
+        return total_bytes
+
+    def __contains__(self, key: bytes) -> bool:
+        return self._connect().execute("SELECT 1 FROM entries WHERE key = ?", (key,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        (count,) = self._connect().execute("SELECT COUNT(*) FROM entries").fetchone()
+        return count
+
+    def close(self) -> None:
+        # Only closes this thread's connection, other threads keep theirs until they exit
+        connection: sqlite3.Connection | None = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def __getstate__(self) -> DiskSymbolCacheState:
+        # Sent to worker processes by its settings, each process opens its own connections
+        return {
+            "path": self.path,
+            "max_bytes": self.max_bytes,
+            "mmap_size": self.mmap_size,
+            "cache_renders": self.cache_renders,
+            "timeout": self.timeout,
+        }
+
+    def __setstate__(self, state: DiskSymbolCacheState) -> None:
+        self.path = state["path"]
+        self.max_bytes = state["max_bytes"]
+        self.mmap_size = state["mmap_size"]
+        self.cache_renders = state["cache_renders"]
+        self.timeout = state["timeout"]
+        self._reset_counters()
+        self._reset_connection()
@@ -1,8 +1,9 @@
+from bisect import bisect_left
 from enum import StrEnum
-from logging import error
 from typing import override, Callable
+from bit_buffer import BitBuffer
 from error_correction import ErrorCorrection
-from constants import data_codeword_capacity
+from constants import codeword_block_information, data_codeword_capacity
 from mode import Mode
 import re
 
@@ -11,37 +12,117 @@ from utils import split_into_segments
 # TODO: I think data should be first encoded with utf-8. Then you analyze those hex chars. But also idk
 
 
+ALPHANUMERIC_CHARACTERS: str = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+
+# A mode, and how many characters into its current group the segment is
+SegmentState = tuple[Mode, int]
+
+SEGMENT_MODES: tuple[Mode, ...] = (Mode.NUMERIC, Mode.ALPHANUMERIC, Mode.BINARY, Mode.KANJI)
+
+# Bits a character adds to its segment, indexed by how many characters of its group came before it.
+# Numeric packs 3 digits into 10 bits (4, 7 or 10 bits for 1, 2 or 3) and alphanumeric packs 2 characters into 11 (6 or 11)
+CHARACTER_BIT_COSTS: dict[Mode, tuple[int, ...]] = {
+    Mode.NUMERIC: (4, 3, 3),
+    Mode.ALPHANUMERIC: (6, 5),
+    Mode.BINARY: (8,),
+    Mode.KANJI: (13,),
+}
+
+
 # https://www.arscreatio.com/repositorio/images/n_23/SC031-N-1915-18004Text.pdf#page=103
-def generate_most_efficient_modes(data: str, version: int):
-    raise NotImplementedError("Generating the most efficient mode has not yet been implemented")
-    version_index = 0 if version <= 9 else 1 if version <= 26 else 2
-    # Select initial mode
-    mode: Mode
-    if in_exclusive_subset(data[0], Mode.BINARY):
-        mode = Mode.BINARY
-    elif in_exclusive_subset(data[0], Mode.KANJI):
-        if in_exclusive_subset(data[1], Mode.NUMERIC) or in_exclusive_subset(data[1], Mode.ALPHANUMERIC):
-            mode = Mode.KANJI
-
-    mode = Mode.KANJI
-
-    i: int = 1
-    while i < len(data):
-        # While in byte mode
-        if mode == Mode.BINARY:
-            pass
-        # While in alphanumeric mode
-        elif mode == Mode.ALPHANUMERIC:
-            pass
-        # While in numeric mode
-        elif mode == Mode.NUMERIC:
-            pass
-        else:
-            pass
+def generate_most_efficient_modes(data: str, version: int) -> list[tuple[Mode, str]]:
+    # Splits data into the segments with the smallest total bit length, including the mode indicator and
+    # character count indicator each segment adds. A state is a mode plus how far into its current group
+    # the segment is, so every step adds an exact number of bits and the result is optimal, in linear time
+    header_bits: dict[Mode, int] = {mode: 4 + get_character_count_indicator_length(mode, version) for mode in SEGMENT_MODES}
+
+    previous_costs: dict[SegmentState, int] = {}
+    # history[i][state] is the state before character i, and whether character i starts a new segment
+    history: list[dict[SegmentState, tuple[SegmentState | None, bool]]] = []
+
+    for character in data:
+        cheapest_previous: SegmentState | None = min(previous_costs, key=lambda state: previous_costs[state]) if previous_costs else None
+        cheapest_cost: int = previous_costs[cheapest_previous] if cheapest_previous is not None else 0
+
+        costs: dict[SegmentState, int] = {}
+        parents: dict[SegmentState, tuple[SegmentState | None, bool]] = {}
+        for mode in SEGMENT_MODES:
+            if not can_encode(character, mode):
+                continue
+            group = CHARACTER_BIT_COSTS[mode]
+
+            # Start a new segment after the cheapest way to encode everything before this character
+            candidates: list[tuple[int, SegmentState, SegmentState | None, bool]] = [(cheapest_cost + header_bits[mode] + group[0], (mode, 1 % len(group)), cheapest_previous, True)]
+            # Or keep going with the current segment of this mode
+            for position, bits in enumerate(group):
+                previous_state = (mode, position)
+                if previous_state in previous_costs:
+                    candidates.append((previous_costs[previous_state] + bits, (mode, (position + 1) % len(group)), previous_state, False))
+
+            for cost, next_state, parent, new_segment in candidates:
+                if next_state not in costs or cost < costs[next_state]:
+                    costs[next_state] = cost
+                    parents[next_state] = (parent, new_segment)
+
+        if not costs:
+            raise ValueError(f'No valid encoding scheme found for "{character}"')
+
+        previous_costs = costs
+        history.append(parents)
+
+    if not data:
+        return []
+
+    # Walk back from the cheapest final state to recover where every segment starts
+    current_state: SegmentState | None = min(previous_costs, key=lambda state: previous_costs[state])
+    segment_starts: list[tuple[int, Mode]] = []
+    for i in range(len(data) - 1, -1, -1):
+        assert current_state is not None
+        parent_state: SegmentState | None
+        parent_state, new_segment = history[i][current_state]
+        if new_segment:
+            segment_starts.append((i, current_state[0]))
+        current_state = parent_state
+    segment_starts.reverse()
+
+    segments: list[tuple[Mode, str]] = []
+    for index, (start, mode) in enumerate(segment_starts):
+        end = segment_starts[index + 1][0] if index + 1 < len(segment_starts) else len(data)
+        segments.append((mode, data[start:end]))
+    return segments
+
+
+def can_encode(character: str, mode: Mode) -> bool:
+    if mode == Mode.NUMERIC:
+        return "0" <= character <= "9"
+    elif mode == Mode.ALPHANUMERIC:
+        return character in ALPHANUMERIC_CHARACTERS
+    elif mode == Mode.BINARY:
+        try:
+            _ = character.encode(ENCODING.LATIN1)
+        except UnicodeEncodeError:
+            return False
+        return True
+    elif mode == Mode.KANJI:
+        return to_kanji_double_byte(character) is not None
+    return False
+
+
+def to_kanji_double_byte(character: str) -> int | None:
+    try:
+        encoded = character.encode(ENCODING.SHIFTJIS)
+    except UnicodeEncodeError:
+        return None
+    if len(encoded) != 2:
+        return None
+    double_byte = encoded[0] * 256 + encoded[1]
+    if is_in_first_kanji_range(double_byte) or is_in_second_kanji_range(double_byte):
+        return double_byte
+    return None
 
 
-def in_exclusive_subset(character: str, mode: Mode):
-    raise NotImplementedError("Checking if a character is in the exclusive subset has not yet been implemented")
+# Characters that can only be encoded by the given mode (or a less efficient one)
+def in_exclusive_subset(character: str, mode: Mode) -> bool:
     if mode == Mode.NUMERIC:
         return 0x30 <= ord(character) <= 0x39
     elif mode == Mode.ALPHANUMERIC:
@@ -53,7 +134,7 @@ def in_exclusive_subset(character: str, mode: Mode):
             0x2B,
             0x2D,
             0x2E,
-            0x2D,
+            0x2F,
             0x3A,
             0x41,
             0x42,
@@ -101,7 +182,8 @@ def in_exclusive_subset(character: str, mode: Mode):
         else:
             return False
     elif mode == Mode.KANJI:
-        return is_in_first_kanji_range(ord(character)) or is_in_second_kanji_range(ord(character))
+        return to_kanji_double_byte(character) is not None
+    return False
 
 
 class ENCODING(StrEnum):
@@ -109,6 +191,15 @@ class ENCODING(StrEnum):
     SHIFTJIS = "shift-jis"
 
 
+# Versions that share their character count indicator lengths, so data encodes to the same number of bits in all of them
+CHARACTER_COUNT_INDICATOR_BRACKETS: tuple[range, ...] = (range(1, 10), range(10, 27), range(27, 41))
+
+
+class CharacterCountOverflowError(ValueError):
+    # A segment has more characters than its character count indicator can hold in this version
+    pass
+
+
 def get_character_count_indicator_length(mode: Mode, version: int) -> int:
     if 1 <= version <= 9:
         if mode == Mode.NUMERIC:
@@ -142,6 +233,10 @@ def get_character_count_indicator_length(mode: Mode, version: int) -> int:
 
 
 def encode(data: str, version: int, mode: Mode) -> str:
+    return str(encode_to_buffer(data, version, mode))
+
+
+def encode_to_buffer(data: str, version: int, mode: Mode, buffer: BitBuffer | None = None) -> BitBuffer:
     data_func: Callable[[str], tuple[int, int]]
 
     if mode == Mode.NUMERIC:
@@ -155,21 +250,22 @@ def encode(data: str, version: int, mode: Mode) -> str:
     else:
         raise NotImplementedError(f"Support for encoding type {mode} has not yet been implemented")
 
+    if buffer is None:
+        buffer = BitBuffer()
+
     mode_bits: int = mode
     mode_bits_size: int = 4
     length_bits: int = len(data)
     length_bits_size: int = get_character_count_indicator_length(mode, version)
+    if length_bits >> length_bits_size != 0:
+        raise CharacterCountOverflowError(f"Cannot encode {length_bits} characters in {mode.name} mode with version {version}")
     data_bits, data_bits_size = data_func(data)
-    size: int = mode_bits_size + length_bits_size + data_bits_size
 
-    bit_stream = 0
-    bit_stream |= mode_bits
-    bit_stream <<= length_bits_size
-    bit_stream |= length_bits
-    bit_stream <<= data_bits_size
-    bit_stream |= data_bits
+    buffer.append(mode_bits, mode_bits_size)
+    buffer.append(length_bits, length_bits_size)
+    buffer.append(data_bits, data_bits_size)
 
-    return bin(bit_stream)[2:].zfill(size)
+    return buffer
 
 
 # https://www.arscreatio.com/repositorio/images/n_23/SC031-N-1915-18004Text.pdf#page=33
@@ -196,7 +292,7 @@ def to_alphanumeric(data: str) -> tuple[int, int]:
 
 
 def lookup_alphanumeric_value(character: str) -> int:
-    return list("0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:").index(character)
+    return ALPHANUMERIC_CHARACTERS.index(character)
 
 
 def to_numeric(data: str) -> tuple[int, int]:
@@ -240,11 +336,7 @@ def to_binary(data: str) -> tuple[int, int]:
     except UnicodeEncodeError:
         raise ValueError("Input data has to be LATIN-1 (ISO 8859-1) compliant.")
 
-    data_stream: int = 0
-    for byte in data_bytes:
-        # byte -= 0x20
-        data_stream <<= 8
-        data_stream |= byte
+    data_stream: int = int.from_bytes(data_bytes, "big")
 
     data_size: int = 8 * len(data_bytes)
 
@@ -393,192 +485,50 @@ class CodewordBlockInformation:
         return self.version == other.version and self.ec_level == other.ec_level
 
 
+ERROR_CORRECTION_INDEX: dict[ErrorCorrection, int] = {
+    ErrorCorrection.LOW: 0,
+    ErrorCorrection.MEDIUM: 1,
+    ErrorCorrection.QUARTILE: 2,
+    ErrorCorrection.HIGH: 3,
+}
+
+
+# Filled in on first lookup of each entry, so importing only loads the plain tuples in constants.
+# After that a lookup is a single dict access
+_codeword_block_information_cache: dict[tuple[int, ErrorCorrection], CodewordBlockInformation] = {}
+
+
 def get_codeword_block_information(version: int, ec_level: ErrorCorrection) -> CodewordBlockInformation:
-    # TODO: Make this whole thing a lot less bad
-    codeword_block_information: list[CodewordBlockInformation] = [
-        CodewordBlockInformation.from_line(line)
-        for line in """1-L	19	7	1	19			(19*1) = 19
-    1-M	16	10	1	16			(16*1) = 16
-    1-Q	13	13	1	13			(13*1) = 13
-    1-H	9	17	1	9			(9*1) = 9
-    2-L	34	10	1	34			(34*1) = 34
-    2-M	28	16	1	28			(28*1) = 28
-    2-Q	22	22	1	22			(22*1) = 22
-    2-H	16	28	1	16			(16*1) = 16
-    3-L	55	15	1	55			(55*1) = 55
-    3-M	44	26	1	44			(44*1) = 44
-    3-Q	34	18	2	17			(17*2) = 34
-    3-H	26	22	2	13			(13*2) = 26
-    4-L	80	20	1	80			(80*1) = 80
-    4-M	64	18	2	32			(32*2) = 64
-    4-Q	48	26	2	24			(24*2) = 48
-    4-H	36	16	4	9			(9*4) = 36
-    5-L	108	26	1	108			(108*1) = 108
-    5-M	86	24	2	43			(43*2) = 86
-    5-Q	62	18	2	15	2	16 	(15*2) + (16*2) = 62
-    5-H	46	22	2	11	2	12 	(11*2) + (12*2) = 46
-    6-L	136	18	2	68			(68*2) = 136
-    6-M	108	16	4	27			(27*4) = 108
-    6-Q	76	24	4	19			(19*4) = 76
-    6-H	60	28	4	15			(15*4) = 60
-    7-L	156	20	2	78			(78*2) = 156
-    7-M	124	18	4	31			(31*4) = 124
-    7-Q	88	18	2	14	4	15 	(14*2) + (15*4) = 88
-    7-H	66	26	4	13	1	14 	(13*4) + (14*1) = 66
-    8-L	194	24	2	97			(97*2) = 194
-    8-M	154	22	2	38	2	39 	(38*2) + (39*2) = 154
-    8-Q	110	22	4	18	2	19 	(18*4) + (19*2) = 110
-    8-H	86	26	4	14	2	15 	(14*4) + (15*2) = 86
-    9-L	232	30	2	116			(116*2) = 232
-    9-M	182	22	3	36	2	37 	(36*3) + (37*2) = 182
-    9-Q	132	20	4	16	4	17 	(16*4) + (17*4) = 132
-    9-H	100	24	4	12	4	13 	(12*4) + (13*4) = 100
-    10-L	274	18	2	68	2	69 	(68*2) + (69*2) = 274
-    10-M	216	26	4	43	1	44 	(43*4) + (44*1) = 216
-    10-Q	154	24	6	19	2	20 	(19*6) + (20*2) = 154
-    10-H	122	28	6	15	2	16 	(15*6) + (16*2) = 122
-    11-L	324	20	4	81			(81*4) = 324
-    11-M	254	30	1	50	4	51 	(50*1) + (51*4) = 254
-    11-Q	180	28	4	22	4	23 	(22*4) + (23*4) = 180
-    11-H	140	24	3	12	8	13 	(12*3) + (13*8) = 140
-    12-L	370	24	2	92	2	93 	(92*2) + (93*2) = 370
-    12-M	290	22	6	36	2	37 	(36*6) + (37*2) = 290
-    12-Q	206	26	4	20	6	21 	(20*4) + (21*6) = 206
-    12-H	158	28	7	14	4	15 	(14*7) + (15*4) = 158
-    13-L	428	26	4	107			(107*4) = 428
-    13-M	334	22	8	37	1	38 	(37*8) + (38*1) = 334
-    13-Q	244	24	8	20	4	21 	(20*8) + (21*4) = 244
-    13-H	180	22	12	11	4	12 	(11*12) + (12*4) = 180
-    14-L	461	30	3	115	1	116 	(115*3) + (116*1) = 461
-    14-M	365	24	4	40	5	41 	(40*4) + (41*5) = 365
-    14-Q	261	20	11	16	5	17 	(16*11) + (17*5) = 261
-    14-H	197	24	11	12	5	13 	(12*11) + (13*5) = 197
-    15-L	523	22	5	87	1	88 	(87*5) + (88*1) = 523
-    15-M	415	24	5	41	5	42 	(41*5) + (42*5) = 415
-    15-Q	295	30	5	24	7	25 	(24*5) + (25*7) = 295
-    15-H	223	24	11	12	7	13 	(12*11) + (13*7) = 223
-    16-L	589	24	5	98	1	99 	(98*5) + (99*1) = 589
-    16-M	453	28	7	45	3	46 	(45*7) + (46*3) = 453
-    16-Q	325	24	15	19	2	20 	(19*15) + (20*2) = 325
-    16-H	253	30	3	15	13	16 	(15*3) + (16*13) = 253
-    17-L	647	28	1	107	5	108 	(107*1) + (108*5) = 647
-    17-M	507	28	10	46	1	47 	(46*10) + (47*1) = 507
-    17-Q	367	28	1	22	15	23 	(22*1) + (23*15) = 367
-    17-H	283	28	2	14	17	15 	(14*2) + (15*17) = 283
-    18-L	721	30	5	120	1	121 	(120*5) + (121*1) = 721
-    18-M	563	26	9	43	4	44 	(43*9) + (44*4) = 563
-    18-Q	397	28	17	22	1	23 	(22*17) + (23*1) = 397
-    18-H	313	28	2	14	19	15 	(14*2) + (15*19) = 313
-    19-L	795	28	3	113	4	114 	(113*3) + (114*4) = 795
-    19-M	627	26	3	44	11	45 	(44*3) + (45*11) = 627
-    19-Q	445	26	17	21	4	22 	(21*17) + (22*4) = 445
-    19-H	341	26	9	13	16	14 	(13*9) + (14*16) = 341
-    20-L	861	28	3	107	5	108 	(107*3) + (108*5) = 861
-    20-M	669	26	3	41	13	42 	(41*3) + (42*13) = 669
-    20-Q	485	30	15	24	5	25 	(24*15) + (25*5) = 485
-    20-H	385	28	15	15	10	16 	(15*15) + (16*10) = 385
-    21-L	932	28	4	116	4	117 	(116*4) + (117*4) = 932
-    21-M	714	26	17	42			(42*17) = 714
-    21-Q	512	28	17	22	6	23 	(22*17) + (23*6) = 512
-    21-H	406	30	19	16	6	17 	(16*19) + (17*6) = 406
-    22-L	1006	28	2	111	7	112 	(111*2) + (112*7) = 1006
-    22-M	782	28	17	46			(46*17) = 782
-    22-Q	568	30	7	24	16	25 	(24*7) + (25*16) = 568
-    22-H	442	24	34	13			(13*34) = 442
-    23-L	1094	30	4	121	5	122 	(121*4) + (122*5) = 1094
-    23-M	860	28	4	47	14	48 	(47*4) + (48*14) = 860
-    23-Q	614	30	11	24	14	25 	(24*11) + (25*14) = 614
-    23-H	464	30	16	15	14	16 	(15*16) + (16*14) = 464
-    24-L	1174	30	6	117	4	118 	(117*6) + (118*4) = 1174
-    24-M	914	28	6	45	14	46 	(45*6) + (46*14) = 914
-    24-Q	664	30	11	24	16	25 	(24*11) + (25*16) = 664
-    24-H	514	30	30	16	2	17 	(16*30) + (17*2) = 514
-    25-L	1276	26	8	106	4	107 	(106*8) + (107*4) = 1276
-    25-M	1000	28	8	47	13	48 	(47*8) + (48*13) = 1000
-    25-Q	718	30	7	24	22	25 	(24*7) + (25*22) = 718
-    25-H	538	30	22	15	13	16 	(15*22) + (16*13) = 538
-    26-L	1370	28	10	114	2	115 	(114*10) + (115*2) = 1370
-    26-M	1062	28	19	46	4	47 	(46*19) + (47*4) = 1062
-    26-Q	754	28	28	22	6	23 	(22*28) + (23*6) = 754
-    26-H	596	30	33	16	4	17 	(16*33) + (17*4) = 596
-    27-L	1468	30	8	122	4	123 	(122*8) + (123*4) = 1468
-    27-M	1128	28	22	45	3	46 	(45*22) + (46*3) = 1128
-    27-Q	808	30	8	23	26	24 	(23*8) + (24*26) = 808
-    27-H	628	30	12	15	28	16 	(15*12) + (16*28) = 628
-    28-L	1531	30	3	117	10	118 	(117*3) + (118*10) = 1531
-    28-M	1193	28	3	45	23	46 	(45*3) + (46*23) = 1193
-    28-Q	871	30	4	24	31	25 	(24*4) + (25*31) = 871
-    28-H	661	30	11	15	31	16 	(15*11) + (16*31) = 661
-    29-L	1631	30	7	116	7	117 	(116*7) + (117*7) = 1631
-    29-M	1267	28	21	45	7	46 	(45*21) + (46*7) = 1267
-    29-Q	911	30	1	23	37	24 	(23*1) + (24*37) = 911
-    29-H	701	30	19	15	26	16 	(15*19) + (16*26) = 701
-    30-L	1735	30	5	115	10	116 	(115*5) + (116*10) = 1735
-    30-M	1373	28	19	47	10	48 	(47*19) + (48*10) = 1373
-    30-Q	985	30	15	24	25	25 	(24*15) + (25*25) = 985
-    30-H	745	30	23	15	25	16 	(15*23) + (16*25) = 745
-    31-L	1843	30	13	115	3	116 	(115*13) + (116*3) = 1843
-    31-M	1455	28	2	46	29	47 	(46*2) + (47*29) = 1455
-    31-Q	1033	30	42	24	1	25 	(24*42) + (25*1) = 1033
-    31-H	793	30	23	15	28	16 	(15*23) + (16*28) = 793
-    32-L	1955	30	17	115			(115*17) = 1955
-    32-M	1541	28	10	46	23	47 	(46*10) + (47*23) = 1541
-    32-Q	1115	30	10	24	35	25 	(24*10) + (25*35) = 1115
-    32-H	845	30	19	15	35	16 	(15*19) + (16*35) = 845
-    33-L	2071	30	17	115	1	116 	(115*17) + (116*1) = 2071
-    33-M	1631	28	14	46	21	47 	(46*14) + (47*21) = 1631
-    33-Q	1171	30	29	24	19	25 	(24*29) + (25*19) = 1171
-    33-H	901	30	11	15	46	16 	(15*11) + (16*46) = 901
-    34-L	2191	30	13	115	6	116 	(115*13) + (116*6) = 2191
-    34-M	1725	28	14	46	23	47 	(46*14) + (47*23) = 1725
-    34-Q	1231	30	44	24	7	25 	(24*44) + (25*7) = 1231
-    34-H	961	30	59	16	1	17 	(16*59) + (17*1) = 961
-    35-L	2306	30	12	121	7	122 	(121*12) + (122*7) = 2306
-    35-M	1812	28	12	47	26	48 	(47*12) + (48*26) = 1812
-    35-Q	1286	30	39	24	14	25 	(24*39) + (25*14) = 1286
-    35-H	986	30	22	15	41	16 	(15*22) + (16*41) = 986
-    36-L	2434	30	6	121	14	122 	(121*6) + (122*14) = 2434
-    36-M	1914	28	6	47	34	48 	(47*6) + (48*34) = 1914
-    36-Q	1354	30	46	24	10	25 	(24*46) + (25*10) = 1354
-    36-H	1054	30	2	15	64	16 	(15*2) + (16*64) = 1054
-    37-L	2566	30	17	122	4	123 	(122*17) + (123*4) = 2566
-    37-M	1992	28	29	46	14	47 	(46*29) + (47*14) = 1992
-    37-Q	1426	30	49	24	10	25 	(24*49) + (25*10) = 1426
-    37-H	1096	30	24	15	46	16 	(15*24) + (16*46) = 1096
-    38-L	2702	30	4	122	18	123 	(122*4) + (123*18) = 2702
-    38-M	2102	28	13	46	32	47 	(46*13) + (47*32) = 2102
-    38-Q	1502	30	48	24	14	25 	(24*48) + (25*14) = 1502
-    38-H	1142	30	42	15	32	16 	(15*42) + (16*32) = 1142
-    39-L	2812	30	20	117	4	118 	(117*20) + (118*4) = 2812
-    39-M	2216	28	40	47	7	48 	(47*40) + (48*7) = 2216
-    39-Q	1582	30	43	24	22	25 	(24*43) + (25*22) = 1582
-    39-H	1222	30	10	15	67	16 	(15*10) + (16*67) = 1222
-    40-L	2956	30	19	118	6	119 	(118*19) + (119*6) = 2956
-    40-M	2334	28	18	47	31	48 	(47*18) + (48*31) = 2334
-    40-Q	1666	30	34	24	34	25 	(24*34) + (25*34) = 1666
-    40-H	1276	30	20	15	61	16 	(15*20) + (16*61) = 1276
-    """.split("\n")[:-1]
-    ]
-
-    for value in codeword_block_information:
-        if value.version == version and value.ec_level == ec_level:
-            return value
-
-    return CodewordBlockInformation.from_line("")
-    # raise Exception(f"Unable to find codeword block with {version=} and {ec_level=}")
+    try:
+        return _codeword_block_information_cache[(version, ec_level)]
+    except KeyError:
+        pass
+    if not isinstance(version, int) or not 1 <= version < len(codeword_block_information) or ec_level not in ERROR_CORRECTION_INDEX:
+        raise ValueError(f"Unable to find codeword block with {version=} and {ec_level=}")
+
+    index = ERROR_CORRECTION_INDEX[ec_level]
+    information = CodewordBlockInformation(
+        version,
+        ec_level,
+        data_codeword_capacity[version][index],
+        *codeword_block_information[version][index],
+    )
+    # Threads building the same entry at once all get the one that was stored first
+    return _codeword_block_information_cache.setdefault((version, ec_level), information)
 
 
 # https://gcore.jsdelivr.net/gh/tonycrane/tonycrane.github.io/p/409d352d/ISO_IEC18004-2015.pdf#page=41
 def get_data_codeword_capacity(version: int, error_correction_level: ErrorCorrection) -> int:
-    error_correction_index = {
-        ErrorCorrection.LOW: 0,
-        ErrorCorrection.MEDIUM: 1,
-        ErrorCorrection.QUARTILE: 2,
-        ErrorCorrection.HIGH: 3,
-    }[error_correction_level]
-
-    return data_codeword_capacity[version][error_correction_index]
+    return data_codeword_capacity[version][ERROR_CORRECTION_INDEX[error_correction_level]]
 
 
 def get_data_bit_capacity(version: int, error_correction_level: ErrorCorrection) -> int:
     return get_data_codeword_capacity(version, error_correction_level) * 8
+
+
+def find_minimum_version(bit_count: int, error_correction_level: ErrorCorrection, versions: range = range(1, 41)) -> int | None:
+    # Capacity only grows with the version, so the smallest version that fits can be bisected for
+    index = bisect_left(versions, bit_count, key=lambda version: get_data_bit_capacity(version, error_correction_level))
+    if index == len(versions):
+        return None
+    return versions[index]
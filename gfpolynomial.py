@@ -78,8 +78,6 @@ class GFPolynomial:
             # Multiply the generator polynomial so it has the same first term
             temp_divisor *= GFValue(dividend[0].a_power - divisor[0].a_power, 0)
 
-            GFValue.view_as_int = True
-
             dividend ^= temp_divisor
 
         return dividend
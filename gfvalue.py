@@ -38,15 +38,15 @@ class GFValue:
 
     @override
     def __str__(self):
-        # TODO: This is bad practice to use a class variable like this. Fix later
-        if GFValue.view_as_int:
+        # The class attribute is only a default. Set view_as_int on an instance to change how just that value prints
+        if self.view_as_int:
             return f"{from_power(self.a_power)}x^({self.x_power})"
         else:
             return f"a^({self.a_power})*x^({self.x_power})"
 
     @override
     def __repr__(self):
-        if GFValue.view_as_int:
+        if self.view_as_int:
             return f"<GFValue a_int={from_power(self.a_power)} x_power={self.x_power}"
         else:
             return f"<GFValue a_power={self.a_power} x_power={self.x_power}"
@@ -0,0 +1,166 @@
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+from time import perf_counter
+from typing import override
+
+from error_correction import ErrorCorrection
+
+
+class StageRecord:
+    # One stage of making or rendering a code. Allocation numbers are only filled in while tracemalloc is tracing
+    stage: str
+    version: int | None
+    error_correction_level: ErrorCorrection | None
+    elapsed: float
+    allocated_bytes: int | None
+    peak_bytes: int | None
+    # Stage specific values, like the chosen mask and the penalties of every mask for "mask_search"
+    details: dict[str, object]
+
+    def __init__(
+        self,
+        stage: str,
+        version: int | None = None,
+        error_correction_level: ErrorCorrection | None = None,
+        elapsed: float = 0.0,
+        allocated_bytes: int | None = None,
+        peak_bytes: int | None = None,
+        details: dict[str, object] | None = None,
+    ):
+        self.stage = stage
+        self.version = version
+        self.error_correction_level = error_correction_level
+        self.elapsed = elapsed
+        self.allocated_bytes = allocated_bytes
+        self.peak_bytes = peak_bytes
+        self.details = details if details is not None else {}
+
+    def to_dict(self) -> dict[str, object]:
+        return {
+            "stage": self.stage,
+            "version": self.version,
+            "error_correction_level": None if self.error_correction_level is None else self.error_correction_level.name,
+            "elapsed": self.elapsed,
+            "allocated_bytes": self.allocated_bytes,
+            "peak_bytes": self.peak_bytes,
+            "details": self.details,
+        }
+
+    @override
+    def __str__(self) -> str:
+        text = f"{self.stage} v{self.version} {self.error_correction_level.name if self.error_correction_level is not None else '-'}: {self.elapsed * 1e3:.3f} ms"
+        if self.peak_bytes is not None:
+            text += f", peak {self.peak_bytes} bytes"
+        return text
+
+
+Hook = Callable[[StageRecord], None]
+
+# Hooks for the current thread or async task, see instrument()
+_context_hooks: ContextVar[tuple[Hook, ...]] = ContextVar("qrcode_instrumentation_hooks", default=())
+# Hooks for every thread, see add_hook(). Replaced as a whole instead of mutated, so readers need no lock
+_global_hooks: tuple[Hook, ...] = ()
+_global_hooks_lock = Lock()
+
+
+def add_hook(hook: Hook) -> None:
+    global _global_hooks
+    with _global_hooks_lock:
+        _global_hooks = (*_global_hooks, hook)
+
+
+def remove_hook(hook: Hook) -> None:
+    global _global_hooks
+    with _global_hooks_lock:
+        if hook not in _global_hooks:
+            raise ValueError(f"Cannot remove hook {hook!r}. It was never added")
+        hooks = list(_global_hooks)
+        hooks.remove(hook)
+        _global_hooks = tuple(hooks)
+
+
+def get_hooks() -> tuple[Hook, ...]:
+    # Checked once per generate or render, and the stages it hands the result to do nothing when it is empty
+    context_hooks = _context_hooks.get()
+    if not context_hooks:
+        return _global_hooks
+    return _global_hooks + context_hooks
+
+
+@contextmanager
+def instrument(*hooks: Hook, trace_allocations: bool = False) -> Iterator[None]:
+    # Calls hooks with a StageRecord after every stage run inside the block, in this thread or async task only.
+    # Threads started inside the block do not inherit the hooks unless they copy the context.
+    # With trace_allocations, tracemalloc runs for the length of the block if it was not running already
+    import tracemalloc
+
+    token = _context_hooks.set(_context_hooks.get() + hooks)
+    started_tracing = trace_allocations and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        yield
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        _context_hooks.reset(token)
+
+
+@contextmanager
+def stage(
+    name: str,
+    version: int | None = None,
+    error_correction_level: ErrorCorrection | None = None,
+    hooks: tuple[Hook, ...] | None = None,
+) -> Iterator[StageRecord]:
+    # Times the block and hands the record to every hook. The block can add to record.details,
+    # and version and error correction level can still be filled in once they are known.
+    # Without hooks the block just runs, so steps can always be wrapped in a stage
+    hooks = get_hooks() if hooks is None else hooks
+    record = StageRecord(name, version, error_correction_level)
+    if not hooks:
+        yield record
+        return
+
+    # Imported here since stages are only timed with hooks registered, and tracemalloc pulls in pickle
+    import tracemalloc
+
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        # The peak is process wide, so stages running at the same time in other threads show up in it
+        tracemalloc.reset_peak()
+        start_bytes = tracemalloc.get_traced_memory()[0]
+    start = perf_counter()
+    try:
+        yield record
+    finally:
+        record.elapsed = perf_counter() - start
+        if tracing:
+            current_bytes, peak_bytes = tracemalloc.get_traced_memory()
+            record.allocated_bytes = current_bytes - start_bytes
+            record.peak_bytes = peak_bytes - start_bytes
+    for hook in hooks:
+        hook(record)
+
+
+class StageRecorder:
+    # A hook that keeps every record, for tests and one-off profiling
+    records: list[StageRecord]
+    _lock: Lock
+
+    def __init__(self):
+        self.records = []
+        self._lock = Lock()
+
+    def __call__(self, record: StageRecord) -> None:
+        with self._lock:
+            self.records.append(record)
+
+    def stages(self) -> list[str]:
+        return [record.stage for record in self.records]
+
+    def clear(self) -> None:
+        with self._lock:
+            self.records.clear()
@@ -0,0 +1,226 @@
+from argparse import ArgumentParser, Namespace
+from collections.abc import Iterable, Iterator
+import csv
+from enum import StrEnum
+from functools import partial
+from io import BytesIO
+from itertools import tee
+import json
+import os
+import sys
+from typing import BinaryIO, TextIO
+
+from archive_sink import ArchiveFormat, check_member_name, guess_archive_format, open_archive_sink
+from batch import BatchStatistics, render_many
+from error_correction import ErrorCorrection
+from qrcode import SimpleQRCode
+from text_renderer import TextStyle
+
+# A payload and the fields that can be used in the file name template
+Record = tuple[str, dict[str, str]]
+
+
+class InputFormat(StrEnum):
+    LINES = "lines"
+    CSV = "csv"
+    JSONL = "jsonl"
+
+
+class OutputFormat(StrEnum):
+    PNG = "png"
+    SVG = "svg"
+    PDF = "pdf"
+    TXT = "txt"
+
+
+ERROR_CORRECTION_LEVELS: dict[str, ErrorCorrection] = {
+    "L": ErrorCorrection.LOW,
+    "M": ErrorCorrection.MEDIUM,
+    "Q": ErrorCorrection.QUARTILE,
+    "H": ErrorCorrection.HIGH,
+}
+
+
+def read_records(stream: TextIO, input_format: InputFormat, field: str) -> Iterator[Record]:
+    # Reads one record at a time, so the input never has to fit in memory
+    # Blank lines are skipped in lines and jsonl input, like the trailing newline at the end of a file
+    if input_format == InputFormat.LINES:
+        for line in stream:
+            if not line.strip():
+                continue
+            yield (line.rstrip("\r\n"), {})
+    elif input_format == InputFormat.CSV:
+        for line_number, row in enumerate(csv.DictReader(stream), start=2):
+            if row.get(field) is None:
+                raise ValueError(f"Line {line_number} has no {field!r} column")
+            yield (row[field], {key: value for key, value in row.items() if key is not None})
+    elif input_format == InputFormat.JSONL:
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            value = json.loads(line)
+            if isinstance(value, str):
+                yield (value, {})
+            elif isinstance(value, dict) and isinstance(value.get(field), str):
+                yield (value[field], {key: str(item) for key, item in value.items()})
+            else:
+                raise ValueError(f"Line {line_number} is neither a string nor an object with a string {field!r} field")
+    else:
+        raise ValueError(f"Cannot read input format {input_format}")
+
+
+def render_output(qrcode: SimpleQRCode, output_format: OutputFormat, scale: int, border: int) -> bytes:
+    # Runs in the worker processes, so only the finished bytes are sent back
+    stream = BytesIO()
+    if output_format == OutputFormat.PNG:
+        qrcode.write_png(stream, scale=scale, border=border)
+    elif output_format == OutputFormat.SVG:
+        qrcode.write_svg(stream, scale=scale, border=border)
+    elif output_format == OutputFormat.PDF:
+        qrcode.write_pdf(stream, scale=scale, border=border)
+    elif output_format == OutputFormat.TXT:
+        stream.write((qrcode.to_text(TextStyle.HALF_BLOCK, border=border) + "\n").encode("utf-8"))
+    else:
+        raise ValueError(f"Cannot render output format {output_format}")
+    return stream.getvalue()
+
+
+def format_name(template: str, index: int, output_format: OutputFormat, fields: dict[str, str]) -> str:
+    try:
+        return template.format(**fields, index=index, ext=output_format.value)
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(f"Cannot fill in name template {template!r} for record {index}: {e}")
+
+
+def write_files(
+    outputs: Iterable[tuple[str, bytes]],
+    output_folder: str,
+) -> int:
+    created_folders: set[str] = set()
+    count = 0
+    for name, data in outputs:
+        # Names come from input fields and the template, so they must stay inside output_folder
+        try:
+            path = os.path.join(output_folder, check_member_name(name))
+        except ValueError:
+            raise ValueError(f"Cannot write {name!r} to {output_folder!r}. Expected a relative path inside the output folder") from None
+        folder = os.path.dirname(path)
+        if folder not in created_folders:
+            os.makedirs(folder or ".", exist_ok=True)
+            created_folders.add(folder)
+        with open(path, "wb") as file:
+            file.write(data)
+        count += 1
+    return count
+
+
+def write_archive(
+    outputs: Iterable[tuple[str, bytes]],
+    path: str,
+    archive_format: ArchiveFormat | None,
+    compress: bool,
+) -> int:
+    # Everything goes into one sequentially written file (or stdout for -) instead of one file per code
+    if archive_format is None:
+        if path == "-":
+            raise ValueError("Cannot tell the archive format of stdout. Pass --archive-format")
+        archive_format = guess_archive_format(path)
+
+    stream: BinaryIO = sys.stdout.buffer if path == "-" else open(path, "wb")
+    try:
+        with open_archive_sink(stream, archive_format, compress=compress) as sink:
+            for name, data in outputs:
+                sink.add(name, data)
+            return sink.member_count
+    finally:
+        if stream is not sys.stdout.buffer:
+            stream.close()
+
+
+def make_parser() -> ArgumentParser:
+    parser = ArgumentParser(description="Generate QR codes in bulk, one per input record")
+    parser.add_argument("input", nargs="?", default="-", help="file to read payloads from, - for stdin (default)")
+    parser.add_argument("--input-format", type=InputFormat, choices=list(InputFormat), default=InputFormat.LINES)
+    parser.add_argument("--field", default="data", help="csv column or jsonl key holding the payload (default: data)")
+    parser.add_argument("--version", type=int, default=None, choices=range(1, 41), metavar="{1-40}", help="picked per payload when left out")
+    parser.add_argument("--error-correction", choices=list(ERROR_CORRECTION_LEVELS), default="L")
+    parser.add_argument("--mask", type=int, default=None, choices=range(8), help="0-7, chosen by penalty score when left out")
+    parser.add_argument("--format", type=OutputFormat, choices=list(OutputFormat), default=OutputFormat.PNG)
+    parser.add_argument("--scale", type=int, default=1, help="pixels (or points) per module")
+    parser.add_argument("--border", type=int, default=4, help="quiet zone in modules")
+    parser.add_argument("--output-dir", default="out")
+    parser.add_argument(
+        "--name-template",
+        default="{index:06d}.{ext}",
+        help="output file name, filled in with index, ext and csv/jsonl fields (default: {index:06d}.{ext})",
+    )
+    parser.add_argument("--archive", default=None, help="write every output into this .zip, .tar, .tar.gz or .tgz file (- for stdout) instead of --output-dir")
+    parser.add_argument("--archive-format", type=ArchiveFormat, choices=list(ArchiveFormat), default=None, help="default: guessed from --archive")
+    parser.add_argument("--archive-store", action="store_true", help="do not compress zip members, PNGs are already compressed")
+    parser.add_argument("--cache", default=None, help="SQLite file to keep finished codes and outputs in, shared between runs and processes")
+    parser.add_argument("--cache-size", type=int, default=256, help="MiB the --cache file may hold before old entries are dropped (default: 256)")
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: run in this process)")
+    parser.add_argument("--chunk-size", type=int, default=64, help="payloads handed to a worker at a time")
+    parser.add_argument("--stats", action="store_true", help="print throughput to stderr when done")
+    return parser
+
+
+def run(arguments: Namespace, stream: TextIO) -> BatchStatistics:
+    error_correction_level = ERROR_CORRECTION_LEVELS[arguments.error_correction]
+    records_for_payloads, records_for_names = tee(read_records(stream, arguments.input_format, arguments.field))
+    payloads = (payload for payload, _ in records_for_payloads)
+    render = partial(render_output, output_format=arguments.format, scale=arguments.scale, border=arguments.border)
+
+    symbol_cache = None
+    if arguments.cache is not None:
+        # sqlite3 is only loaded when there is a cache to open
+        from disk_cache import DiskSymbolCache
+
+        symbol_cache = DiskSymbolCache(arguments.cache, max_bytes=arguments.cache_size * 1024 * 1024)
+
+    statistics = BatchStatistics()
+    outputs = render_many(
+        payloads,
+        render,
+        arguments.version,
+        error_correction_level,
+        arguments.mask,
+        processes=arguments.processes,
+        chunk_size=arguments.chunk_size,
+        statistics=statistics,
+        symbol_cache=symbol_cache,
+    )
+    # render_many keeps the input order, so names can be matched back up with a second pass over the records
+    named_outputs = (
+        (format_name(arguments.name_template, index, arguments.format, fields), data)
+        for index, ((_, fields), data) in enumerate(zip(records_for_names, outputs))
+    )
+    if arguments.archive is not None:
+        write_archive(named_outputs, arguments.archive, arguments.archive_format, compress=not arguments.archive_store)
+    else:
+        write_files(named_outputs, arguments.output_dir)
+    return statistics
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = make_parser()
+    arguments = parser.parse_args(argv)
+
+    try:
+        if arguments.input == "-":
+            statistics = run(arguments, sys.stdin)
+        else:
+            with open(arguments.input, encoding="utf-8", newline="") as stream:
+                statistics = run(arguments, stream)
+    except Exception as e:
+        # Payloads that do not fit, unreadable input and bad templates all end up here
+        print(f"{parser.prog}: error: {e}", file=sys.stderr)
+        return 1
+
+    if arguments.stats:
+        print(statistics, file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,5 @@
 # https://www.arscreatio.com/repositorio/images/n_23/SC031-N-1915-18004Text.pdf#page=61
+from functools import lru_cache
 from typing import Callable
 
 MaskPattern: dict[int, Callable[[int, int], bool]] = {
@@ -11,3 +12,16 @@ MaskPattern: dict[int, Callable[[int, int], bool]] = {
     0b110: lambda i, j: ((i * j) % 2 + (i * j) % 3) % 2 == 0,
     0b111: lambda i, j: ((i + j) % 2 + (i * j) % 3) % 2 == 0,
 }
+
+
+@lru_cache(maxsize=None)
+def get_mask_bitplanes(size: int) -> tuple[tuple[int, ...], ...]:
+    # bitplanes[mask][row] is a row bitset (column 0 in the most significant bit) of every module the mask inverts
+    return tuple(tuple(int("".join("1" if condition(row, col) else "0" for col in range(size)), 2) for row in range(size)) for condition in (MaskPattern[mask] for mask in range(len(MaskPattern))))
+
+
+@lru_cache(maxsize=64)
+def get_data_mask_bitplanes(size: int, function_pattern_mask: tuple[int, ...]) -> tuple[tuple[int, ...], ...]:
+    # Same as get_mask_bitplanes, but with the function patterns of a version cleared so
+    # a mask can be applied to a whole row with a single XOR
+    return tuple(tuple(plane_row & ~reserved_row for plane_row, reserved_row in zip(plane, function_pattern_mask)) for plane in get_mask_bitplanes(size))
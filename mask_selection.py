@@ -0,0 +1,114 @@
+from typing import TYPE_CHECKING
+
+from error_correction import ErrorCorrection
+from mask_pattern import MaskPattern, get_data_mask_bitplanes
+from module_matrix import ModuleMatrix
+from penalty import evaluate_penalties, evaluate_penalties_below
+from utils import bose_chaudhuri_hocquenghem
+
+# concurrent.futures pulls in logging, so it is only imported for type checking
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+
+def place_format_information(matrix: ModuleMatrix, error_correction_level: ErrorCorrection, mask_pattern: int) -> None:
+    size = matrix.size
+    format_data: int = error_correction_level << 3
+    format_data |= mask_pattern
+
+    format_string = bose_chaudhuri_hocquenghem(format_data).zfill(15)
+
+    paths: list[list[list[int]]] = [
+        [
+            [8, 0],
+            [8, 1],
+            [8, 2],
+            [8, 3],
+            [8, 4],
+            [8, 5],
+            [8, 7],
+            [8, 8],
+            [7, 8],
+            [5, 8],
+            [4, 8],
+            [3, 8],
+            [2, 8],
+            [1, 8],
+            [0, 8],
+        ],
+        [
+            [size - 1, 8],
+            [size - 2, 8],
+            [size - 3, 8],
+            [size - 4, 8],
+            [size - 5, 8],
+            [size - 6, 8],
+            [size - 7, 8],
+            [8, size - 8],
+            [8, size - 7],
+            [8, size - 6],
+            [8, size - 5],
+            [8, size - 4],
+            [8, size - 3],
+            [8, size - 2],
+            [8, size - 1],
+        ],
+    ]
+
+    for path in paths:
+        for i in range(len(format_string)):
+            if i >= len(path):
+                break
+            row, col = path[i]
+            matrix.set_dark(row, col, format_string[i] == "1")
+
+
+def evaluate_mask_candidate(
+    matrix: ModuleMatrix,
+    error_correction_level: ErrorCorrection,
+    mask_pattern: int,
+    bound: int | None = None,
+) -> tuple[int, int, int, int] | None:
+    # Works on a copy so candidates never see each other's masks and can be evaluated concurrently
+    candidate = matrix.copy()
+    candidate.apply_mask(get_data_mask_bitplanes(candidate.size, tuple(candidate.reserved))[mask_pattern])
+    place_format_information(candidate, error_correction_level, mask_pattern)
+
+    if bound is None:
+        return evaluate_penalties(candidate.rows, candidate.size)
+    return evaluate_penalties_below(candidate.rows, candidate.size, bound)
+
+
+def select_best_mask(
+    matrix: ModuleMatrix,
+    error_correction_level: ErrorCorrection,
+    executor: "Executor | None" = None,
+    early_exit: bool = False,
+) -> tuple[int, list[tuple[int, int, int, int] | None]]:
+    # Returns the winning mask and the penalties of every candidate. A candidate is None when
+    # early exit proved it could not beat an earlier one. Ties go to the lowest mask number.
+    #
+    # The scorer is pure Python, so a ProcessPoolExecutor is the one that scales on a GIL build.
+    # A ThreadPoolExecutor only helps on free-threaded builds. Early exit needs the best total of the
+    # candidates before it, so it cannot be combined with an executor
+    if executor is not None and early_exit:
+        raise ValueError("Cannot use early exit with an executor. Candidates scored concurrently have no earlier total to stop at")
+    mask_patterns = range(len(MaskPattern))
+    scores: list[tuple[int, int, int, int] | None]
+
+    if executor is not None:
+        futures = [executor.submit(evaluate_mask_candidate, matrix, error_correction_level, mask_pattern) for mask_pattern in mask_patterns]
+        scores = [future.result() for future in futures]
+    else:
+        scores = []
+        best_total: int | None = None
+        for mask_pattern in mask_patterns:
+            bound = best_total if early_exit else None
+            score = evaluate_mask_candidate(matrix, error_correction_level, mask_pattern, bound)
+            scores.append(score)
+            if score is not None and (best_total is None or sum(score) < best_total):
+                best_total = sum(score)
+
+    totals = [sum(score) if score is not None else None for score in scores]
+    best_mask = min((total, mask_pattern) for mask_pattern, total in zip(mask_patterns, totals) if total is not None)[1]
+    return best_mask, scores
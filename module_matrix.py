@@ -0,0 +1,104 @@
+from typing import override
+
+from color import BLACK, WHITE
+from square import Square
+
+
+class ModuleMatrix:
+    size: int
+    # Every row is stored as an int bitset with column 0 in the most significant bit,
+    # so bin(row) reads the same way as the matrix does from left to right
+    rows: list[int]
+    # Modules that are part of a function pattern
+    locked: list[int]
+    # Modules that can never hold data. Every locked module is also reserved
+    reserved: list[int]
+
+    def __init__(
+        self,
+        size: int,
+        rows: list[int] | None = None,
+        locked: list[int] | None = None,
+        reserved: list[int] | None = None,
+    ):
+        self.size = size
+        self.rows = rows if rows is not None else [0] * size
+        self.locked = locked if locked is not None else [0] * size
+        self.reserved = reserved if reserved is not None else [0] * size
+
+    def _bit(self, col: int) -> int:
+        return 1 << (self.size - 1 - col)
+
+    def is_dark(self, row: int, col: int) -> bool:
+        return self.rows[row] & self._bit(col) != 0
+
+    def set_dark(self, row: int, col: int, dark: bool) -> None:
+        if dark:
+            self.rows[row] |= self._bit(col)
+        else:
+            self.rows[row] &= ~self._bit(col)
+
+    def invert(self, row: int, col: int) -> None:
+        self.rows[row] ^= self._bit(col)
+
+    def get_color(self, row: int, col: int) -> tuple[int, int, int]:
+        return BLACK if self.is_dark(row, col) else WHITE
+
+    def set_color(self, row: int, col: int, color: tuple[int, int, int]) -> None:
+        self.set_dark(row, col, color == BLACK)
+
+    def is_locked(self, row: int, col: int) -> bool:
+        return self.locked[row] & self._bit(col) != 0
+
+    def lock(self, row: int, col: int) -> None:
+        self.locked[row] |= self._bit(col)
+        self.reserved[row] |= self._bit(col)
+
+    def is_reserved(self, row: int, col: int) -> bool:
+        return self.reserved[row] & self._bit(col) != 0
+
+    def reserve(self, row: int, col: int) -> None:
+        self.reserved[row] |= self._bit(col)
+
+    def apply_mask(self, bitplane: tuple[int, ...]) -> None:
+        # Applying the same bitplane a second time removes it again
+        self.rows = [row ^ mask for row, mask in zip(self.rows, bitplane)]
+
+    def dark_count(self) -> int:
+        return sum(row.bit_count() for row in self.rows)
+
+    def row_string(self, row: int) -> str:
+        return format(self.rows[row], f"0{self.size}b")
+
+    def copy(self) -> "ModuleMatrix":
+        return ModuleMatrix(self.size, self.rows[:], self.locked[:], self.reserved[:])
+
+    def to_lists(self) -> list[list[int]]:
+        return [[int(c) for c in self.row_string(row)] for row in range(self.size)]
+
+    def to_squares(self) -> list[list[Square]]:
+        # Unpacked view for code written against the old list[list[Square]] matrix
+        return [
+            [
+                Square(
+                    self.get_color(row, col),
+                    locked=self.is_locked(row, col),
+                    reserved=self.is_reserved(row, col),
+                )
+                for col in range(self.size)
+            ]
+            for row in range(self.size)
+        ]
+
+    def __len__(self) -> int:
+        return self.size
+
+    @override
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, ModuleMatrix):
+            return False
+        return self.size == other.size and self.rows == other.rows and self.locked == other.locked and self.reserved == other.reserved
+
+    @override
+    def __str__(self) -> str:
+        return "".join(self.row_string(row) for row in range(self.size))
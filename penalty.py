@@ -0,0 +1,181 @@
+from collections.abc import Sequence
+from math import ceil, floor
+import re
+
+# Penalty rules for choosing a data mask
+# https://www.arscreatio.com/repositorio/images/n_23/SC031-N-1915-18004Text.pdf#page=62
+#
+# Rows and columns are int bitsets with column (or row) 0 in the most significant bit,
+# the same layout ModuleMatrix uses
+
+FINDER_LIKE_PATTERNS: list[list[int]] = [
+    [1, 0, 1, 1, 1, 0, 1, 0, 0, 0, 0],
+    [0, 0, 0, 0, 1, 0, 1, 1, 1, 0, 1],
+]
+
+_same_color_run = re.compile(r"0{5,}|1{5,}")
+
+
+def transpose(rows: Sequence[int], size: int) -> list[int]:
+    row_strings = [format(row, f"0{size}b") for row in rows]
+    return [int("".join(column), 2) for column in zip(*row_strings)]
+
+
+def evaluate_penalties(rows: Sequence[int], size: int) -> tuple[int, int, int, int]:
+    columns = transpose(rows, size)
+    return (
+        evaluate_condition_1(rows, columns, size),
+        evaluate_condition_2(rows, size),
+        evaluate_condition_3(rows, columns, size),
+        evaluate_condition_4(rows, size),
+    )
+
+
+def evaluate_penalties_below(rows: Sequence[int], size: int, bound: int) -> tuple[int, int, int, int] | None:
+    # Every condition is non-negative, so the running total is a lower bound on the final score.
+    # Returns None as soon as that bound reaches `bound`, checking the cheapest conditions first
+    penalty_4 = evaluate_condition_4(rows, size)
+    if penalty_4 >= bound:
+        return None
+    penalty_2 = evaluate_condition_2(rows, size)
+    if penalty_4 + penalty_2 >= bound:
+        return None
+    columns = transpose(rows, size)
+    penalty_1 = evaluate_condition_1(rows, columns, size)
+    if penalty_4 + penalty_2 + penalty_1 >= bound:
+        return None
+    penalty_3 = evaluate_condition_3(rows, columns, size)
+    if penalty_4 + penalty_2 + penalty_1 + penalty_3 >= bound:
+        return None
+    return (penalty_1, penalty_2, penalty_3, penalty_4)
+
+
+def evaluate_condition_1(rows: Sequence[int], columns: Sequence[int], size: int) -> int:
+    # A run of 5 same colored modules costs 3, and every module past that costs 1 more
+    penalty = 0
+    for line in (*rows, *columns):
+        for run in _same_color_run.finditer(format(line, f"0{size}b")):
+            penalty += run.end() - run.start() - 2
+    return penalty
+
+
+def evaluate_condition_2(rows: Sequence[int], size: int) -> int:
+    # Every 2x2 block of one color costs 3
+    full = (1 << size) - 1
+    # Bit k of a pair mask compares column k with column k + 1, so the leftmost column has no pair
+    pair_mask = full >> 1
+    penalty = 0
+    for upper, lower in zip(rows, rows[1:]):
+        same_vertically = ~(upper ^ lower) & full
+        same_horizontally = ~(upper ^ (upper >> 1)) & pair_mask
+        blocks = same_vertically & (same_vertically >> 1) & same_horizontally
+        penalty += 3 * blocks.bit_count()
+    return penalty
+
+
+def evaluate_condition_3(rows: Sequence[int], columns: Sequence[int], size: int) -> int:
+    # Every 1:1:3:1:1 finder-like pattern next to 4 light modules costs 40
+    window_size = len(FINDER_LIKE_PATTERNS[0])
+    if size < window_size:
+        return 0
+    full = (1 << size) - 1
+    # A match is recorded on the bit of its first column, so the last window_size - 1 bits can never start one
+    window_starts = full ^ ((1 << (window_size - 1)) - 1)
+    penalty = 0
+    for line in (*rows, *columns):
+        shifted = [line << i for i in range(window_size)]
+        for pattern in FINDER_LIKE_PATTERNS:
+            matches = window_starts
+            for i, expected in enumerate(pattern):
+                matches &= shifted[i] if expected else ~shifted[i]
+            penalty += 40 * matches.bit_count()
+    return penalty
+
+
+def evaluate_condition_4(rows: Sequence[int], size: int) -> int:
+    # Scored by how many 5% steps the proportion of dark modules is away from 50%
+    dark_cell_count = sum(row.bit_count() for row in rows)
+    return _dark_proportion_penalty(dark_cell_count, size * size)
+
+
+def _dark_proportion_penalty(dark_cell_count: int, total_cells: int) -> int:
+    percentage_dark = (float(dark_cell_count) / total_cells) * 100
+    prev_multiple_of_5 = floor(percentage_dark / 5.0) * 5
+    next_multiple_of_5 = ceil(percentage_dark / 5.0) * 5
+    prev_multiple_of_5 = abs(prev_multiple_of_5 - 50)
+    next_multiple_of_5 = abs(next_multiple_of_5 - 50)
+    # Both should already be integers
+    prev_multiple_of_5 = int(prev_multiple_of_5 / 5)
+    next_multiple_of_5 = int(next_multiple_of_5 / 5)
+    return min(prev_multiple_of_5, next_multiple_of_5)
+
+
+# Scalar reference implementation, one module at a time. Kept to check the bitset version against
+
+
+def reference_evaluate_penalties(cells: list[list[int]]) -> tuple[int, int, int, int]:
+    return (
+        reference_condition_1(cells),
+        reference_condition_2(cells),
+        reference_condition_3(cells),
+        reference_condition_4(cells),
+    )
+
+
+def reference_condition_1(cells: list[list[int]]) -> int:
+    penalty = 0
+    transpose_matrix: list[list[int]] = [list(values) for values in zip(*cells)]
+    for matrix in [cells, transpose_matrix]:
+        for row in matrix:
+            count = 0
+            prev_cell = None
+            for cell in row:
+                if cell == prev_cell:
+                    count += 1
+                else:
+                    count = 1
+                    prev_cell = cell
+
+                if count == 5:
+                    penalty += 3
+                elif count > 5:
+                    penalty += 1
+    return penalty
+
+
+def reference_condition_2(cells: list[list[int]]) -> int:
+    penalty = 0
+    for row in range(len(cells) - 1):
+        for col in range(len(cells[0]) - 1):
+            block = [
+                cells[row + 0][col + 0],
+                cells[row + 0][col + 1],
+                cells[row + 1][col + 0],
+                cells[row + 1][col + 1],
+            ]
+            if all(cell == block[0] for cell in block):
+                penalty += 3
+    return penalty
+
+
+def reference_condition_3(cells: list[list[int]]) -> int:
+    window_size = 11
+    penalty = 0
+    transpose_matrix = [list(values) for values in zip(*cells)]
+    for matrix in [cells, transpose_matrix]:
+        for row in matrix:
+            for col in range(len(row) + 1 - window_size):
+                window = row[col : col + window_size]
+                if window in FINDER_LIKE_PATTERNS:
+                    penalty += 40
+    return penalty
+
+
+def reference_condition_4(cells: list[list[int]]) -> int:
+    total_cells = len(cells) * len(cells[0])
+    dark_cell_count = 0
+    for row in cells:
+        for cell in row:
+            if cell == 1:
+                dark_cell_count += 1
+    return _dark_proportion_penalty(dark_cell_count, total_cells)
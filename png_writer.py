@@ -0,0 +1,90 @@
+from collections.abc import Iterator
+import struct
+from typing import BinaryIO
+import zlib
+
+from module_matrix import ModuleMatrix
+
+# http://www.libpng.org/pub/png/spec/1.2/PNG-Contents.html
+PNG_SIGNATURE: bytes = b"\x89PNG\r\n\x1a\n"
+# Bit depth 1, color type 0 (grayscale), deflate compression, adaptive filtering, no interlacing
+BIT_DEPTH: int = 1
+COLOR_TYPE_GRAYSCALE: int = 0
+# Compressed image data is flushed into an IDAT chunk whenever this much has piled up
+IDAT_CHUNK_SIZE: int = 64 * 1024
+
+# Every scanline starts with its filter type. Runs of identical bytes already compress well without filtering
+_FILTER_NONE: bytes = b"\x00"
+
+
+def get_image_size(matrix: ModuleMatrix, scale: int = 1, border: int = 4) -> int:
+    return (matrix.size + 2 * border) * scale
+
+
+def check_options(scale: int, border: int) -> None:
+    if scale < 1:
+        raise ValueError(f"Cannot scale modules by {scale}. Expected a positive scale")
+    if border < 0:
+        raise ValueError(f"Cannot add a border of {border} modules. Expected a non-negative border")
+
+
+def iter_scanlines(matrix: ModuleMatrix, scale: int = 1, border: int = 4) -> Iterator[bytes]:
+    # Yields every scanline of the image, filter byte included. Each module row is packed once
+    # and repeated scale times, so there is no work per pixel
+    check_options(scale, border)
+
+    image_size = get_image_size(matrix, scale, border)
+    row_byte_count = (image_size + 7) // 8
+    # Unused bits in the last byte of a scanline are ignored by decoders, keep them at 0
+    padding_bits = 8 * row_byte_count - image_size
+    # Dark modules are 0 (black) and light modules are 1 (white) in a 1-bit grayscale image,
+    # so a row's "0"/"1" string only has to be swapped and stretched
+    stretch = str.maketrans({"0": "1" * scale, "1": "0" * scale})
+    light_border = "1" * (border * scale)
+
+    light_line = _FILTER_NONE + (((1 << image_size) - 1) << padding_bits).to_bytes(row_byte_count, "big")
+    for _ in range(border * scale):
+        yield light_line
+
+    for row in range(matrix.size):
+        bits = light_border + matrix.row_string(row).translate(stretch) + light_border
+        line = _FILTER_NONE + (int(bits, 2) << padding_bits).to_bytes(row_byte_count, "big")
+        for _ in range(scale):
+            yield line
+
+    for _ in range(border * scale):
+        yield light_line
+
+
+def write_png(matrix: ModuleMatrix, stream: BinaryIO, scale: int = 1, border: int = 4) -> int:
+    # Writes matrix to stream as a 1-bit grayscale PNG and returns the number of bytes written.
+    # Scanlines are compressed as they are made, so the full resolution image is never held in memory.
+    # Options are checked before anything is written, so bad ones leave stream untouched
+    check_options(scale, border)
+    image_size = get_image_size(matrix, scale, border)
+    stream.write(PNG_SIGNATURE)
+    written = len(PNG_SIGNATURE)
+    header = struct.pack(">IIBBBBB", image_size, image_size, BIT_DEPTH, COLOR_TYPE_GRAYSCALE, 0, 0, 0)
+    written += _write_chunk(stream, b"IHDR", header)
+
+    compressor = zlib.compressobj(9)
+    pending = bytearray()
+    for scanline in iter_scanlines(matrix, scale, border):
+        pending += compressor.compress(scanline)
+        if len(pending) >= IDAT_CHUNK_SIZE:
+            written += _write_chunk(stream, b"IDAT", bytes(pending))
+            pending.clear()
+    pending += compressor.flush()
+    written += _write_chunk(stream, b"IDAT", bytes(pending))
+
+    written += _write_chunk(stream, b"IEND", b"")
+    return written
+
+
+def _write_chunk(stream: BinaryIO, chunk_type: bytes, data: bytes) -> int:
+    # Length, type, data, then a CRC over the type and data
+    stream.write(struct.pack(">I", len(data)))
+    stream.write(chunk_type)
+    stream.write(data)
+    stream.write(struct.pack(">I", zlib.crc32(data, zlib.crc32(chunk_type))))
+    return 12 + len(data)
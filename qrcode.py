@@ -1,29 +1,45 @@
 from abc import ABC, abstractmethod
-from math import ceil, floor
+from collections.abc import Callable, Iterator
+from io import BytesIO
+from math import ceil
 import os
-import re
-from typing import overload, override
-
-from encoding import ENCODING, lookup_alphanumeric_value
-from PIL import Image
+from typing import TYPE_CHECKING, BinaryIO, overload, override
 
 from anchor_position import AnchorPosition
-from color import BLACK, GREEN, WHITE
+from bit_buffer import BitBuffer
+from color import BLACK, WHITE
 from constants import alignment_patterns_locations
 from encoding import (
+    CHARACTER_COUNT_INDICATOR_BRACKETS,
+    ERROR_CORRECTION_INDEX,
+    CharacterCountOverflowError,
     CodewordBlockInformation,
-    encode,
+    encode_to_buffer,
+    find_minimum_version,
+    generate_most_efficient_modes,
     get_codeword_block_information,
     get_data_bit_capacity,
     get_data_codeword_capacity,
 )
 from error_correction import ErrorCorrection
-from mask_pattern import MaskPattern
+from instrumentation import get_hooks, stage
+from mask_pattern import get_data_mask_bitplanes
+from mask_selection import place_format_information, select_best_mask
 from mode import Mode
-from polynomials import generate_error_correction_codewords, generate_message_polynomial
+from module_matrix import ModuleMatrix
+from penalty import evaluate_penalties
 from qrcode_drawer import QRCodeDrawer
-from square import Square
-from utils import bose_chaudhuri_hocquenghem, golay, interleave, to_color
+from reed_solomon import generate_error_correction_bytes
+from template_cache import function_pattern_templates
+from utils import golay, interleave, to_color
+
+# Renderers, the symbol cache and concurrent.futures are imported where they are used, so importing
+# this module only loads what generate() needs
+if TYPE_CHECKING:
+    from concurrent.futures import Executor
+
+    from symbol_cache import CachedSymbol, SymbolStore
+    from text_renderer import TextStyle
 
 # TODO: Have this QRCode class be no frills, then make a SimpleQRCode subclass which does lots of the stuff for you
 
@@ -49,35 +65,134 @@ from utils import bose_chaudhuri_hocquenghem, golay, interleave, to_color
 class AbstractQRCode(ABC):
     _version: int | None = None
     size: int | None = None
-    error_correction_level: ErrorCorrection | None = None
+    _error_correction_level: ErrorCorrection | None = None
     _mask_pattern: int | None = None
-    matrix: list[list[Square]] = [[]]
+    # What version, error correction level and mask pattern were set to. generate() picks the ones that are None,
+    # and with an automatic version the error correction level is the minimum
+    _requested_version: int | None = None
+    _requested_error_correction_level: ErrorCorrection | None = None
+    _requested_mask_pattern: int | None = None
+    matrix: ModuleMatrix
     drawer: QRCodeDrawer | None = None
+    mask_executor: "Executor | None" = None
+    mask_early_exit: bool = False
+    boost_error_correction: bool = False
+    # Intermediate images are only written to disk when a folder is given
+    debug_output_folder: str | None = None
+    # Penalties of every mask from the last mask search, None for masks skipped by early exit
+    mask_penalties: list[tuple[int, int, int, int] | None] | None = None
+    # Opt-in cache of finished codes (and their renders) shared between instances
+    symbol_cache: "SymbolStore | None" = None
+    # Key of the cached symbol the matrix came from or was stored as, for caching renders
+    _symbol_key: bytes | None = None
 
     def __init__(
         self,
         version: int | None = None,
         error_correction_level: ErrorCorrection | None = None,
         mask_pattern: int | None = None,
+        mask_executor: "Executor | None" = None,
+        mask_early_exit: bool = False,
+        boost_error_correction: bool = False,
+        debug_output_folder: str | None = None,
+        symbol_cache: "SymbolStore | None" = None,
     ):
         self.version = version
         # size is automatically set when version is updated
         self.error_correction_level = error_correction_level
+        # Only used with an automatic version. Raises the error correction level as far as the chosen version still fits the data
+        self.boost_error_correction = boost_error_correction
+        self.debug_output_folder = debug_output_folder
         self.mask_pattern = mask_pattern
+        # Only used when the mask pattern is chosen automatically. Early exit only applies to the
+        # sequential search, so it cannot be combined with an executor
+        if mask_executor is not None and mask_early_exit:
+            raise ValueError("Cannot use mask_early_exit with a mask_executor. Early exit only applies to the sequential mask search")
+        self.mask_executor = mask_executor
+        self.mask_early_exit = mask_early_exit
+        self.mask_penalties = None
+        self.symbol_cache = symbol_cache
+        self._symbol_key = None
+        self.matrix = ModuleMatrix(0)
 
     def generate(self) -> None:
-        self._generate_matrix()
-        self.drawer = QRCodeDrawer(self.matrix)
-        self._add_finder_patterns()
-        self._add_separators()
-        self._add_alignment_patterns()
-        self._add_timing_patterns()
-        self._add_dark_module()
-        self._reserve_format_information_area()
-        self._add_version_information_area()
-        self._add_data()
-        self._add_data_mask()
-        self._add_format_information_area()
+        if self.symbol_cache is not None:
+            self._generate_with_cache(self.symbol_cache)
+            return
+        self._generate()
+
+    def _generate(self) -> None:
+        # Each step is a stage, which is only timed and reported when hooks are registered
+        hooks = get_hooks()
+        self._reset_choices()
+        if self.auto_version:
+            with stage("version", hooks=hooks) as record:
+                self._select_version()
+                record.version = self.version
+                record.error_correction_level = self.error_correction_level
+
+        with stage("patterns", self.version, self.error_correction_level, hooks):
+            self._add_function_patterns()
+
+        with stage("encode", self.version, self.error_correction_level, hooks) as record:
+            data = self._encode_data()
+            record.details["data_codewords"] = len(data)
+
+        with stage("reed_solomon", self.version, self.error_correction_level, hooks):
+            bit_stream = self._add_error_correction(data)
+
+        with stage("placement", self.version, self.error_correction_level, hooks) as record:
+            self._place_data(bit_stream)
+            record.details["bits"] = len(bit_stream)
+
+        with stage("mask_search", self.version, self.error_correction_level, hooks) as record:
+            self._add_data_mask()
+            record.details["mask_pattern"] = self.mask_pattern
+            # None when the mask pattern was given instead of searched for
+            record.details["penalties"] = self.mask_penalties
+
+        with stage("format_information", self.version, self.error_correction_level, hooks):
+            self._add_format_information_area()
+
+    def _generate_with_cache(self, cache: "SymbolStore") -> None:
+        from symbol_cache import CachedSymbol
+
+        # The key is taken before generating, since generating fills in an automatic version and mask
+        key = self.symbol_key()
+        cached = cache.get(key)
+        if cached is None:
+            self._generate()
+            assert self.version is not None and self.error_correction_level is not None and self.mask_pattern is not None
+            cache.put(key, CachedSymbol.from_matrix(self.matrix, self.version, self.error_correction_level, self.mask_pattern))
+        else:
+            self._restore_symbol(cached)
+        self._symbol_key = key
+
+    def _restore_symbol(self, cached: "CachedSymbol") -> None:
+        self._set_version(cached.version)
+        self._error_correction_level = cached.error_correction_level
+        self._mask_pattern = cached.mask_pattern
+        self.mask_penalties = None
+        # The template brings back which modules are function patterns, the rows bring back their colors
+        self._add_function_patterns()
+        self.matrix.rows = cached.unpack_rows()
+
+    def symbol_key(self) -> bytes:
+        # Identifies what generate() would make from the current data and settings
+        from symbol_cache import make_symbol_key
+
+        return make_symbol_key(
+            type(self).__name__,
+            self._symbol_key_data(),
+            self._requested_version,
+            self._requested_error_correction_level,
+            self.boost_error_correction,
+            self._requested_mask_pattern,
+        )
+
+    @abstractmethod
+    def _symbol_key_data(self) -> object:
+        pass
 
     @property
     def version(self) -> int | None:
@@ -85,6 +200,10 @@ class AbstractQRCode(ABC):
 
     @version.setter
     def version(self, version: int | None) -> None:
+        self._set_version(version)
+        self._requested_version = version
+
+    def _set_version(self, version: int | None) -> None:
         if version is None:
             self._version = version
             self.size = None
@@ -94,6 +213,20 @@ class AbstractQRCode(ABC):
         else:
             raise ValueError(f"Cannot set version. {version} is an invalid version number.")
 
+    @property
+    def auto_version(self) -> bool:
+        # Pick the smallest version the data fits in on every generate
+        return self._requested_version is None
+
+    @property
+    def error_correction_level(self) -> ErrorCorrection | None:
+        return self._error_correction_level
+
+    @error_correction_level.setter
+    def error_correction_level(self, error_correction_level: ErrorCorrection | None) -> None:
+        self._error_correction_level = error_correction_level
+        self._requested_error_correction_level = error_correction_level
+
     @property
     def mask_pattern(self) -> int | None:
         return self._mask_pattern
@@ -106,12 +239,41 @@ class AbstractQRCode(ABC):
             self._mask_pattern = mask_pattern
         else:
             raise ValueError(f"Cannot set mask pattern {mask_pattern}. Expected to be None (auto) or an integer 0-7")
+        self._requested_mask_pattern = mask_pattern
+
+    def _reset_choices(self) -> None:
+        # Goes back to the settings as they were set, dropping the version, boosted level and mask the last generate picked
+        self._set_version(self._requested_version)
+        self._error_correction_level = self._requested_error_correction_level
+        self._mask_pattern = self._requested_mask_pattern
+        self.mask_penalties = None
+
+    def _add_function_patterns(self) -> None:
+        if self.version is None:
+            raise ValueError("Cannot add function patterns when version is None")
+
+        # Function patterns only depend on the version, so they are drawn once and copied afterwards
+        template = function_pattern_templates.get(self.version, self._draw_function_patterns)
+        self.matrix = template.copy()
+        self.drawer = QRCodeDrawer(self.matrix)
+
+    def _draw_function_patterns(self) -> ModuleMatrix:
+        self._generate_matrix()
+        self.drawer = QRCodeDrawer(self.matrix)
+        self._add_finder_patterns()
+        self._add_separators()
+        self._add_alignment_patterns()
+        self._add_timing_patterns()
+        self._add_dark_module()
+        self._reserve_format_information_area()
+        self._add_version_information_area()
+        return self.matrix.copy()
 
     def _generate_matrix(self) -> None:
         if self.size is None:
             raise ValueError(f"Cannot initialize a matrix with version {self.version}")
 
-        self.matrix = [[Square() for _ in range(self.size)] for _ in range(self.size)]
+        self.matrix = ModuleMatrix(self.size)
 
     def _add_finder_patterns(self) -> None:
         if self.drawer is None:
@@ -181,7 +343,7 @@ class AbstractQRCode(ABC):
                 )
 
     def _check_overlap_exists(self, row: int, col: int, radius: int) -> bool:
-        return self.matrix[row + radius][col - radius].is_locked() or self.matrix[row + radius][col + radius].is_locked() or self.matrix[row - radius][col - radius].is_locked() or self.matrix[row - radius][col + radius].is_locked()
+        return self.matrix.is_locked(row + radius, col - radius) or self.matrix.is_locked(row + radius, col + radius) or self.matrix.is_locked(row - radius, col - radius) or self.matrix.is_locked(row - radius, col + radius)
 
     def _add_timing_patterns(self):
         if self.version is None or self.size is None:
@@ -190,28 +352,31 @@ class AbstractQRCode(ABC):
             raise ValueError("Cannot run function without a drawer")
 
         for i in range(8, self.size - 8):
-            self.matrix[6][i].set_color(BLACK if i % 2 == 0 else WHITE).lock()
-            self.matrix[i][6].set_color(BLACK if i % 2 == 0 else WHITE).lock()
+            self.matrix.set_dark(6, i, i % 2 == 0)
+            self.matrix.lock(6, i)
+            self.matrix.set_dark(i, 6, i % 2 == 0)
+            self.matrix.lock(i, 6)
 
     def _add_dark_module(self):
-        self.matrix[(4 * self.version) + 9][8].set_color(BLACK).lock()
+        self.matrix.set_dark((4 * self.version) + 9, 8, True)
+        self.matrix.lock((4 * self.version) + 9, 8)
 
     def _reserve_format_information_area(self):
         for i in range(self.size - 8, self.size):
-            self.matrix[8][i].set_color(GREEN).reserve()
+            self.matrix.reserve(8, i)
             # Do not overwrite the dark module
             # Technically not needed since that square is locked
             if i == self.size - 8:
                 continue
-            self.matrix[i][8].set_color(GREEN).reserve()
+            self.matrix.reserve(i, 8)
 
         for i in range(6):
-            self.matrix[i][8].set_color(GREEN).reserve()
-            self.matrix[8][i].set_color(GREEN).reserve()
+            self.matrix.reserve(i, 8)
+            self.matrix.reserve(8, i)
 
-        self.matrix[7][8].set_color(GREEN).reserve()
-        self.matrix[8][7].set_color(GREEN).reserve()
-        self.matrix[8][8].set_color(GREEN).reserve()
+        self.matrix.reserve(7, 8)
+        self.matrix.reserve(8, 7)
+        self.matrix.reserve(8, 8)
 
     def _add_version_information_area(self):
         # According to https://upload.wikimedia.org/wikipedia/commons/4/45/QRCode-2-Structure.png version info is only required when version >= 7
@@ -243,54 +408,79 @@ class AbstractQRCode(ABC):
         self.drawer.place_artifact(version_artifact, AnchorPosition.TOP_LEFT, padding_row=self.size - 11)
 
     @abstractmethod
-    def _make_data_stream(self) -> str:
+    def _make_data_stream(self, version: int) -> BitBuffer:
         pass
 
+    def _select_version(self) -> None:
+        # MEDIUM is 0, so this has to check for None explicitly
+        minimum_level = ErrorCorrection.LOW if self._requested_error_correction_level is None else self._requested_error_correction_level
+
+        # The data only has to be encoded once per character count indicator bracket
+        # instead of once per version
+        for versions in CHARACTER_COUNT_INDICATOR_BRACKETS:
+            try:
+                bit_count = len(self._make_data_stream(versions[0]))
+            except CharacterCountOverflowError:
+                # A segment that is too long for this bracket's character count indicator needs a bigger version
+                continue
+            version = find_minimum_version(bit_count, minimum_level, versions)
+            if version is not None:
+                break
+        else:
+            raise Exception(f"Too much data to be properly stored in any qrcode with error correction level {minimum_level.name}")
+
+        error_correction_level = minimum_level
+        if self.boost_error_correction:
+            # Levels are ordered from least to most recovery, so capacity only shrinks along the way
+            for level, index in ERROR_CORRECTION_INDEX.items():
+                if index > ERROR_CORRECTION_INDEX[minimum_level] and bit_count <= get_data_bit_capacity(version, level):
+                    error_correction_level = level
+
+        self._set_version(version)
+        self._error_correction_level = error_correction_level
+
     def _add_data(self):
+        self._place_data(self._add_error_correction(self._encode_data()))
+
+    def _encode_data(self) -> bytes:
         if self.version is None:
             raise Exception("Cannot add data when version is None")
         if self.size is None:
             raise Exception("Cannot add data when size is None")
         if self.error_correction_level is None:
             raise Exception("Cannot add data when error correction level is None")
-        # TODO: Likely in SimpleQRCode here is the algorithm for getting the best/most efficient mores https://gcore.jsdelivr.net/gh/tonycrane/tonycrane.github.io/p/409d352d/ISO_IEC18004-2015.pdf#C062021e.indd%3AAnnex%20sec_J%3A60&page=108
 
-        bit_stream: str = self._make_data_stream()
+        bit_stream: BitBuffer = self._make_data_stream(self.version)
 
         data_bit_capacity = get_data_bit_capacity(self.version, self.error_correction_level)
 
-        bit_stream = self._add_terminator(bit_stream, data_bit_capacity)
+        self._add_terminator(bit_stream, data_bit_capacity)
 
-        bit_stream = self._add_padding_bytes(bit_stream, data_bit_capacity)
+        self._add_padding_bytes(bit_stream, data_bit_capacity)
 
         if (len(bit_stream)) > get_data_bit_capacity(self.version, self.error_correction_level):
             raise Exception(f"Too much data to be properly stored in qrcode of version {self.version} with error correction level {self.error_correction_level.name}")
 
-        self._add_error_correction_code(bit_stream)
+        return bit_stream.to_bytes()
 
-    def _add_terminator(self, bit_stream: str, data_bit_capacity: int) -> str:
+    def _add_terminator(self, bit_stream: BitBuffer, data_bit_capacity: int) -> None:
         assert self.version is not None
         assert self.error_correction_level is not None
 
         # Fill out the terminator if required
         maximum_terminator_length: int = 4
-        terminator_required: int = min(data_bit_capacity, len(bit_stream) + maximum_terminator_length)
-        return bit_stream.ljust(terminator_required, "0")
+        terminator_length: int = min(maximum_terminator_length, data_bit_capacity - len(bit_stream))
+        if terminator_length > 0:
+            bit_stream.append(0, terminator_length)
 
-    def _add_padding_bytes(self, bit_stream: str, data_bit_capacity: int) -> str:
+    def _add_padding_bytes(self, bit_stream: BitBuffer, data_bit_capacity: int) -> None:
         # Fill out to the next full bit
-        if len(bit_stream) % 8 != 0:
-            next_multiple_of_8 = ceil(len(bit_stream) / 8) * 8
-            bit_stream = bit_stream.ljust(next_multiple_of_8, "0")
+        bit_stream.align_to_byte()
 
         # Padd with alternating "11101100" and "00010001"s
-        padding_bytes = ("11101100", "00010001")
-        i = 0
-        while len(bit_stream) < data_bit_capacity:
-            bit_stream += padding_bytes[i % 2]
-            i += 1
-
-        return bit_stream
+        padding_byte_count = (data_bit_capacity - len(bit_stream)) // 8
+        if padding_byte_count > 0:
+            bit_stream.append_bytes((b"\xec\x11" * ceil(padding_byte_count / 2))[:padding_byte_count])
 
     def _get_required_remainder_bits(self) -> int:
         if self.version is None:
@@ -310,62 +500,45 @@ class AbstractQRCode(ABC):
         else:
             return 0
 
-    def _add_error_correction_code(self, data_str: str) -> None:
+    def _add_error_correction(self, data: bytes) -> BitBuffer:
         if self.version is None or self.size is None:
             raise ValueError("Cannot run function while not setup")
-        if self.drawer is None:
-            raise ValueError("Cannot run function without a drawer")
 
         # If version is above 2, need to break data in multiple blocks
 
         cwblock_info: CodewordBlockInformation = get_codeword_block_information(self.version, self.error_correction_level)
 
         # TODO: I think here I exclude data that would push us over the edge, but I don't think that's good
-        # Split the data str into code words (8 bits)
-        codewords = re.findall(".{8}", data_str)
-
-        # Create 2 groups
-        group_1_full: list[str] = codewords[: cwblock_info.group_1.size()]
-        group_2_full: list[str] = codewords[cwblock_info.group_1.size() :]
-
-        group_1: list[list[str]] = []
-        # Split those groups into blocks
-        for i in range(cwblock_info.group_1.block_count):
-            group_1.append(group_1_full[: cwblock_info.group_1.codeword_count_per_block])
-            group_1_full = group_1_full[cwblock_info.group_1.codeword_count_per_block :]
+        # Split the data into blocks of codewords (bytes), group 1 blocks first
+        group_1_size = cwblock_info.group_1.codeword_count_per_block
+        group_1: list[bytes] = [data[i * group_1_size : (i + 1) * group_1_size] for i in range(cwblock_info.group_1.block_count)]
 
-        group_2: list[list[str]] = []
-        # Split those groups into blocks
-        for i in range(cwblock_info.group_2.block_count):
-            group_2.append(group_2_full[: cwblock_info.group_2.codeword_count_per_block])
-            group_2_full = group_2_full[cwblock_info.group_2.codeword_count_per_block :]
+        group_2_start = cwblock_info.group_1.size()
+        group_2_size = cwblock_info.group_2.codeword_count_per_block
+        group_2: list[bytes] = [data[group_2_start + i * group_2_size : group_2_start + (i + 1) * group_2_size] for i in range(cwblock_info.group_2.block_count)]
 
-        # This is new
+        group_1_ec = [generate_error_correction_bytes(block, cwblock_info.ec_codewords_per_block) for block in group_1]
+        group_2_ec = [generate_error_correction_bytes(block, cwblock_info.ec_codewords_per_block) for block in group_2]
 
-        group_1_message_polynomials = [generate_message_polynomial(block) for block in group_1]
-        group_2_message_polynomials = [generate_message_polynomial(block) for block in group_2]
-
-        group_1_ec = [generate_error_correction_codewords(mp_coeff, cwblock_info.ec_codewords_per_block).as_integers() for mp_coeff in group_1_message_polynomials]
-
-        group_2_ec = [generate_error_correction_codewords(mp_coeff, cwblock_info.ec_codewords_per_block).as_integers() for mp_coeff in group_2_message_polynomials]
-
-        interleaving_data: list[str] = interleave(group_1, group_2)
-        interleaving_ec_integers: list[int] = interleave(group_1_ec, group_2_ec)
-        interleaving_ec: list[str] = [bin(value)[2:].zfill(8) for value in interleaving_ec_integers]
-
-        bit_stream = "".join(interleaving_data) + "".join(interleaving_ec)
+        bit_stream = BitBuffer(bytes(interleave(group_1, group_2)))
+        bit_stream.append_bytes(bytes(interleave(group_1_ec, group_2_ec)))
 
         # Add remainder bits if required
-        bit_stream += "0" * self._get_required_remainder_bits()
+        bit_stream.append(0, self._get_required_remainder_bits())
+        return bit_stream
+
+    def _place_data(self, bit_stream: BitBuffer) -> None:
+        if self.drawer is None:
+            raise ValueError("Cannot run function without a drawer")
 
-        self.drawer.push_byte(bit_stream)
+        self.drawer.push_bits(bit_stream)
 
-        self.write_to_png(file_name="partial.png")
+        if self.debug_output_folder is not None:
+            self.write_to_png(file_name="partial.png", destination_folder=self.debug_output_folder)
 
     def _add_data_mask(self):
         if self.mask_pattern is None:
-            best_mask = self._determine_best_data_mask()
-            self.mask_pattern = best_mask
+            self._mask_pattern = self._determine_best_data_mask()
 
         self._apply_data_mask()
 
@@ -393,40 +566,21 @@ class AbstractQRCode(ABC):
         # self.mask_pattern = 0b000
         # self._apply_data_mask()
 
-        mask_pattern_count = 8
-        scores: list[int] = []
-        for i in range(mask_pattern_count):
-            self.mask_pattern = i
-            # if i == 0:
-            #    self.write_to_png("partial.png")
-            self._apply_data_mask()
-            self._add_format_information_area()
-
-            penalty = self._evaluate_data_mask()
-            scores.append(penalty)
-            # Applying the mask again will "unapply" it
-            self._apply_data_mask()
+        if self.error_correction_level is None:
+            raise ValueError("Cannot determine a data mask without an error correction level")
 
-        best_score = min(scores)
-        best_mask = scores.index(best_score)
-        print(f"Determined best mask was {best_mask} with a score of {best_score}")
+        best_mask, scores = select_best_mask(self.matrix, self.error_correction_level, self.mask_executor, self.mask_early_exit)
+        self.mask_penalties = scores
         return best_mask
 
     def _apply_data_mask(self):
         if self.size is None:
             raise ValueError(f"Cannot apply data mask on qrcode of version {self.version}")
-        for row in range(self.size):
-            for col in range(self.size):
-                alternate_color = WHITE if self.matrix[row][col].get_color() == BLACK else BLACK
-
-                if self.matrix[row][col].is_reserved() or self.matrix[row][col].is_locked():
-                    continue
-
-                if self.mask_pattern is None:
-                    raise Exception("Cannot apply a None mask")
+        if self.mask_pattern is None:
+            raise Exception("Cannot apply a None mask")
 
-                if MaskPattern[self.mask_pattern](row, col):
-                    _ = self.matrix[row][col].set_color(alternate_color)
+        bitplanes = get_data_mask_bitplanes(self.size, tuple(self.matrix.reserved))
+        self.matrix.apply_mask(bitplanes[self.mask_pattern])
 
     def _add_format_information_area(self):
         if self.version is None or self.size is None:
@@ -436,225 +590,153 @@ class AbstractQRCode(ABC):
         if self.error_correction_level is None:
             raise ValueError("Cannot run function without an error correction level")
 
-        format_data: int = self.error_correction_level << 3
         if self.mask_pattern is None:
             raise Exception("A mask pattern has not yet been selected")
-        format_data |= self.mask_pattern
-
-        format_string = bose_chaudhuri_hocquenghem(format_data).zfill(15)
-
-        paths: list[list[list[int]]] = [
-            [
-                [8, 0],
-                [8, 1],
-                [8, 2],
-                [8, 3],
-                [8, 4],
-                [8, 5],
-                [8, 7],
-                [8, 8],
-                [7, 8],
-                [5, 8],
-                [4, 8],
-                [3, 8],
-                [2, 8],
-                [1, 8],
-                [0, 8],
-            ],
-            [
-                [self.size - 1, 8],
-                [self.size - 2, 8],
-                [self.size - 3, 8],
-                [self.size - 4, 8],
-                [self.size - 5, 8],
-                [self.size - 6, 8],
-                [self.size - 7, 8],
-                [8, self.size - 8],
-                [8, self.size - 7],
-                [8, self.size - 6],
-                [8, self.size - 5],
-                [8, self.size - 4],
-                [8, self.size - 3],
-                [8, self.size - 2],
-                [8, self.size - 1],
-            ],
-        ]
 
-        for path in paths:
-            for i in range(len(format_string)):
-                if i >= len(path):
-                    break
-                row, col = path[i]
-                _ = self.matrix[row][col].set_color(to_color(format_string[i]))
+        place_format_information(self.matrix, self.error_correction_level, self.mask_pattern)
 
     def _evaluate_data_mask(self):
-        penalty_1 = self._evaluation_condition_1()
-        penalty_2 = self._evaluation_condition_2()
-        penalty_3 = self._evaluation_condition_3()
-        penalty_4 = self._evaluation_condition_4()
-        total_penalty = penalty_1 + penalty_2 + penalty_3 + penalty_4
-
-        return total_penalty
-
-    def _evaluation_condition_1(self):
-        penalty = 0
-        transpose_matrix: list[list[Square]] = [values for values in zip(*self.matrix)]
-        for matrix in [self.matrix, transpose_matrix]:
-            for row in matrix:
-                count = 0
-                prev_cell = None
-                for cell in row:
-                    if cell == prev_cell:
-                        count += 1
-                    else:
-                        count = 1
-                        prev_cell = cell
-
-                    if count == 5:
-                        penalty += 3
-                    elif count > 5:
-                        penalty += 1
-
-        print(f"Penalty condition 1 is {penalty}")
-
-        return penalty
-
-    def _evaluation_condition_2(self):
-        penalty = 0
-        for row in range(len(self.matrix) - 1):
-            for col in range(len(self.matrix[0]) - 1):
-                cells = [
-                    self.matrix[row + 0][col + 0],
-                    self.matrix[row + 0][col + 1],
-                    self.matrix[row + 1][col + 0],
-                    self.matrix[row + 1][col + 1],
-                ]
-                if all(cell == cells[0] for cell in cells):
-                    penalty += 3
-
-        print(f"Penalty condition 2 is {penalty}")
-
-        return penalty
-
-    def _evaluation_condition_3(self):
-        window_size = 11
-        penalty = 0
-        transpose_matrix = [list(values) for values in zip(*self.matrix)]
-        match_patterns = [
-            [
-                BLACK,
-                WHITE,
-                BLACK,
-                BLACK,
-                BLACK,
-                WHITE,
-                BLACK,
-                WHITE,
-                WHITE,
-                WHITE,
-                WHITE,
-            ],
-            [
-                WHITE,
-                WHITE,
-                WHITE,
-                WHITE,
-                BLACK,
-                WHITE,
-                BLACK,
-                BLACK,
-                BLACK,
-                WHITE,
-                BLACK,
-            ],
-        ]
-        for matrix in [self.matrix, transpose_matrix]:
-            for row in matrix:
-                for col in range(len(row) + 1 - window_size):
-                    window = row[col : col + window_size]
-                    if window in match_patterns:
-                        penalty += 40
-
-        print(f"Penalty condition 3 is {penalty}")
-
-        return penalty
-
-    def _evaluation_condition_4(self):
-        total_cells = len(self.matrix) * len(self.matrix[0])
-        dark_cell_count = 0
-        for row in self.matrix:
-            for cell in row:
-                if cell == BLACK:
-                    dark_cell_count += 1
-        percentage_dark = (float(dark_cell_count) / total_cells) * 100
-        prev_multiple_of_5 = floor(percentage_dark / 5.0) * 5
-        next_multiple_of_5 = ceil(percentage_dark / 5.0) * 5
-        prev_multiple_of_5 = abs(prev_multiple_of_5 - 50)
-        next_multiple_of_5 = abs(next_multiple_of_5 - 50)
-        # Both should already be integers
-        prev_multiple_of_5 = int(prev_multiple_of_5 / 5)
-        next_multiple_of_5 = int(next_multiple_of_5 / 5)
-        penalty = min(prev_multiple_of_5, next_multiple_of_5)
-
-        print(f"Penalty condition 4 is {penalty}")
-        return penalty
-
-    def write_to_png(self, file_name: str | None = None, destination_folder: str | None = None, border: int = 4) -> None:
+        return sum(evaluate_penalties(self.matrix.rows, self.matrix.size))
+
+    def write_png(self, stream: BinaryIO, scale: int = 1, border: int = 4) -> int:
+        # Writes to any binary file-like object and returns the number of bytes written
         if self.version is None or self.size is None:
             raise ValueError("Cannot run function while not setup")
+        from png_writer import write_png
 
-        destination_folder = destination_folder or "out"
-        file_name = file_name or "qrcode.png"
-        file_path = os.path.join(destination_folder, file_name)
+        return self._render("render.png", write_png, stream, scale, border)
+
+    def to_png_bytes(self, scale: int = 1, border: int = 4) -> bytes:
+        stream = BytesIO()
+        self.write_png(stream, scale=scale, border=border)
+        return stream.getvalue()
+
+    def write_svg(self, stream: BinaryIO, scale: int = 1, border: int = 4) -> int:
+        if self.version is None or self.size is None:
+            raise ValueError("Cannot run function while not setup")
+        from vector_renderer import write_svg
+
+        return self._render("render.svg", write_svg, stream, scale, border)
+
+    def to_svg(self, scale: int = 1, border: int = 4) -> str:
+        stream = BytesIO()
+        self.write_svg(stream, scale=scale, border=border)
+        return stream.getvalue().decode("ascii")
 
-        img = Image.new(mode="RGBA", size=(self.size + 2 * border, self.size + 2 * border))
-        pixels = img.load()
+    def iter_text_lines(self, style: "TextStyle | None" = None, border: int = 4) -> Iterator[str]:
+        # Lines without newlines, so they can be streamed to stdout one at a time. Half blocks by default
+        if self.version is None or self.size is None:
+            raise ValueError("Cannot run function while not setup")
+        from text_renderer import TextStyle, iter_text_lines
 
-        if pixels is None:
-            raise Exception("Unable to create image")
+        return iter_text_lines(self.matrix, TextStyle.HALF_BLOCK if style is None else style, border)
 
-        for row in range(self.size + 2 * border):
-            for col in range(self.size + 2 * border):
-                pixels[col, row] = WHITE
+    def to_text(self, style: "TextStyle | None" = None, border: int = 4) -> str:
+        return "\n".join(self.iter_text_lines(style, border))
+
+    def write_pdf(self, stream: BinaryIO, scale: int = 1, border: int = 4) -> int:
+        if self.version is None or self.size is None:
+            raise ValueError("Cannot run function while not setup")
+        from vector_renderer import write_pdf
+
+        return self._render("render.pdf", write_pdf, stream, scale, border)
+
+    def _render(self, name: str, writer: Callable[[ModuleMatrix, BinaryIO, int, int], int], stream: BinaryIO, scale: int, border: int) -> int:
+        cache = self.symbol_cache
+        if cache is None or not cache.cache_renders or self._symbol_key is None:
+            return self._run_render(name, writer, stream, scale, border)
+
+        render_key = (name, scale, border)
+        data = cache.get_render(self._symbol_key, render_key)
+        if data is None:
+            buffer = BytesIO()
+            self._run_render(name, writer, buffer, scale, border)
+            data = buffer.getvalue()
+            cache.put_render(self._symbol_key, render_key, data)
+        stream.write(data)
+        return len(data)
+
+    def _run_render(self, name: str, writer: Callable[[ModuleMatrix, BinaryIO, int, int], int], stream: BinaryIO, scale: int, border: int) -> int:
+        hooks = get_hooks()
+        if not hooks:
+            return writer(self.matrix, stream, scale, border)
+
+        with stage(name, self.version, self.error_correction_level, hooks) as record:
+            written = writer(self.matrix, stream, scale, border)
+            record.details["bytes"] = written
+        return written
+
+    def write_to_png(self, file_name: str | None = None, destination_folder: str | None = None, border: int = 4, scale: int = 1) -> None:
+        if self.version is None or self.size is None:
+            raise ValueError("Cannot run function while not setup")
 
-        for row in range(self.size):
-            for col in range(self.size):
-                pixels[col + border, row + border] = self.matrix[row][col].get_color()
+        destination_folder = destination_folder or "out"
+        file_name = file_name or "qrcode.png"
+        file_path = os.path.join(destination_folder, file_name)
 
         if os.path.exists(destination_folder) and not os.path.isdir(destination_folder):
             raise Exception(f"Destination folder ({destination_folder}) appears to be a file. It must be deleted or destionation_folder must be changed so a folder can be created")
         elif os.path.exists(file_path) and not os.path.isfile(file_path):
             raise Exception(f"Destination path ({file_path}) appears to be a directory. It must be deleted or either destination_folder or file_name must be changed so a file can be created")
 
+        # Checked before the file is created, so bad options do not leave an empty or partial file behind
+        from png_writer import check_options
+
+        check_options(scale, border)
+
         if not os.path.exists(destination_folder):
             os.mkdir(destination_folder)
 
-        img.save(file_path)
+        with open(file_path, "wb") as file:
+            self.write_png(file, scale=scale, border=border)
 
     @override
     def __str__(self) -> str:
-        rows: list[str] = []
-        for row in self.matrix:
-            rows.append("".join([str(v) for v in row]))
-        return "".join(rows)
+        return str(self.matrix)
 
 
 class DetailedQRCode(AbstractQRCode):
-    data: list[tuple[Mode, str]] = []
+    # Set per instance, a list default on the class would be shared by every code
+    data: list[tuple[Mode, str]]
+
+    def __init__(
+        self,
+        version: int | None = None,
+        error_correction_level: ErrorCorrection | None = None,
+        mask_pattern: int | None = None,
+        mask_executor: "Executor | None" = None,
+        mask_early_exit: bool = False,
+        boost_error_correction: bool = False,
+        debug_output_folder: str | None = None,
+        symbol_cache: "SymbolStore | None" = None,
+    ):
+        super().__init__(
+            version=version,
+            error_correction_level=error_correction_level,
+            mask_pattern=mask_pattern,
+            mask_executor=mask_executor,
+            mask_early_exit=mask_early_exit,
+            boost_error_correction=boost_error_correction,
+            debug_output_folder=debug_output_folder,
+            symbol_cache=symbol_cache,
+        )
+        self.data = []
 
     def add_data(self, data: str, mode: Mode) -> None:
         self.data.append((mode, data))
 
     @override
-    def _make_data_stream(self) -> str:
-        if self.version is None:
-            raise Exception("Cannot make data stream with None version")
-        bit_stream = ""
+    def _make_data_stream(self, version: int) -> BitBuffer:
+        bit_stream = BitBuffer()
         for mode, data in self.data:
             # TODO: Implement all other string types and do some checking for data length/type
-            bit_stream += encode(data, self.version, mode)
+            encode_to_buffer(data, version, mode, bit_stream)
         return bit_stream
 
+    @override
+    def _symbol_key_data(self) -> object:
+        return [[mode.name, data] for mode, data in self.data]
+
 
 class SimpleQRCode(AbstractQRCode):
     data: str = ""
@@ -663,27 +745,15 @@ class SimpleQRCode(AbstractQRCode):
         self.data += data
 
     @override
-    def _make_data_stream(self) -> str:
-        if self.version is None:
-            raise Exception("Cannot make data stream with None version")
-
-        mode: Mode
+    def _make_data_stream(self, version: int) -> BitBuffer:
+        bit_stream = BitBuffer()
+        for mode, data in generate_most_efficient_modes(self.data, version):
+            encode_to_buffer(data, version, mode, bit_stream)
+        return bit_stream
 
-        try:
-            [lookup_alphanumeric_value(v) for v in self.data]
-            mode = Mode.ALPHANUMERIC
-        except Exception:
-            try:
-                _ = self.data.encode(ENCODING.LATIN1)
-                mode = Mode.BINARY
-            except Exception:
-                try:
-                    _ = self.data.encode(ENCODING.SHIFTJIS)
-                    mode = Mode.KANJI
-                except Exception:
-                    raise Exception('No valid encoding scheme found for "{self.data}"')
-
-        return encode(self.data, self.version, mode)
+    @override
+    def _symbol_key_data(self) -> object:
+        return self.data
 
 
 if __name__ == "__main__":
@@ -1,23 +1,21 @@
+from collections.abc import Iterable
+from functools import lru_cache
+
 from anchor_position import AnchorPosition
-from square import Square
-from utils import to_color
+from bit_buffer import BitBuffer
+from module_matrix import ModuleMatrix
 
 
 class QRCodeDrawer:
-    row: int
-    col: int
-    # By default, you start in bottom right so are going up and left
-    is_going_up: bool = True
-    is_right: bool = True
-
-    matrix: list[list[Square]]
+    matrix: ModuleMatrix
     size: int
+    # How many data modules have been written so far, as an index into get_data_module_positions
+    position: int
 
-    def __init__(self, matrix: list[list[Square]]):
+    def __init__(self, matrix: ModuleMatrix):
         self.matrix = matrix
-        self.size = len(self.matrix)
-        self.row = self.size - 1
-        self.col = self.size - 1
+        self.size = matrix.size
+        self.position = 0
 
     def place_artifact(
         self,
@@ -57,46 +55,70 @@ class QRCodeDrawer:
                 current_color: tuple[int, int, int] | None = artifact[row][col]
                 if current_color is None:
                     continue
-                self.matrix[row + row_offset][col + column_offset].set_color(
-                    current_color
-                ).lock()
+                self.matrix.set_color(row + row_offset, col + column_offset, current_color)
+                self.matrix.lock(row + row_offset, col + column_offset)
 
     def push_byte(self, byte_data: str) -> None:
-        # print("Pushing byte...")
-        bit_arr = list(byte_data)
-
-        while len(bit_arr) > 0:
-            if (
-                not self.matrix[self.row][self.col].is_locked()
-                and not self.matrix[self.row][self.col].is_reserved()
-            ):
-                _ = self.matrix[self.row][self.col].set_color(to_color(bit_arr.pop(0)))
-                # print("setting color", self.matrix[row][col].get_color())
-
-            if self.is_right:
-                self.col -= 1
+        self._scatter((1 if value == "1" else 0 for value in byte_data), len(byte_data))
+
+    def push_bits(self, bit_stream: BitBuffer) -> None:
+        self._scatter(bit_stream.iter_bits(), len(bit_stream))
+
+    def _scatter(self, bits: Iterable[int], bit_count: int) -> None:
+        positions = get_data_module_positions(self.size, tuple(self.matrix.reserved))
+        end = self.position + bit_count
+        if end > len(positions):
+            raise Exception("Trying to write off of the map")
+
+        # Gather the bits per row first, then write every row once
+        written = [0] * self.size
+        dark = [0] * self.size
+        for (row, bit), value in zip(positions[self.position : end], bits):
+            written[row] |= bit
+            if value:
+                dark[row] |= bit
+        self.matrix.rows = [(current & ~w) | d for current, w, d in zip(self.matrix.rows, written, dark)]
+        self.position = end
+
+
+@lru_cache(maxsize=64)
+def get_data_module_positions(size: int, reserved: tuple[int, ...]) -> tuple[tuple[int, int], ...]:
+    # Every module that can hold data, in the order data is placed, as (row, row bitset with only that column set)
+    positions: list[tuple[int, int]] = []
+    # By default, you start in bottom right so are going up and left
+    row = size - 1
+    col = size - 1
+    is_going_up = True
+    is_right = True
+
+    while col >= 0:
+        bit = 1 << (size - 1 - col)
+        if reserved[row] & bit == 0:
+            positions.append((row, bit))
+
+        if is_right:
+            col -= 1
+        else:
+            col += 1
+            if is_going_up:
+                row -= 1
             else:
-                self.col += 1
-                if self.is_going_up:
-                    self.row -= 1
-                else:
-                    self.row += 1
-
-            self.is_right = not self.is_right
-
-            if self.row < 0:
-                self.row = 0
-                self.col -= 2
-                self.is_going_up = not self.is_going_up
-            elif self.row >= self.size:
-                self.row = self.size - 1
-                self.col -= 2
-                self.is_going_up = not self.is_going_up
-
-            # Column 6 is a special case with no usable space, so skip it
-            # https://www.thonky.com/qr-code-tutorial/module-placement-matrix > "Exception: Vertical Timing Pattern"
-            if self.col == 6:
-                self.col -= 1
-
-            if self.col < 0:
-                raise Exception("Trying to write off of the map")
+                row += 1
+
+        is_right = not is_right
+
+        if row < 0:
+            row = 0
+            col -= 2
+            is_going_up = not is_going_up
+        elif row >= size:
+            row = size - 1
+            col -= 2
+            is_going_up = not is_going_up
+
+        # Column 6 is a special case with no usable space, so skip it
+        # https://www.thonky.com/qr-code-tutorial/module-placement-matrix > "Exception: Vertical Timing Pattern"
+        if col == 6:
+            col -= 1
+
+    return tuple(positions)
@@ -0,0 +1,113 @@
+from collections.abc import Iterable
+import os
+from threading import Lock
+
+from encoding import get_codeword_block_information
+from error_correction import ErrorCorrection
+
+# https://www.arscreatio.com/repositorio/images/n_23/SC031-N-1915-18004Text.pdf#page=45
+PRIMITIVE_POLYNOMIAL: int = 0b100011101
+
+
+def _generate_log_antilog_tables() -> tuple[bytes, bytes]:
+    antilog = bytearray(512)
+    log = bytearray(256)
+    value = 1
+    for power in range(255):
+        antilog[power] = value
+        log[value] = power
+        value <<= 1
+        if value >= 256:
+            value ^= PRIMITIVE_POLYNOMIAL
+
+    # Doubling the antilog table means a product of two logs never needs a modulo 255
+    antilog[255:510] = antilog[0:255]
+
+    return bytes(antilog), bytes(log)
+
+
+ANTILOG_TABLE, LOG_TABLE = _generate_log_antilog_tables()
+
+
+def gf_multiply(a: int, b: int) -> int:
+    if a == 0 or b == 0:
+        return 0
+    return ANTILOG_TABLE[LOG_TABLE[a] + LOG_TABLE[b]]
+
+
+def generate_generator_polynomial(codeword_count: int) -> bytes:
+    # Coefficients of (x - a^0)(x - a^1)...(x - a^(n-1)), highest power first
+    polynomial = bytearray([1])
+    for i in range(codeword_count):
+        root = ANTILOG_TABLE[i]
+        product = bytearray(len(polynomial) + 1)
+        for j, coefficient in enumerate(polynomial):
+            product[j] ^= coefficient
+            product[j + 1] ^= gf_multiply(coefficient, root)
+        polynomial = product
+    return bytes(polynomial)
+
+
+class GeneratorPolynomial:
+    codeword_count: int
+    coefficients: bytes
+    # feedback_table[f] is the generator (without its leading term) multiplied by f, packed big-endian into an int
+    feedback_table: tuple[int, ...]
+
+    def __init__(self, codeword_count: int):
+        self.codeword_count = codeword_count
+        self.coefficients = generate_generator_polynomial(codeword_count)
+        tail = self.coefficients[1:]
+        self.feedback_table = tuple(int.from_bytes(bytes(gf_multiply(factor, c) for c in tail), "big") for factor in range(256))
+
+
+class GeneratorPolynomialRegistry:
+    _polynomials: dict[int, GeneratorPolynomial]
+    _lock: Lock
+
+    def __init__(self, preload: bool = False):
+        self._polynomials = {}
+        self._lock = Lock()
+        if preload:
+            self.preload()
+
+    def get(self, codeword_count: int) -> GeneratorPolynomial:
+        polynomial = self._polynomials.get(codeword_count)
+        if polynomial is not None:
+            return polynomial
+
+        with self._lock:
+            # Another thread may have built it while we were waiting on the lock
+            polynomial = self._polynomials.get(codeword_count)
+            if polynomial is None:
+                polynomial = GeneratorPolynomial(codeword_count)
+                self._polynomials[codeword_count] = polynomial
+        return polynomial
+
+    def preload(self, codeword_counts: Iterable[int] | None = None) -> None:
+        if codeword_counts is None:
+            codeword_counts = {get_codeword_block_information(version, ec_level).ec_codewords_per_block for version in range(1, 41) for ec_level in ErrorCorrection}
+        for codeword_count in codeword_counts:
+            _ = self.get(codeword_count)
+
+    def __contains__(self, codeword_count: int) -> bool:
+        return codeword_count in self._polynomials
+
+    def __len__(self) -> int:
+        return len(self._polynomials)
+
+
+# Shared by every encoder and thread. Set QRCODE_PRELOAD_GENERATOR_POLYNOMIALS=1 to build them all at import
+generator_polynomials = GeneratorPolynomialRegistry(preload=os.environ.get("QRCODE_PRELOAD_GENERATOR_POLYNOMIALS") == "1")
+
+
+def generate_error_correction_bytes(data: Iterable[int], codeword_count: int) -> bytes:
+    # Remainder of data(x) * x^n / generator(x), computed as a linear feedback shift register
+    # whose n byte register is held in a single int
+    feedback_table = generator_polynomials.get(codeword_count).feedback_table
+    shift = 8 * (codeword_count - 1)
+    register_mask = (1 << (8 * codeword_count)) - 1
+    remainder = 0
+    for byte in data:
+        remainder = ((remainder << 8) & register_mask) ^ feedback_table[(remainder >> shift) ^ byte]
+    return remainder.to_bytes(codeword_count, "big")
@@ -1,4 +1,3 @@
-from turtle import color
 from typing import Any, override
 from color import BLACK, GRAY
 
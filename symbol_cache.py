@@ -0,0 +1,225 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from hashlib import sha256
+import json
+import sys
+from threading import Lock
+from typing import override
+
+from error_correction import ErrorCorrection
+from module_matrix import ModuleMatrix
+
+# Part of every key, so cached symbols from an older encoder are never reused after it changes
+SYMBOL_KEY_VERSION: int = 1
+
+# How a symbol was rendered: the stage name ("render.png", ...), scale and border
+RenderKey = tuple[str, int, int]
+
+
+def make_symbol_key(kind: str, data: object, version: int | None, error_correction_level: ErrorCorrection | None, boost_error_correction: bool, mask_pattern: int | None) -> bytes:
+    # A sha256 of everything that decides what a code looks like. data has to be JSON serializable
+    # (the payload string, or its segments as [mode, text] pairs), so the key is the same in every process
+    canonical = json.dumps(
+        [
+            SYMBOL_KEY_VERSION,
+            kind,
+            data,
+            version,
+            None if error_correction_level is None else error_correction_level.name,
+            boost_error_correction,
+            mask_pattern,
+        ],
+        ensure_ascii=False,
+        separators=(",", ":"),
+    )
+    return sha256(canonical.encode("utf-8")).digest()
+
+
+class CachedSymbol:
+    # A finished code: what generate() decided and the packed module rows, plus any renders of it
+    version: int
+    error_correction_level: ErrorCorrection
+    mask_pattern: int
+    size: int
+    # Every row as ceil(size / 8) big endian bytes, in the same bit order as ModuleMatrix rows
+    rows: bytes
+    renders: dict[RenderKey, bytes]
+
+    def __init__(self, version: int, error_correction_level: ErrorCorrection, mask_pattern: int, size: int, rows: bytes):
+        self.version = version
+        self.error_correction_level = error_correction_level
+        self.mask_pattern = mask_pattern
+        self.size = size
+        self.rows = rows
+        self.renders = {}
+
+    @classmethod
+    def from_matrix(cls, matrix: ModuleMatrix, version: int, error_correction_level: ErrorCorrection, mask_pattern: int) -> "CachedSymbol":
+        row_byte_count = (matrix.size + 7) // 8
+        rows = b"".join(row.to_bytes(row_byte_count, "big") for row in matrix.rows)
+        return cls(version, error_correction_level, mask_pattern, matrix.size, rows)
+
+    def unpack_rows(self) -> list[int]:
+        row_byte_count = (self.size + 7) // 8
+        return [int.from_bytes(self.rows[i : i + row_byte_count], "big") for i in range(0, len(self.rows), row_byte_count)]
+
+    def estimate_bytes(self) -> int:
+        return sys.getsizeof(self) + sys.getsizeof(self.rows) + sys.getsizeof(self.renders) + sum(sys.getsizeof(data) for data in self.renders.values())
+
+
+class SymbolStore(ABC):
+    # Where finished codes are looked up by generate() and renders by write_png, write_svg and write_pdf
+    cache_renders: bool
+
+    @abstractmethod
+    def get(self, key: bytes) -> CachedSymbol | None:
+        pass
+
+    @abstractmethod
+    def put(self, key: bytes, symbol: CachedSymbol) -> None:
+        pass
+
+    @abstractmethod
+    def get_render(self, key: bytes, render_key: RenderKey) -> bytes | None:
+        pass
+
+    @abstractmethod
+    def put_render(self, key: bytes, render_key: RenderKey, data: bytes) -> None:
+        pass
+
+
+class SymbolCache(SymbolStore):
+    # Finished codes by make_symbol_key, and optionally their rendered bytes. Least recently used
+    # symbols are dropped once everything takes more than max_bytes
+    max_bytes: int
+    hits: int
+    misses: int
+    render_hits: int
+    render_misses: int
+    evictions: int
+    _symbols: OrderedDict[bytes, tuple[CachedSymbol, int]]
+    _total_bytes: int
+    _lock: Lock
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, cache_renders: bool = True):
+        self.max_bytes = max_bytes
+        self.cache_renders = cache_renders
+        self.hits = 0
+        self.misses = 0
+        self.render_hits = 0
+        self.render_misses = 0
+        self.evictions = 0
+        self._symbols = OrderedDict()
+        self._total_bytes = 0
+        self._lock = Lock()
+
+    @override
+    def get(self, key: bytes) -> CachedSymbol | None:
+        with self._lock:
+            entry = self._symbols.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._symbols.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    @override
+    def put(self, key: bytes, symbol: CachedSymbol) -> None:
+        with self._lock:
+            previous = self._symbols.pop(key, None)
+            if previous is not None:
+                self._total_bytes -= previous[1]
+            self._store(key, symbol)
+
+    @override
+    def get_render(self, key: bytes, render_key: RenderKey) -> bytes | None:
+        with self._lock:
+            entry = self._symbols.get(key)
+            data = None if entry is None else entry[0].renders.get(render_key)
+            if data is None:
+                self.render_misses += 1
+                return None
+            self._symbols.move_to_end(key)
+            self.render_hits += 1
+            return data
+
+    @override
+    def put_render(self, key: bytes, render_key: RenderKey, data: bytes) -> None:
+        # Renders are kept with their symbol, so they are dropped together. Nothing is stored if the symbol is gone
+        if not self.cache_renders:
+            return
+        with self._lock:
+            entry = self._symbols.pop(key, None)
+            if entry is None:
+                return
+            symbol, symbol_bytes = entry
+            self._total_bytes -= symbol_bytes
+            symbol.renders[render_key] = data
+            self._store(key, symbol)
+
+    def _store(self, key: bytes, symbol: CachedSymbol) -> None:
+        # Callers hold the lock
+        symbol_bytes = symbol.estimate_bytes()
+        self._symbols[key] = (symbol, symbol_bytes)
+        self._total_bytes += symbol_bytes
+        # Always keep the newest symbol, even when it alone is over the limit
+        while self._total_bytes > self.max_bytes and len(self._symbols) > 1:
+            _, (_, evicted_bytes) = self._symbols.popitem(last=False)
+            self._total_bytes -= evicted_bytes
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._symbols.clear()
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __contains__(self, key: bytes) -> bool:
+        return key in self._symbols
+
+    def __len__(self) -> int:
+        return len(self._symbols)
+
+
+class TieredSymbolCache(SymbolStore):
+    # Looks in first (usually a SymbolCache) before second (usually a DiskSymbolCache), and copies
+    # what second has into first. Everything stored goes to both
+    first: SymbolStore
+    second: SymbolStore
+
+    def __init__(self, first: SymbolStore, second: SymbolStore):
+        self.first = first
+        self.second = second
+        self.cache_renders = first.cache_renders or second.cache_renders
+
+    @override
+    def get(self, key: bytes) -> CachedSymbol | None:
+        symbol = self.first.get(key)
+        if symbol is None:
+            symbol = self.second.get(key)
+            if symbol is not None:
+                self.first.put(key, symbol)
+        return symbol
+
+    @override
+    def put(self, key: bytes, symbol: CachedSymbol) -> None:
+        self.first.put(key, symbol)
+        self.second.put(key, symbol)
+
+    @override
+    def get_render(self, key: bytes, render_key: RenderKey) -> bytes | None:
+        data = self.first.get_render(key, render_key)
+        if data is None:
+            data = self.second.get_render(key, render_key)
+            if data is not None:
+                self.first.put_render(key, render_key, data)
+        return data
+
+    @override
+    def put_render(self, key: bytes, render_key: RenderKey, data: bytes) -> None:
+        self.first.put_render(key, render_key, data)
+        self.second.put_render(key, render_key, data)
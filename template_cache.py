@@ -0,0 +1,78 @@
+from collections import OrderedDict
+from collections.abc import Callable
+import sys
+from threading import Lock
+
+from module_matrix import ModuleMatrix
+
+
+def estimate_matrix_bytes(matrix: ModuleMatrix) -> int:
+    total = sys.getsizeof(matrix)
+    for bitsets in (matrix.rows, matrix.locked, matrix.reserved):
+        total += sys.getsizeof(bitsets) + sum(sys.getsizeof(bitset) for bitset in bitsets)
+    return total
+
+
+class FunctionPatternTemplateCache:
+    # Pre-rendered function patterns (finders, separators, alignment and timing patterns, dark module,
+    # reserved format area and version information) per version. Least recently used versions are
+    # dropped once the templates take more than max_bytes
+    max_bytes: int
+    hits: int
+    misses: int
+    _templates: OrderedDict[int, tuple[ModuleMatrix, int]]
+    _total_bytes: int
+    _lock: Lock
+
+    def __init__(self, max_bytes: int = 256 * 1024):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._templates = OrderedDict()
+        self._total_bytes = 0
+        self._lock = Lock()
+
+    def get(self, version: int, build: Callable[[], ModuleMatrix]) -> ModuleMatrix:
+        # The returned template is shared, so callers have to copy it before drawing on it
+        with self._lock:
+            entry = self._templates.get(version)
+            if entry is not None:
+                self._templates.move_to_end(version)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Built outside the lock so other versions are not held up. If two threads race on the
+        # same version, both templates are identical and the first one stored wins
+        template = build()
+        template_bytes = estimate_matrix_bytes(template)
+
+        with self._lock:
+            entry = self._templates.get(version)
+            if entry is not None:
+                return entry[0]
+            self._templates[version] = (template, template_bytes)
+            self._total_bytes += template_bytes
+            # Always keep the newest template, even when it alone is over the limit
+            while self._total_bytes > self.max_bytes and len(self._templates) > 1:
+                _, (_, evicted_bytes) = self._templates.popitem(last=False)
+                self._total_bytes -= evicted_bytes
+        return template
+
+    def clear(self) -> None:
+        with self._lock:
+            self._templates.clear()
+            self._total_bytes = 0
+
+    @property
+    def total_bytes(self) -> int:
+        return self._total_bytes
+
+    def __contains__(self, version: int) -> bool:
+        return version in self._templates
+
+    def __len__(self) -> int:
+        return len(self._templates)
+
+
+function_pattern_templates = FunctionPatternTemplateCache()
@@ -0,0 +1,93 @@
+from io import BytesIO
+import os
+import tarfile
+import tempfile
+import unittest
+import zipfile
+
+from archive_sink import ArchiveFormat, TarSink, ZipSink, check_member_name, guess_archive_format, open_archive_sink
+
+
+class UnseekableStream(BytesIO):
+    # Behaves like a pipe, which archives have to be written to front to back
+    def seekable(self) -> bool:
+        return False
+
+    def seek(self, offset: int, whence: int = 0) -> int:
+        raise OSError("Cannot seek")
+
+    def tell(self) -> int:
+        raise OSError("Cannot tell")
+
+
+MEMBERS: list[tuple[str, bytes]] = [("codes/000000.png", b"first"), ("codes/000001.png", b"second" * 100)]
+
+
+class TestArchiveSink(unittest.TestCase):
+    def _write(self, archive_format: ArchiveFormat, compress: bool = True) -> bytes:
+        stream = BytesIO()
+        with open_archive_sink(stream, archive_format, compress=compress) as sink:
+            for name, data in MEMBERS:
+                sink.add(name, data)
+        self.assertEqual(len(MEMBERS), sink.member_count)
+        return stream.getvalue()
+
+    def test_zip(self):
+        for compress, compress_type in [(True, zipfile.ZIP_DEFLATED), (False, zipfile.ZIP_STORED)]:
+            with zipfile.ZipFile(BytesIO(self._write(ArchiveFormat.ZIP, compress))) as archive:
+                self.assertEqual([name for name, _ in MEMBERS], archive.namelist())
+                for name, data in MEMBERS:
+                    self.assertEqual(data, archive.read(name))
+                    self.assertEqual(compress_type, archive.getinfo(name).compress_type)
+
+    def test_tar(self):
+        for archive_format in [ArchiveFormat.TAR, ArchiveFormat.TAR_GZ]:
+            with tarfile.open(fileobj=BytesIO(self._write(archive_format))) as archive:
+                self.assertEqual([name for name, _ in MEMBERS], archive.getnames())
+                for name, data in MEMBERS:
+                    member = archive.extractfile(name)
+                    assert member is not None
+                    self.assertEqual(data, member.read())
+
+    def test_deterministic(self):
+        for archive_format in ArchiveFormat:
+            self.assertEqual(self._write(archive_format), self._write(archive_format))
+
+    def test_deterministic_across_paths(self):
+        # The gzip header must not pick up the name of the file being written
+        with tempfile.TemporaryDirectory() as folder:
+            archives: list[bytes] = []
+            for name in ["first.tar.gz", "second.tar.gz"]:
+                path = os.path.join(folder, name)
+                with open(path, "wb") as stream, open_archive_sink(stream, ArchiveFormat.TAR_GZ) as sink:
+                    for member_name, data in MEMBERS:
+                        sink.add(member_name, data)
+                with open(path, "rb") as stream:
+                    archives.append(stream.read())
+            self.assertEqual(archives[0], archives[1])
+            self.assertEqual(self._write(ArchiveFormat.TAR_GZ), archives[0])
+
+    def test_unseekable_stream(self):
+        for sink_type in [TarSink, ZipSink]:
+            stream = UnseekableStream()
+            with sink_type(stream) as sink:
+                sink.add("code.png", b"data")
+            self.assertGreater(len(stream.getvalue()), 0)
+
+    def test_member_names(self):
+        self.assertEqual("a/b.png", check_member_name("a\\b.png"))
+        self.assertEqual("b.png", check_member_name("a/../b.png"))
+        for name in ["/etc/passwd", "../outside.png", "a/../../b.png", ".", "C:/outside.png", "\\\\server\\share\\b.png"]:
+            with self.assertRaises(ValueError):
+                check_member_name(name)
+
+    def test_guess_archive_format(self):
+        self.assertEqual(ArchiveFormat.ZIP, guess_archive_format("codes.zip"))
+        self.assertEqual(ArchiveFormat.TAR, guess_archive_format("codes.tar"))
+        self.assertEqual(ArchiveFormat.TAR_GZ, guess_archive_format("codes.tgz"))
+        with self.assertRaises(ValueError):
+            guess_archive_format("codes.rar")
+
+
+if __name__ == "__main__":
+    unittest.main()
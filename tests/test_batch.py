@@ -0,0 +1,33 @@
+import unittest
+
+from batch import BatchStatistics, generate_many, generate_one
+from error_correction import ErrorCorrection
+
+
+class TestBatch(unittest.TestCase):
+    payloads = [f"TICKET-{i:04d}" for i in range(10)]
+
+    def test_generate_many_matches_generate_one(self):
+        statistics = BatchStatistics()
+        codes = list(generate_many(self.payloads, 2, ErrorCorrection.MEDIUM, chunk_size=3, statistics=statistics))
+        self.assertEqual(
+            [str(generate_one(payload, 2, ErrorCorrection.MEDIUM)) for payload in self.payloads],
+            [str(code) for code in codes],
+        )
+        self.assertEqual(10, statistics.code_count)
+        self.assertGreater(statistics.codes_per_second, 0)
+
+    def test_generate_many_with_processes(self):
+        codes = generate_many(self.payloads, 2, ErrorCorrection.MEDIUM, mask_pattern=4, processes=2, chunk_size=4)
+        self.assertEqual(
+            [str(generate_one(payload, 2, ErrorCorrection.MEDIUM, 4)) for payload in self.payloads],
+            [str(code) for code in codes],
+        )
+
+    def test_generate_many_is_lazy(self):
+        def payloads():
+            yield "FIRST"
+            raise AssertionError("Read past the first chunk")
+
+        codes = generate_many(payloads(), 1, ErrorCorrection.LOW, chunk_size=1)
+        self.assertEqual(1, next(codes).version)
@@ -0,0 +1,41 @@
+import tempfile
+import unittest
+
+from benchmarks.bench_import import FORBIDDEN_IMPORTS, IMPORT_BUDGETS, check_budget, check_forbidden_imports, imported_modules, measure_import, parse_importtime
+
+SAMPLE_OUTPUT = """import time: self [us] | cumulative | imported package
+import time:       350 |        350 |   posix
+import time:       300 |        650 | site
+import time:        90 |         90 |     error_correction
+import time:       400 |        490 |   encoding
+import time:     14000 |      14000 |   turtle
+import time:       800 |      15290 | qrcode
+"""
+
+
+class TestBenchImport(unittest.TestCase):
+    def test_parse_importtime(self):
+        records = parse_importtime(SAMPLE_OUTPUT)
+        self.assertEqual(["posix", "site", "error_correction", "encoding", "turtle", "qrcode"], [record.name for record in records])
+        self.assertEqual([1, 0, 2, 1, 1, 0], [record.depth for record in records])
+        self.assertEqual((800, 15290), (records[-1].self_us, records[-1].cumulative_us))
+        # Modules loaded during startup are not counted against qrcode
+        self.assertEqual({"qrcode", "encoding", "error_correction", "turtle"}, imported_modules(records, "qrcode"))
+
+    def test_check_budget(self):
+        records = parse_importtime(SAMPLE_OUTPUT)
+        problems = check_budget("qrcode", IMPORT_BUDGETS["qrcode"] + 1, records)
+        self.assertEqual(2, len(problems))
+        self.assertIn("budget", problems[0])
+        self.assertIn("turtle", problems[1])
+
+    def test_no_forbidden_imports(self):
+        # Only what is loaded is checked here, import times depend too much on the machine. See bench_import --budget
+        with tempfile.TemporaryDirectory() as pycache_folder:
+            for module in FORBIDDEN_IMPORTS:
+                _, records = measure_import(module, pycache_folder, repeat=1)
+                self.assertEqual([], check_forbidden_imports(module, records))
+
+
+if __name__ == "__main__":
+    unittest.main()
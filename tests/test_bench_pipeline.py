@@ -0,0 +1,41 @@
+from contextlib import redirect_stderr, redirect_stdout
+from io import StringIO
+import json
+import os
+import tempfile
+import unittest
+
+from benchmarks.bench_pipeline import compare, main, parse_versions
+
+
+class TestBenchPipeline(unittest.TestCase):
+    def test_parse_versions(self):
+        self.assertEqual([1, 2, 3, 10, 40], parse_versions("1-3,10,40"))
+        with self.assertRaises(ValueError):
+            parse_versions("0-2")
+
+    def test_compare(self):
+        baseline = [{"stage": "generate", "version": 1, "error_correction": "L", "best_seconds": 1.0}]
+        self.assertEqual([], compare(baseline, [{**baseline[0], "best_seconds": 1.05}], threshold=0.1))
+        self.assertEqual(1, len(compare(baseline, [{**baseline[0], "best_seconds": 1.5}], threshold=0.1)))
+        # Stages missing from the baseline are new, not regressions
+        self.assertEqual([], compare(baseline, [{**baseline[0], "stage": "render.png"}], threshold=0.1))
+
+    def test_json_round_trip(self):
+        with tempfile.TemporaryDirectory() as folder:
+            path = os.path.join(folder, "bench.json")
+            with redirect_stdout(StringIO()), redirect_stderr(StringIO()):
+                self.assertEqual(0, main(["--versions", "1", "--levels", "M", "--number", "1", "--repeat", "1", "--json", path]))
+            with open(path, encoding="utf-8") as file:
+                report = json.load(file)
+            stages = {result["stage"] for result in report["results"]}
+            self.assertLessEqual({"encode.kanji", "reed_solomon", "placement", "mask_search", "render.png", "generate"}, stages)
+            self.assertTrue(all(result["peak_bytes"] > 0 for result in report["results"]))
+
+            with redirect_stdout(StringIO()), redirect_stderr(StringIO()):
+                # Comparing against itself with a huge threshold can never regress
+                self.assertEqual(0, main(["--versions", "1", "--levels", "M", "--number", "1", "--repeat", "1", "--compare", path, "--threshold", "1000"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import unittest
+
+from bit_buffer import BitBuffer
+
+
+class TestBitBuffer(unittest.TestCase):
+    def test_append(self):
+        buffer = BitBuffer()
+        buffer.append(0b0010, 4)
+        buffer.append(0b000001011, 9)
+        self.assertEqual(13, len(buffer))
+        self.assertEqual("0010000001011", str(buffer))
+        self.assertEqual(bytes([0b00100000, 0b01011000]), buffer.to_bytes())
+        self.assertRaises(ValueError, lambda: buffer.append(4, 2))
+
+    def test_append_bytes(self):
+        buffer = BitBuffer(b"\x01")
+        buffer.append_bytes(b"\xff")
+        self.assertEqual(b"\x01\xff", buffer.to_bytes())
+        buffer.append(1, 1)
+        buffer.append_bytes(b"\x80")
+        self.assertEqual("000000011111111111000000", str(buffer)[:24])
+        self.assertEqual(25, len(buffer))
+
+    def test_extend(self):
+        first = BitBuffer()
+        first.append(0b101, 3)
+        second = BitBuffer(b"\x0f")
+        second.append(0b11, 2)
+        first.extend(second)
+        self.assertEqual("1010000111111", str(first))
+
+    def test_align_and_view(self):
+        buffer = BitBuffer()
+        buffer.append(0b1, 1)
+        self.assertFalse(buffer.is_aligned())
+        self.assertRaises(ValueError, buffer.getbuffer)
+        buffer.align_to_byte()
+        self.assertTrue(buffer.is_aligned())
+        self.assertEqual(b"\x80", bytes(buffer.getbuffer()))
+
+    def test_iter_bits(self):
+        buffer = BitBuffer(b"\xa0")
+        buffer.append(0b01, 2)
+        self.assertEqual([1, 0, 1, 0, 0, 0, 0, 0, 0, 1], list(buffer.iter_bits()))
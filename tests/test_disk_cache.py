@@ -0,0 +1,180 @@
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import os
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+
+import batch
+from disk_cache import DiskSymbolCache, make_render_entry_key, pack_symbol, unpack_symbol
+from error_correction import ErrorCorrection
+from qrcode import SimpleQRCode
+from symbol_cache import CachedSymbol, SymbolCache, SymbolStore, TieredSymbolCache
+
+
+def make_code(cache: SymbolStore | None, payload: str = "https://example.com/sku/12345") -> SimpleQRCode:
+    qrcode = SimpleQRCode(error_correction_level=ErrorCorrection.QUARTILE, symbol_cache=cache)
+    qrcode.add_data(payload)
+    qrcode.generate()
+    return qrcode
+
+
+def generate_into(path: str, payloads: list[str]) -> bytes:
+    # Runs in worker processes, each with its own connection to the same file
+    cache = DiskSymbolCache(path)
+    return b"".join(make_code(cache, payload).to_png_bytes() for payload in payloads)
+
+
+class TestDiskSymbolCache(unittest.TestCase):
+    def setUp(self):
+        self._folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._folder.name, "cache", "symbols.sqlite")
+
+    def tearDown(self):
+        self._folder.cleanup()
+
+    def test_symbol_round_trip(self):
+        symbol = CachedSymbol(7, ErrorCorrection.MEDIUM, 5, 45, bytes(i % 256 for i in range(45 * 6)))
+        restored = unpack_symbol(pack_symbol(symbol))
+        self.assertEqual(
+            (symbol.version, symbol.error_correction_level, symbol.mask_pattern, symbol.size, symbol.rows),
+            (restored.version, restored.error_correction_level, restored.mask_pattern, restored.size, restored.rows),
+        )
+
+    def test_hit_matches_generated_code(self):
+        cache = DiskSymbolCache(self.path)
+        first = make_code(cache)
+        with mock.patch.object(SimpleQRCode, "_generate") as generate:
+            second = make_code(cache)
+        generate.assert_not_called()
+        self.assertEqual((1, 1), (cache.misses, cache.hits))
+        self.assertEqual(first.matrix, second.matrix)
+        self.assertEqual(make_code(None).matrix, second.matrix)
+
+    def test_persists_across_instances(self):
+        first = make_code(DiskSymbolCache(self.path))
+        png = first.to_png_bytes(scale=2)
+
+        reopened = DiskSymbolCache(self.path, mmap_size=1024 * 1024)
+        second = make_code(reopened)
+        self.assertEqual(png, second.to_png_bytes(scale=2))
+        self.assertEqual((1, 0, 1, 0), (reopened.hits, reopened.misses, reopened.render_hits, reopened.render_misses))
+        self.assertEqual(first.matrix, second.matrix)
+
+    def test_write_to_png_uses_cached_render(self):
+        cache = DiskSymbolCache(self.path)
+        qrcode = make_code(cache)
+        qrcode.write_to_png("first.png", self._folder.name)
+        qrcode.write_to_png("second.png", self._folder.name)
+        self.assertEqual((1, 1), (cache.render_misses, cache.render_hits))
+        with open(os.path.join(self._folder.name, "first.png"), "rb") as first, open(os.path.join(self._folder.name, "second.png"), "rb") as second:
+            self.assertEqual(first.read(), second.read())
+
+    def test_renders_not_cached(self):
+        cache = DiskSymbolCache(self.path, cache_renders=False)
+        make_code(cache).to_png_bytes()
+        make_code(cache).to_png_bytes()
+        self.assertEqual((0, 0), (cache.render_hits, cache.render_misses))
+        self.assertEqual(1, len(cache))
+
+    def test_eviction(self):
+        symbol = CachedSymbol(1, ErrorCorrection.LOW, 0, 21, bytes(63))
+        entry_bytes = 32 + len(pack_symbol(symbol))
+        cache = DiskSymbolCache(self.path, max_bytes=3 * entry_bytes)
+        keys = [bytes([i]) * 32 for i in range(5)]
+        for key in keys:
+            cache.put(key, symbol)
+        # Each eviction goes down to 90% of the limit, which only leaves room for two entries
+        self.assertEqual(2, cache.evictions)
+        self.assertNotIn(keys[0], cache)
+        self.assertIn(keys[4], cache)
+        self.assertLessEqual(cache.total_bytes, cache.max_bytes)
+        self.assertEqual(len(cache) * entry_bytes, cache.total_bytes)
+
+        # The newest entry is kept even when it alone is over the limit
+        large = CachedSymbol(40, ErrorCorrection.LOW, 0, 177, bytes(177 * 23))
+        cache.put(b"large", large)
+        self.assertEqual(1, len(cache))
+        self.assertIn(b"large", cache)
+
+    def test_replacing_an_entry_keeps_the_size(self):
+        cache = DiskSymbolCache(self.path)
+        symbol = CachedSymbol(1, ErrorCorrection.LOW, 0, 21, bytes(63))
+        cache.put(b"key", symbol)
+        cache.put(b"key", symbol)
+        cache.put_render(b"key", ("render.png", 1, 4), b"png")
+        self.assertEqual(2, len(cache))
+        self.assertEqual(3 + len(pack_symbol(symbol)) + len(make_render_entry_key(b"key", ("render.png", 1, 4))) + 3, cache.total_bytes)
+        cache.clear()
+        self.assertEqual((0, 0), (len(cache), cache.total_bytes))
+
+    def test_threads(self):
+        cache = DiskSymbolCache(self.path)
+        payloads = [f"payload {i % 8}" for i in range(48)]
+        with ThreadPoolExecutor(max_workers=6) as executor:
+            pngs = list(executor.map(lambda payload: make_code(cache, payload).to_png_bytes(), payloads))
+        self.assertEqual([make_code(None, payload).to_png_bytes() for payload in payloads], pngs)
+        self.assertEqual(16, len(cache))
+
+    def test_processes_share_the_file(self):
+        DiskSymbolCache(self.path)
+        payloads = [f"payload {i}" for i in range(6)]
+        with ProcessPoolExecutor(max_workers=3) as executor:
+            results = list(executor.map(generate_into, [self.path] * 3, [payloads] * 3))
+        self.assertEqual(1, len(set(results)))
+        cache = DiskSymbolCache(self.path)
+        self.assertEqual(12, len(cache))
+        self.assertEqual(results[0], b"".join(make_code(cache, payload).to_png_bytes() for payload in payloads))
+        self.assertEqual((6, 6), (cache.hits, cache.render_hits))
+
+    def test_pickle(self):
+        cache = DiskSymbolCache(self.path, max_bytes=1024 * 1024, mmap_size=4096)
+        make_code(cache)
+        copy = pickle.loads(pickle.dumps(cache))
+        self.assertEqual((self.path, 1024 * 1024, 4096), (copy.path, copy.max_bytes, copy.mmap_size))
+        self.assertEqual(0, copy.hits)
+        make_code(copy)
+        self.assertEqual(1, copy.hits)
+
+    def test_batch_processes(self):
+        cache = DiskSymbolCache(self.path)
+        payloads = [f"payload {i % 4}" for i in range(12)]
+        codes = list(batch.generate_many(payloads, None, ErrorCorrection.LOW, processes=2, chunk_size=3, symbol_cache=cache))
+        self.assertEqual([batch.generate_one(payload, None, ErrorCorrection.LOW).matrix for payload in payloads], [code.matrix for code in codes])
+        self.assertEqual(4, len(cache))
+
+
+class TestTieredSymbolCache(unittest.TestCase):
+    def setUp(self):
+        self._folder = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self._folder.name, "symbols.sqlite")
+
+    def tearDown(self):
+        self._folder.cleanup()
+
+    def test_promotes_from_disk(self):
+        make_code(DiskSymbolCache(self.path)).to_png_bytes()
+
+        memory = SymbolCache()
+        disk = DiskSymbolCache(self.path)
+        cache = TieredSymbolCache(memory, disk)
+        make_code(cache).to_png_bytes()
+        self.assertEqual((1, 1), (disk.hits, disk.render_hits))
+        self.assertEqual(1, len(memory))
+
+        make_code(cache).to_png_bytes()
+        self.assertEqual((1, 1), (memory.hits, memory.render_hits))
+        self.assertEqual((1, 1), (disk.hits, disk.render_hits))
+
+    def test_stores_in_both(self):
+        memory = SymbolCache()
+        disk = DiskSymbolCache(self.path)
+        qrcode = SimpleQRCode(error_correction_level=ErrorCorrection.QUARTILE, symbol_cache=TieredSymbolCache(memory, disk))
+        qrcode.add_data("https://example.com/sku/12345")
+        # Taken before generating fills in the mask pattern
+        key = qrcode.symbol_key()
+        qrcode.generate()
+        qrcode.to_svg()
+        self.assertIn(key, memory)
+        self.assertIn(key, disk)
+        self.assertEqual(2, len(disk))
@@ -1,12 +1,18 @@
+from itertools import product
+import random
 import unittest
 
 from error_correction import ErrorCorrection
 from mode import Mode
 
 from encoding import (
+    can_encode,
     encode,
+    generate_most_efficient_modes,
+    in_exclusive_subset,
     lookup_alphanumeric_value,
     get_character_count_indicator_length,
+    get_codeword_block_information,
     get_data_codeword_capacity,
 )
 
@@ -79,3 +85,68 @@ class TestEncodingMethods(unittest.TestCase):
         self.assertEqual(13, get_data_codeword_capacity(1, ErrorCorrection.QUARTILE))
         self.assertEqual(46, get_data_codeword_capacity(5, ErrorCorrection.HIGH))
         self.assertEqual(721, get_data_codeword_capacity(18, ErrorCorrection.LOW))
+
+    def test_lookup_codeword_block_information(self):
+        info = get_codeword_block_information(5, ErrorCorrection.QUARTILE)
+        self.assertEqual(62, info.number_of_data_codewords)
+        self.assertEqual(18, info.ec_codewords_per_block)
+        self.assertEqual((2, 15), (info.group_1.block_count, info.group_1.codeword_count_per_block))
+        self.assertEqual((2, 16), (info.group_2.block_count, info.group_2.codeword_count_per_block))
+
+        info = get_codeword_block_information(40, ErrorCorrection.HIGH)
+        self.assertEqual(1276, info.number_of_data_codewords)
+        self.assertEqual(30, info.ec_codewords_per_block)
+        self.assertEqual((20, 15), (info.group_1.block_count, info.group_1.codeword_count_per_block))
+        self.assertEqual((61, 16), (info.group_2.block_count, info.group_2.codeword_count_per_block))
+
+        self.assertIs(info, get_codeword_block_information(40, ErrorCorrection.HIGH))
+        self.assertRaises(ValueError, lambda: get_codeword_block_information(41, ErrorCorrection.LOW))
+
+    def test_in_exclusive_subset(self):
+        self.assertTrue(in_exclusive_subset("7", Mode.NUMERIC))
+        self.assertTrue(in_exclusive_subset("/", Mode.ALPHANUMERIC))
+        self.assertFalse(in_exclusive_subset("7", Mode.ALPHANUMERIC))
+        self.assertTrue(in_exclusive_subset("a", Mode.BINARY))
+        self.assertTrue(in_exclusive_subset("茗", Mode.KANJI))
+        self.assertFalse(in_exclusive_subset("a", Mode.KANJI))
+
+    def test_generate_most_efficient_modes(self):
+        self.assertEqual([], generate_most_efficient_modes("", 1))
+        self.assertEqual([(Mode.ALPHANUMERIC, "HELLO WORLD")], generate_most_efficient_modes("HELLO WORLD", 1))
+        self.assertEqual(
+            [(Mode.KANJI, "茗荷"), (Mode.BINARY, "abc")],
+            generate_most_efficient_modes("茗荷abc", 1),
+        )
+        self.assertEqual(
+            [(Mode.BINARY, "https://example.com/ABC"), (Mode.NUMERIC, "123456789012")],
+            generate_most_efficient_modes("https://example.com/ABC123456789012", 1),
+        )
+        self.assertRaises(ValueError, lambda: generate_most_efficient_modes("مرحبا", 1))
+
+    def test_generate_most_efficient_modes_is_optimal(self):
+        def bit_length(segments: list[tuple[Mode, str]], version: int) -> int:
+            return sum(len(encode(data, version, mode)) for mode, data in segments)
+
+        def brute_force(data: str, version: int) -> int:
+            # Try every way of cutting data into segments, and every mode for each segment
+            best = None
+            for cuts in product([False, True], repeat=len(data) - 1):
+                pieces: list[str] = []
+                start = 0
+                for i, cut in enumerate(cuts, start=1):
+                    if cut:
+                        pieces.append(data[start:i])
+                        start = i
+                pieces.append(data[start:])
+                for modes in product([Mode.NUMERIC, Mode.ALPHANUMERIC, Mode.BINARY], repeat=len(pieces)):
+                    if all(all(can_encode(c, mode) for c in piece) for mode, piece in zip(modes, pieces)):
+                        length = bit_length(list(zip(modes, pieces)), version)
+                        best = length if best is None else min(best, length)
+            assert best is not None
+            return best
+
+        rng = random.Random(103)
+        for _ in range(25):
+            data = "".join(rng.choice("0123AB a:") for _ in range(rng.randint(1, 6)))
+            for version in [1, 10, 27]:
+                self.assertEqual(brute_force(data, version), bit_length(generate_most_efficient_modes(data, version), version), data)
@@ -0,0 +1,109 @@
+from contextlib import redirect_stdout
+from io import BytesIO, StringIO
+from threading import Thread
+import unittest
+
+from error_correction import ErrorCorrection
+from instrumentation import StageRecord, StageRecorder, add_hook, get_hooks, instrument, remove_hook, stage
+from qrcode import SimpleQRCode
+
+GENERATION_STAGES: list[str] = ["version", "patterns", "encode", "reed_solomon", "placement", "mask_search", "format_information"]
+
+
+def make_code(mask_pattern: int | None = None) -> SimpleQRCode:
+    qrcode = SimpleQRCode(error_correction_level=ErrorCorrection.QUARTILE, mask_pattern=mask_pattern)
+    qrcode.add_data("INSTRUMENTED 123456")
+    return qrcode
+
+
+class TestInstrumentation(unittest.TestCase):
+    def test_records_every_stage(self):
+        recorder = StageRecorder()
+        qrcode = make_code()
+        with instrument(recorder):
+            qrcode.generate()
+            qrcode.write_png(BytesIO())
+
+        self.assertEqual([*GENERATION_STAGES, "render.png"], recorder.stages())
+        for record in recorder.records:
+            self.assertEqual(qrcode.version, record.version)
+            self.assertEqual(ErrorCorrection.QUARTILE, record.error_correction_level)
+            self.assertGreaterEqual(record.elapsed, 0)
+            self.assertIsNone(record.peak_bytes)
+
+        mask_search = recorder.records[GENERATION_STAGES.index("mask_search")]
+        self.assertEqual(qrcode.mask_pattern, mask_search.details["mask_pattern"])
+        penalties = mask_search.details["penalties"]
+        assert isinstance(penalties, list)
+        self.assertEqual(8, len(penalties))
+        self.assertGreater(recorder.records[-1].details["bytes"], 0)
+
+    def test_same_code_with_and_without_hooks(self):
+        plain = make_code()
+        plain.generate()
+        instrumented = make_code()
+        with instrument(StageRecorder()):
+            instrumented.generate()
+        self.assertEqual(str(plain), str(instrumented))
+
+    def test_given_mask_has_no_penalties(self):
+        recorder = StageRecorder()
+        with instrument(recorder):
+            make_code(mask_pattern=2).generate()
+        mask_search = recorder.records[GENERATION_STAGES.index("mask_search")]
+        self.assertIsNone(mask_search.details["penalties"])
+
+    def test_stage_without_hooks(self):
+        with stage("idle", hooks=()) as record:
+            record.details["ran"] = True
+        # Not timed, since nothing would see the record
+        self.assertEqual((0.0, {"ran": True}), (record.elapsed, record.details))
+
+    def test_trace_allocations(self):
+        recorder = StageRecorder()
+        with instrument(recorder, trace_allocations=True):
+            make_code().generate()
+        self.assertTrue(all(record.peak_bytes is not None and record.peak_bytes >= 0 for record in recorder.records))
+        self.assertEqual("mask_search", recorder.records[5].to_dict()["stage"])
+
+    def test_hooks_are_scoped(self):
+        recorder = StageRecorder()
+        with instrument(recorder):
+            self.assertIn(recorder, get_hooks())
+            seen_in_thread: list[int] = []
+            thread = Thread(target=lambda: seen_in_thread.append(len(get_hooks())))
+            thread.start()
+            thread.join()
+            self.assertEqual([0], seen_in_thread)
+        self.assertEqual((), get_hooks())
+
+    def test_global_hooks(self):
+        recorder = StageRecorder()
+        add_hook(recorder)
+        try:
+            thread = Thread(target=lambda: make_code().generate())
+            thread.start()
+            thread.join()
+        finally:
+            remove_hook(recorder)
+        self.assertEqual(GENERATION_STAGES, recorder.stages())
+        with self.assertRaises(ValueError):
+            remove_hook(recorder)
+
+    def test_stage_details(self):
+        records: list[StageRecord] = []
+        with stage("custom", 3, ErrorCorrection.HIGH, hooks=(records.append,)) as record:
+            record.details["answer"] = 42
+        self.assertEqual([record], records)
+        self.assertEqual({"answer": 42}, record.details)
+        self.assertIn("custom v3 HIGH", str(record))
+
+    def test_generate_prints_nothing(self):
+        stdout = StringIO()
+        with redirect_stdout(stdout):
+            make_code().generate()
+        self.assertEqual("", stdout.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
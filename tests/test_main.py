@@ -0,0 +1,128 @@
+from contextlib import redirect_stderr
+from io import StringIO
+import json
+import os
+import tempfile
+import unittest
+import zipfile
+
+from disk_cache import DiskSymbolCache
+from main import main
+from png_writer import PNG_SIGNATURE
+
+
+class TestMain(unittest.TestCase):
+    def setUp(self):
+        self._folder = tempfile.TemporaryDirectory()
+        self.folder = self._folder.name
+        self.output_folder = os.path.join(self.folder, "codes")
+
+    def tearDown(self):
+        self._folder.cleanup()
+
+    def _write_input(self, name: str, content: str) -> str:
+        path = os.path.join(self.folder, name)
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(content)
+        return path
+
+    def _main(self, *argv: str) -> tuple[int, str]:
+        stderr = StringIO()
+        with redirect_stderr(stderr):
+            exit_code = main([*argv, "--output-dir", self.output_folder])
+        return exit_code, stderr.getvalue()
+
+    def test_lines(self):
+        path = self._write_input("payloads.txt", "first\n\nsecond\nthird\n\n")
+        exit_code, stderr = self._main(path, "--stats")
+        self.assertEqual(0, exit_code)
+        self.assertIn("3 codes", stderr)
+        self.assertEqual(["000000.png", "000001.png", "000002.png"], sorted(os.listdir(self.output_folder)))
+        with open(os.path.join(self.output_folder, "000000.png"), "rb") as file:
+            self.assertTrue(file.read().startswith(PNG_SIGNATURE))
+
+    def test_csv_fields_in_name_template(self):
+        path = self._write_input("payloads.csv", "sku,url\nA-1,https://example.com/a\nB-2,https://example.com/b\n")
+        exit_code, _ = self._main(path, "--input-format", "csv", "--field", "url", "--format", "svg", "--name-template", "labels/{sku}.{ext}")
+        self.assertEqual(0, exit_code)
+        self.assertEqual(["A-1.svg", "B-2.svg"], sorted(os.listdir(os.path.join(self.output_folder, "labels"))))
+
+    def test_jsonl_text_output(self):
+        lines = [json.dumps({"data": "HELLO", "id": 7}), "", json.dumps("WORLD")]
+        path = self._write_input("payloads.jsonl", "\n".join(lines) + "\n")
+        exit_code, _ = self._main(path, "--input-format", "jsonl", "--format", "txt", "--version", "2", "--error-correction", "H", "--mask", "3")
+        self.assertEqual(0, exit_code)
+        self.assertEqual(["000000.txt", "000001.txt"], sorted(os.listdir(self.output_folder)))
+        with open(os.path.join(self.output_folder, "000000.txt"), encoding="utf-8") as file:
+            # Version 2 is 25 modules, plus 4 on each side, at two rows per line
+            self.assertEqual(17, len(file.read().splitlines()))
+
+    def test_processes_keep_order(self):
+        payloads = [f"payload {i}" for i in range(20)]
+        path = self._write_input("payloads.txt", "\n".join(payloads) + "\n")
+        exit_code, _ = self._main(path, "--processes", "2", "--chunk-size", "3", "--format", "txt", "--border", "0")
+        self.assertEqual(0, exit_code)
+
+        single_folder = self.output_folder
+        self.output_folder = os.path.join(self.folder, "single")
+        self._main(path, "--format", "txt", "--border", "0")
+        for name in os.listdir(single_folder):
+            with open(os.path.join(single_folder, name), "rb") as parallel, open(os.path.join(self.output_folder, name), "rb") as single:
+                self.assertEqual(single.read(), parallel.read())
+
+    def test_archive(self):
+        path = self._write_input("payloads.txt", "first\nsecond\n")
+        archive_path = os.path.join(self.folder, "codes.zip")
+        exit_code, _ = self._main(path, "--archive", archive_path, "--archive-store", "--name-template", "png/{index}.{ext}")
+        self.assertEqual(0, exit_code)
+        self.assertFalse(os.path.exists(self.output_folder))
+        with zipfile.ZipFile(archive_path) as archive:
+            self.assertEqual(["png/0.png", "png/1.png"], archive.namelist())
+            self.assertTrue(archive.read("png/1.png").startswith(PNG_SIGNATURE))
+            self.assertEqual(zipfile.ZIP_STORED, archive.getinfo("png/0.png").compress_type)
+
+    def test_cache(self):
+        path = self._write_input("payloads.txt", "first\nsecond\nfirst\n")
+        cache_path = os.path.join(self.folder, "cache.sqlite")
+        exit_code, _ = self._main(path, "--cache", cache_path, "--processes", "2", "--chunk-size", "1")
+        self.assertEqual(0, exit_code)
+        # A symbol and a png for each distinct payload
+        self.assertEqual(4, len(DiskSymbolCache(cache_path)))
+
+        first_folder = self.output_folder
+        self.output_folder = os.path.join(self.folder, "cached")
+        exit_code, _ = self._main(path, "--cache", cache_path)
+        self.assertEqual(0, exit_code)
+        for name in os.listdir(first_folder):
+            with open(os.path.join(first_folder, name), "rb") as first, open(os.path.join(self.output_folder, name), "rb") as cached:
+                self.assertEqual(first.read(), cached.read())
+
+    def test_errors(self):
+        path = self._write_input("payloads.csv", "id\n1\n")
+        exit_code, stderr = self._main(path, "--input-format", "csv")
+        self.assertEqual(1, exit_code)
+        self.assertIn("'data'", stderr)
+
+        path = self._write_input("payloads.txt", "x" * 3000 + "\n")
+        exit_code, stderr = self._main(path)
+        self.assertEqual(1, exit_code)
+        self.assertIn("Too much data", stderr)
+
+        with self.assertRaises(SystemExit):
+            self._main(path, "--version", "41")
+
+    def test_names_stay_inside_output_folder(self):
+        path = self._write_input("payloads.csv", "data,name\nHELLO,../../escaped\n")
+        exit_code, stderr = self._main(path, "--input-format", "csv", "--name-template", "{name}.{ext}")
+        self.assertEqual(1, exit_code)
+        self.assertIn("inside the output folder", stderr)
+
+        absolute_path = os.path.join(self.folder, "absolute.png")
+        exit_code, _ = self._main(self._write_input("payloads.txt", "HELLO\n"), "--name-template", absolute_path)
+        self.assertEqual(1, exit_code)
+        self.assertFalse(os.path.exists(absolute_path))
+        self.assertEqual(["payloads.csv", "payloads.txt"], sorted(os.listdir(self.folder)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+
+from mask_pattern import MaskPattern, get_data_mask_bitplanes, get_mask_bitplanes
+from module_matrix import ModuleMatrix
+
+
+class TestMaskPattern(unittest.TestCase):
+    def test_get_mask_bitplanes(self):
+        size = 21
+        bitplanes = get_mask_bitplanes(size)
+        self.assertEqual(8, len(bitplanes))
+        for mask, bitplane in enumerate(bitplanes):
+            for row in range(size):
+                for col in range(size):
+                    self.assertEqual(
+                        MaskPattern[mask](row, col),
+                        bitplane[row] >> (size - 1 - col) & 1 == 1,
+                    )
+
+    def test_get_data_mask_bitplanes_skips_reserved(self):
+        matrix = ModuleMatrix(21)
+        matrix.lock(0, 0)
+        matrix.reserve(2, 4)
+        bitplane = get_data_mask_bitplanes(21, tuple(matrix.reserved))[0]
+
+        matrix.apply_mask(bitplane)
+        self.assertFalse(matrix.is_dark(0, 0))
+        self.assertFalse(matrix.is_dark(2, 4))
+        self.assertTrue(matrix.is_dark(0, 2))
+        self.assertTrue(matrix.is_dark(1, 1))
+
+        # Applying the mask again undoes it
+        matrix.apply_mask(bitplane)
+        self.assertEqual(0, matrix.dark_count())
@@ -0,0 +1,45 @@
+from concurrent.futures import ThreadPoolExecutor
+import unittest
+
+from error_correction import ErrorCorrection
+from mask_pattern import get_data_mask_bitplanes
+from mask_selection import evaluate_mask_candidate, select_best_mask
+from module_matrix import ModuleMatrix
+from qrcode import SimpleQRCode
+
+
+def make_unmasked_matrix() -> ModuleMatrix:
+    qrcode = SimpleQRCode(version=7, error_correction_level=ErrorCorrection.MEDIUM, mask_pattern=0)
+    qrcode.add_data("HELLO WORLD 1234567890")
+    qrcode.generate()
+    # Applying mask 0 a second time removes it again
+    matrix = qrcode.matrix.copy()
+    matrix.apply_mask(get_data_mask_bitplanes(matrix.size, tuple(matrix.reserved))[0])
+    return matrix
+
+
+class TestMaskSelection(unittest.TestCase):
+    def test_candidate_does_not_modify_matrix(self):
+        matrix = make_unmasked_matrix()
+        original = matrix.copy()
+        _ = evaluate_mask_candidate(matrix, ErrorCorrection.MEDIUM, 3)
+        self.assertEqual(original, matrix)
+
+    def test_executor_and_early_exit_agree(self):
+        matrix = make_unmasked_matrix()
+        best_mask, scores = select_best_mask(matrix, ErrorCorrection.MEDIUM)
+        self.assertTrue(all(score is not None for score in scores))
+        totals = [sum(score) for score in scores if score is not None]
+        self.assertEqual(totals.index(min(totals)), best_mask)
+
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            self.assertEqual((best_mask, scores), select_best_mask(matrix, ErrorCorrection.MEDIUM, executor=executor))
+
+        early_mask, early_scores = select_best_mask(matrix, ErrorCorrection.MEDIUM, early_exit=True)
+        self.assertEqual(best_mask, early_mask)
+        self.assertEqual(scores[best_mask], early_scores[best_mask])
+
+    def test_early_exit_with_executor_raises(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            with self.assertRaises(ValueError):
+                select_best_mask(make_unmasked_matrix(), ErrorCorrection.MEDIUM, executor=executor, early_exit=True)
@@ -0,0 +1,56 @@
+import unittest
+
+from color import BLACK, WHITE
+from module_matrix import ModuleMatrix
+
+
+class TestModuleMatrix(unittest.TestCase):
+    def test_set_dark(self):
+        matrix = ModuleMatrix(5)
+        matrix.set_dark(0, 0, True)
+        matrix.set_dark(1, 4, True)
+        self.assertTrue(matrix.is_dark(0, 0))
+        self.assertFalse(matrix.is_dark(0, 1))
+        self.assertEqual("10000", matrix.row_string(0))
+        self.assertEqual("00001", matrix.row_string(1))
+
+        matrix.set_dark(0, 0, False)
+        self.assertFalse(matrix.is_dark(0, 0))
+
+    def test_colors(self):
+        matrix = ModuleMatrix(3)
+        matrix.set_color(2, 1, BLACK)
+        self.assertEqual(BLACK, matrix.get_color(2, 1))
+        self.assertEqual(WHITE, matrix.get_color(2, 2))
+        matrix.invert(2, 1)
+        self.assertEqual(WHITE, matrix.get_color(2, 1))
+
+    def test_lock_and_reserve(self):
+        matrix = ModuleMatrix(4)
+        matrix.lock(1, 2)
+        matrix.reserve(3, 3)
+        self.assertTrue(matrix.is_locked(1, 2))
+        self.assertTrue(matrix.is_reserved(1, 2))
+        self.assertFalse(matrix.is_locked(3, 3))
+        self.assertTrue(matrix.is_reserved(3, 3))
+
+    def test_copy_is_independent(self):
+        matrix = ModuleMatrix(3)
+        clone = matrix.copy()
+        clone.set_dark(0, 0, True)
+        self.assertFalse(matrix.is_dark(0, 0))
+        self.assertNotEqual(matrix, clone)
+
+    def test_views(self):
+        matrix = ModuleMatrix(2)
+        matrix.set_dark(0, 1, True)
+        matrix.set_dark(1, 0, True)
+        matrix.lock(1, 0)
+        self.assertEqual("0110", str(matrix))
+        self.assertEqual([[0, 1], [1, 0]], matrix.to_lists())
+        self.assertEqual(2, matrix.dark_count())
+
+        squares = matrix.to_squares()
+        self.assertEqual(BLACK, squares[0][1].get_color())
+        self.assertTrue(squares[1][0].is_locked())
+        self.assertFalse(squares[0][0].is_reserved())
@@ -0,0 +1,54 @@
+import random
+import unittest
+
+from penalty import (
+    evaluate_condition_1,
+    evaluate_condition_2,
+    evaluate_condition_3,
+    evaluate_condition_4,
+    evaluate_penalties,
+    reference_evaluate_penalties,
+    transpose,
+)
+
+
+def to_cells(rows: list[int], size: int) -> list[list[int]]:
+    return [[int(c) for c in format(row, f"0{size}b")] for row in rows]
+
+
+class TestPenalty(unittest.TestCase):
+    def test_transpose(self):
+        # 110
+        # 001
+        # 010
+        self.assertEqual([0b100, 0b101, 0b010], transpose([0b110, 0b001, 0b010], 3))
+
+    def test_condition_1(self):
+        rows = [0b11111, 0b01010, 0b10101, 0b01010, 0b10101]
+        self.assertEqual(3, evaluate_condition_1(rows, transpose(rows, 5), 5))
+        rows = [0b111111, 0b010101, 0b101010, 0b010101, 0b101010, 0b010101]
+        self.assertEqual(4, evaluate_condition_1(rows, transpose(rows, 6), 6))
+        rows = [0b00000, 0b00000, 0b00000, 0b00000, 0b00000]
+        self.assertEqual(30, evaluate_condition_1(rows, transpose(rows, 5), 5))
+
+    def test_condition_2(self):
+        self.assertEqual(3, evaluate_condition_2([0b110, 0b110], 3))
+        self.assertEqual(6, evaluate_condition_2([0b000, 0b000], 3))
+        self.assertEqual(0, evaluate_condition_2([0b101, 0b010], 3))
+
+    def test_condition_3(self):
+        rows = [0b10111010000, 0b00001011101, 0b10111010001]
+        self.assertEqual(80, evaluate_condition_3(rows, transpose(rows, 11), 11))
+        rows = [0b0000101110100000]
+        self.assertEqual(80, evaluate_condition_3(rows, [], 16))
+
+    def test_condition_4(self):
+        self.assertEqual(0, evaluate_condition_4([0b1100, 0b0011, 0b1010, 0b0101], 4))
+        self.assertEqual(10, evaluate_condition_4([0, 0, 0, 0], 4))
+
+    def test_matches_reference(self):
+        rng = random.Random(62)
+        for size in [5, 11, 21, 45, 57]:
+            for density in [0.1, 0.5, 0.9]:
+                rows = [sum((rng.random() < density) << i for i in range(size)) for _ in range(size)]
+                self.assertEqual(reference_evaluate_penalties(to_cells(rows, size)), evaluate_penalties(rows, size))
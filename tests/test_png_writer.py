@@ -0,0 +1,98 @@
+from io import BytesIO
+import random
+import struct
+import unittest
+import zlib
+
+from module_matrix import ModuleMatrix
+from png_writer import PNG_SIGNATURE, iter_scanlines, write_png
+
+
+def read_png(data: bytes) -> tuple[int, int, list[list[int]]]:
+    # Just enough of a decoder for the images write_png makes: returns width, height and pixel rows
+    assert data.startswith(PNG_SIGNATURE)
+    position = len(PNG_SIGNATURE)
+    chunks: list[tuple[bytes, bytes]] = []
+    while position < len(data):
+        (length,) = struct.unpack(">I", data[position : position + 4])
+        chunk_type = data[position + 4 : position + 8]
+        chunk_data = data[position + 8 : position + 8 + length]
+        (crc,) = struct.unpack(">I", data[position + 8 + length : position + 12 + length])
+        assert crc == zlib.crc32(chunk_type + chunk_data)
+        chunks.append((chunk_type, chunk_data))
+        position += 12 + length
+
+    assert chunks[0][0] == b"IHDR" and chunks[-1][0] == b"IEND"
+    width, height, bit_depth, color_type, _, _, _ = struct.unpack(">IIBBBBB", chunks[0][1])
+    assert (bit_depth, color_type) == (1, 0)
+
+    raw = zlib.decompress(b"".join(chunk_data for chunk_type, chunk_data in chunks if chunk_type == b"IDAT"))
+    row_byte_count = (width + 7) // 8
+    rows: list[list[int]] = []
+    for y in range(height):
+        line = raw[y * (row_byte_count + 1) : (y + 1) * (row_byte_count + 1)]
+        assert line[0] == 0
+        bits = "".join(format(byte, "08b") for byte in line[1:])
+        rows.append([int(bit) for bit in bits[:width]])
+    return width, height, rows
+
+
+class TestPNGWriter(unittest.TestCase):
+    def _matrix(self) -> ModuleMatrix:
+        # A 3x3 checkerboard with the top left module dark
+        return ModuleMatrix(3, [0b101, 0b010, 0b101])
+
+    def test_pixels(self):
+        stream = BytesIO()
+        written = write_png(self._matrix(), stream, scale=2, border=1)
+        self.assertEqual(len(stream.getvalue()), written)
+
+        width, height, rows = read_png(stream.getvalue())
+        self.assertEqual((10, 10), (width, height))
+        for y in range(height):
+            for x in range(width):
+                row, col = y // 2 - 1, x // 2 - 1
+                in_symbol = 0 <= row < 3 and 0 <= col < 3
+                dark = in_symbol and self._matrix().is_dark(row, col)
+                # Dark modules are black (0)
+                self.assertEqual(0 if dark else 1, rows[y][x], (x, y))
+
+    def test_without_border(self):
+        width, _, rows = read_png(self._png(border=0))
+        self.assertEqual(3, width)
+        self.assertEqual([[0, 1, 0], [1, 0, 1], [0, 1, 0]], rows)
+
+    def test_scanline_padding_bits_are_zero(self):
+        # 3 + 2 * 4 = 11 pixels leave 5 unused bits in the last byte
+        for line in iter_scanlines(self._matrix()):
+            self.assertEqual(3, len(line))
+            self.assertEqual(0, line[-1] & 0b11111)
+
+    def test_scaled_version_40_size(self):
+        generator = random.Random(40)
+        matrix = ModuleMatrix(177, [generator.getrandbits(177) for _ in range(177)])
+        data = self._png(matrix, scale=12)
+        width, height, rows = read_png(data)
+        self.assertEqual(((177 + 8) * 12,) * 2, (width, height))
+        self.assertEqual(1 - int(matrix.row_string(5)[7]), rows[(4 + 5) * 12][(4 + 7) * 12])
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            self._png(scale=0)
+        with self.assertRaises(ValueError):
+            self._png(border=-1)
+
+    def test_invalid_options_write_nothing(self):
+        stream = BytesIO()
+        with self.assertRaises(ValueError):
+            write_png(self._matrix(), stream, scale=0)
+        self.assertEqual(b"", stream.getvalue())
+
+    def _png(self, matrix: ModuleMatrix | None = None, scale: int = 1, border: int = 4) -> bytes:
+        stream = BytesIO()
+        write_png(matrix or self._matrix(), stream, scale=scale, border=border)
+        return stream.getvalue()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,12 +1,24 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import os
+import tempfile
 import unittest
 
 from error_correction import ErrorCorrection
 from mode import Mode
-from qrcode import DetailedQRCode
+from encoding import CharacterCountOverflowError, get_data_bit_capacity
+from png_writer import PNG_SIGNATURE
+from qrcode import DetailedQRCode, SimpleQRCode
 
 
 # TODO: Add some more incremental test, like for specific modes
 class TestQRCode(unittest.TestCase):
+    def _fits(self, qrcode: SimpleQRCode, version: int, error_correction_level: ErrorCorrection) -> bool:
+        try:
+            return len(qrcode._make_data_stream(version)) <= get_data_bit_capacity(version, error_correction_level)
+        except CharacterCountOverflowError:
+            return False
+
     def test_generate(self):
         qrcode = DetailedQRCode(
             version=5,
@@ -27,3 +39,156 @@ class TestQRCode(unittest.TestCase):
             "1111111000100001000010100111001111111100000101110011100110111100010100000110111010100000100101110001000010111011011101001001101100100011101101011101101110101110110010011000100000101110110000010101011001101100100010010000011111111010101010101010101010101111111000000001011001011010110101010000000011010011000110100110101110101011101101010110111011001110101011101100001010011010101011100011000010001000101100000101000100110010100000011110011101000111111001010001110010000000010100000010000001001010101001111101110110011101001010011101000000110101110010100100010110111010011111011000100110010000101100101100110110010011100101000110001101001100011101011111000111111111100101101111011100010111001100111001100100101001010110110011011001101100110001000111011010110100101110100100110000100000000010000111001100000100101010110000101010000001011111010111101000001110100000001100000010011001100000010010101001001110111011111000101100011011001011010010111000100100000001001110001111010101011000010001001000110100110000100110101110001001011100101011111100100010111000011010110011111110100000000111101111010111011011000111101111111011100010110001000111101010110100000100001001111111101011110001010010111010010111101010111010011111111011011101010100101010111111111101101000101110100000010011111110011101010110110000010101101110000011010111111000011111111010001010101010001011001110101",
             str(qrcode),
         )
+
+    def test_auto_version_picks_smallest_fitting_version(self):
+        for data in ["HELLO WORLD", "A" * 26, "1" * 800, "茗荷" * 100, "a" * 2000]:
+            qrcode = SimpleQRCode(error_correction_level=ErrorCorrection.MEDIUM)
+            qrcode.add_data(data)
+            # Encoding for every version is what the bracket search avoids
+            expected_version = next(
+                version
+                for version in range(1, 41)
+                if self._fits(qrcode, version, ErrorCorrection.MEDIUM)
+            )
+            qrcode.generate()
+            self.assertEqual(expected_version, qrcode.version, data[:10])
+            self.assertEqual(ErrorCorrection.MEDIUM, qrcode.error_correction_level)
+
+    def test_auto_version_matches_explicit_version(self):
+        auto = SimpleQRCode(error_correction_level=ErrorCorrection.QUARTILE, mask_pattern=3)
+        auto.add_data("https://example.com/auto-version")
+        auto.generate()
+
+        explicit = SimpleQRCode(version=auto.version, error_correction_level=ErrorCorrection.QUARTILE, mask_pattern=3)
+        explicit.add_data("https://example.com/auto-version")
+        explicit.generate()
+
+        self.assertEqual(str(explicit), str(auto))
+
+    def test_auto_version_defaults_to_low_error_correction(self):
+        qrcode = SimpleQRCode()
+        qrcode.add_data("HELLO WORLD")
+        qrcode.generate()
+        self.assertEqual(1, qrcode.version)
+        self.assertEqual(ErrorCorrection.LOW, qrcode.error_correction_level)
+
+    def test_boost_error_correction(self):
+        # 11 alphanumeric characters take 74 bits, which still fits version 1 at QUARTILE (104) but not HIGH (72)
+        qrcode = SimpleQRCode(error_correction_level=ErrorCorrection.LOW, boost_error_correction=True)
+        qrcode.add_data("HELLO WORLD")
+        qrcode.generate()
+        self.assertEqual(1, qrcode.version)
+        self.assertEqual(ErrorCorrection.QUARTILE, qrcode.error_correction_level)
+
+    def test_auto_version_follows_changed_data(self):
+        qrcode = SimpleQRCode(boost_error_correction=True)
+        qrcode.add_data("HELLO WORLD")
+        qrcode.generate()
+        self.assertEqual(ErrorCorrection.QUARTILE, qrcode.error_correction_level)
+        # 52 alphanumeric characters take 299 bits. The boosted level from before is not kept as the new minimum
+        qrcode.add_data(" " + "A" * 40)
+        qrcode.generate()
+        self.assertEqual(3, qrcode.version)
+        self.assertEqual(ErrorCorrection.MEDIUM, qrcode.error_correction_level)
+
+    def test_settings_changed_after_construction(self):
+        qrcode = SimpleQRCode(error_correction_level=ErrorCorrection.LOW)
+        qrcode.version = 10
+        qrcode.error_correction_level = ErrorCorrection.HIGH
+        qrcode.add_data("hi")
+        qrcode.generate()
+        self.assertEqual((10, ErrorCorrection.HIGH), (qrcode.version, qrcode.error_correction_level))
+
+        qrcode.version = None
+        qrcode.generate()
+        self.assertEqual((1, ErrorCorrection.HIGH), (qrcode.version, qrcode.error_correction_level))
+
+    def test_regenerating_searches_the_mask_again(self):
+        qrcode = SimpleQRCode(error_correction_level=ErrorCorrection.LOW)
+        qrcode.add_data("HELLO WORLD")
+        qrcode.generate()
+        qrcode.add_data(" " + "A" * 40)
+        qrcode.generate()
+
+        fresh = SimpleQRCode(error_correction_level=ErrorCorrection.LOW)
+        fresh.add_data("HELLO WORLD " + "A" * 40)
+        fresh.generate()
+        self.assertEqual((fresh.version, fresh.mask_pattern), (qrcode.version, qrcode.mask_pattern))
+        self.assertEqual(str(fresh), str(qrcode))
+
+    def test_auto_version_too_much_data(self):
+        qrcode = SimpleQRCode(error_correction_level=ErrorCorrection.HIGH)
+        qrcode.add_data("a" * (get_data_bit_capacity(40, ErrorCorrection.HIGH) // 8))
+        with self.assertRaises(Exception):
+            qrcode.generate()
+
+    def test_generate_writes_no_files(self):
+        with tempfile.TemporaryDirectory() as folder:
+            previous_folder = os.getcwd()
+            os.chdir(folder)
+            try:
+                qrcode = SimpleQRCode(version=2, error_correction_level=ErrorCorrection.LOW)
+                qrcode.add_data("no files please")
+                qrcode.generate()
+            finally:
+                os.chdir(previous_folder)
+            self.assertEqual([], os.listdir(folder))
+
+    def test_debug_output_folder(self):
+        with tempfile.TemporaryDirectory() as folder:
+            qrcode = SimpleQRCode(version=2, error_correction_level=ErrorCorrection.LOW, mask_pattern=0, debug_output_folder=folder)
+            qrcode.add_data("debug")
+            qrcode.generate()
+            self.assertEqual(["partial.png"], os.listdir(folder))
+
+    def test_png_bytes(self):
+        qrcode = SimpleQRCode(version=2, error_correction_level=ErrorCorrection.LOW, mask_pattern=0)
+        qrcode.add_data("in memory")
+        qrcode.generate()
+
+        data = qrcode.to_png_bytes(scale=4, border=2)
+        self.assertTrue(data.startswith(PNG_SIGNATURE))
+
+        stream = BytesIO()
+        self.assertEqual(len(data), qrcode.write_png(stream, scale=4, border=2))
+        self.assertEqual(data, stream.getvalue())
+
+    def test_write_to_png_invalid_options_leave_no_file(self):
+        qrcode = SimpleQRCode(version=1, error_correction_level=ErrorCorrection.LOW)
+        qrcode.add_data("HELLO")
+        qrcode.generate()
+        with tempfile.TemporaryDirectory() as folder:
+            with self.assertRaises(ValueError):
+                qrcode.write_to_png("code.png", folder, scale=0)
+            self.assertEqual([], os.listdir(folder))
+
+    def test_png_bytes_before_generate(self):
+        with self.assertRaises(ValueError):
+            SimpleQRCode().to_png_bytes()
+
+    def test_mask_early_exit_with_executor(self):
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            with self.assertRaises(ValueError):
+                SimpleQRCode(mask_executor=executor, mask_early_exit=True)
+
+    def test_detailed_data_is_per_instance(self):
+        first = DetailedQRCode(version=1, error_correction_level=ErrorCorrection.LOW)
+        second = DetailedQRCode(version=1, error_correction_level=ErrorCorrection.LOW)
+        first.add_data("123", Mode.NUMERIC)
+        self.assertEqual([], second.data)
+
+    def test_detailed_takes_every_option(self):
+        qrcode = DetailedQRCode(2, ErrorCorrection.HIGH, mask_pattern=5, boost_error_correction=True)
+        self.assertEqual((2, ErrorCorrection.HIGH, 5, True), (qrcode.version, qrcode.error_correction_level, qrcode.mask_pattern, qrcode.boost_error_correction))
+
+    def test_concurrent_generation_matches_sequential(self):
+        def generate(index: int) -> str:
+            qrcode = DetailedQRCode(error_correction_level=ErrorCorrection.MEDIUM)
+            qrcode.add_data(f"THREAD {index} ", Mode.ALPHANUMERIC)
+            qrcode.add_data(str(10**index), Mode.NUMERIC)
+            qrcode.generate()
+            return str(qrcode)
+
+        expected = [generate(index) for index in range(24)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            self.assertEqual(expected, list(executor.map(generate, range(24))))
@@ -0,0 +1,37 @@
+import unittest
+
+from encoding import get_codeword_block_information
+from error_correction import ErrorCorrection
+from module_matrix import ModuleMatrix
+from qrcode import SimpleQRCode
+from qrcode_drawer import QRCodeDrawer, get_data_module_positions
+
+
+class TestQRCodeDrawer(unittest.TestCase):
+    def test_positions_cover_every_codeword(self):
+        for version, remainder_bits in [(1, 0), (2, 7), (7, 0), (14, 3), (21, 4), (40, 0)]:
+            qrcode = SimpleQRCode(version=version, error_correction_level=ErrorCorrection.LOW, mask_pattern=0)
+            qrcode.add_data("A")
+            qrcode.generate()
+
+            info = get_codeword_block_information(version, ErrorCorrection.LOW)
+            total_codewords = info.number_of_data_codewords + info.ec_codewords_per_block * (info.group_1.block_count + info.group_2.block_count)
+            positions = get_data_module_positions(qrcode.matrix.size, tuple(qrcode.matrix.reserved))
+            self.assertEqual(8 * total_codewords + remainder_bits, len(positions))
+
+    def test_push_byte_starts_bottom_right(self):
+        matrix = ModuleMatrix(21)
+        drawer = QRCodeDrawer(matrix)
+        drawer.push_byte("1101")
+        # Bottom right, then left of it, then one up on the right, then left of that
+        self.assertTrue(matrix.is_dark(20, 20))
+        self.assertTrue(matrix.is_dark(20, 19))
+        self.assertFalse(matrix.is_dark(19, 20))
+        self.assertTrue(matrix.is_dark(19, 19))
+
+        drawer.push_byte("1")
+        self.assertTrue(matrix.is_dark(18, 20))
+
+    def test_push_byte_off_the_map(self):
+        drawer = QRCodeDrawer(ModuleMatrix(21))
+        self.assertRaises(Exception, lambda: drawer.push_byte("0" * (21 * 21 + 1)))
@@ -0,0 +1,76 @@
+import random
+import unittest
+
+from polynomials import (
+    generate_error_correction_codewords,
+    generate_error_correction_polynomial,
+    generate_message_polynomial,
+)
+from reed_solomon import (
+    GeneratorPolynomialRegistry,
+    generate_error_correction_bytes,
+    generate_generator_polynomial,
+    gf_multiply,
+)
+from utils import from_power, to_power
+
+
+class TestReedSolomon(unittest.TestCase):
+    def test_gf_multiply(self):
+        self.assertEqual(0, gf_multiply(0, 87))
+        self.assertEqual(87, gf_multiply(1, 87))
+        for a, b in [(3, 7), (200, 45), (255, 255), (16, 17)]:
+            expected = from_power((to_power(a) + to_power(b)) % 255)
+            self.assertEqual(expected, gf_multiply(a, b))
+
+    def test_generate_generator_polynomial(self):
+        self.assertEqual(bytes([1, 3, 2]), generate_generator_polynomial(2))
+        for codeword_count in [7, 10, 15, 30]:
+            self.assertEqual(
+                generate_error_correction_polynomial(codeword_count).as_integers(),
+                list(generate_generator_polynomial(codeword_count)),
+            )
+
+    def test_generate_error_correction_bytes(self):
+        data = [32, 91, 11, 120, 209, 114, 220, 77, 67, 64, 236, 17, 236, 17, 236, 17]
+        self.assertEqual(
+            bytes([196, 35, 39, 119, 235, 215, 231, 226, 93, 23]),
+            generate_error_correction_bytes(data, 10),
+        )
+
+    def test_matches_gfpolynomial_reference(self):
+        rng = random.Random(18004)
+        for codeword_count in [7, 13, 18, 22, 26, 30]:
+            for _ in range(5):
+                data = [rng.randrange(256) for _ in range(rng.randint(9, 40))]
+                # Avoid a leading zero, which the reference implementation drops
+                data[0] = data[0] or 1
+                expected = generate_error_correction_codewords(
+                    generate_message_polynomial([bin(v)[2:].zfill(8) for v in data]),
+                    codeword_count,
+                ).as_integers()
+                actual = list(generate_error_correction_bytes(data, codeword_count))
+                # The reference implementation also drops leading zero coefficients of the remainder
+                self.assertEqual(expected, actual[len(actual) - len(expected) :])
+                self.assertTrue(all(v == 0 for v in actual[: len(actual) - len(expected)]))
+
+
+class TestGeneratorPolynomialRegistry(unittest.TestCase):
+    def test_get_builds_once(self):
+        registry = GeneratorPolynomialRegistry()
+        self.assertNotIn(10, registry)
+        polynomial = registry.get(10)
+        self.assertIn(10, registry)
+        self.assertIs(polynomial, registry.get(10))
+        self.assertEqual(generate_generator_polynomial(10), polynomial.coefficients)
+
+    def test_preload(self):
+        registry = GeneratorPolynomialRegistry(preload=True)
+        self.assertEqual(13, len(registry))
+        for codeword_count in [7, 10, 13, 15, 16, 17, 18, 20, 22, 24, 26, 28, 30]:
+            self.assertIn(codeword_count, registry)
+
+    def test_feedback_table(self):
+        polynomial = GeneratorPolynomialRegistry().get(7)
+        self.assertEqual(0, polynomial.feedback_table[0])
+        self.assertEqual(int.from_bytes(polynomial.coefficients[1:], "big"), polynomial.feedback_table[1])
@@ -0,0 +1,136 @@
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+import unittest
+from unittest import mock
+
+import batch
+from error_correction import ErrorCorrection
+from mode import Mode
+from qrcode import DetailedQRCode, SimpleQRCode
+from symbol_cache import CachedSymbol, SymbolCache, make_symbol_key
+
+
+def make_code(cache: SymbolCache | None, payload: str = "https://example.com/sku/12345", mask_pattern: int | None = None) -> SimpleQRCode:
+    qrcode = SimpleQRCode(error_correction_level=ErrorCorrection.MEDIUM, mask_pattern=mask_pattern, symbol_cache=cache)
+    qrcode.add_data(payload)
+    qrcode.generate()
+    return qrcode
+
+
+class TestSymbolCache(unittest.TestCase):
+    def test_hit_matches_generated_code(self):
+        cache = SymbolCache()
+        first = make_code(cache)
+        second = make_code(cache)
+        self.assertEqual((1, 1), (cache.misses, cache.hits))
+        self.assertEqual(first.matrix, second.matrix)
+        self.assertEqual((first.version, first.error_correction_level, first.mask_pattern), (second.version, second.error_correction_level, second.mask_pattern))
+        self.assertEqual(first.matrix, make_code(None).matrix)
+
+    def test_hit_skips_generation(self):
+        cache = SymbolCache()
+        make_code(cache)
+        with mock.patch.object(SimpleQRCode, "_generate") as generate:
+            make_code(cache)
+        generate.assert_not_called()
+
+    def test_key_is_the_same_after_generating(self):
+        cache = SymbolCache()
+        qrcode = make_code(cache)
+        qrcode.generate()
+        self.assertEqual((1, 1, 1), (cache.misses, cache.hits, len(cache)))
+        self.assertEqual(make_code(None).symbol_key(), qrcode.symbol_key())
+
+    def test_keys(self):
+        key = make_symbol_key("SimpleQRCode", "data", None, ErrorCorrection.LOW, False, None)
+        self.assertEqual(32, len(key))
+        self.assertEqual(key, make_symbol_key("SimpleQRCode", "data", None, ErrorCorrection.LOW, False, None))
+        for other in [
+            make_symbol_key("SimpleQRCode", "data!", None, ErrorCorrection.LOW, False, None),
+            make_symbol_key("SimpleQRCode", "data", 2, ErrorCorrection.LOW, False, None),
+            make_symbol_key("SimpleQRCode", "data", None, ErrorCorrection.HIGH, False, None),
+            make_symbol_key("SimpleQRCode", "data", None, ErrorCorrection.LOW, True, None),
+            make_symbol_key("SimpleQRCode", "data", None, ErrorCorrection.LOW, False, 3),
+            make_symbol_key("DetailedQRCode", [["BINARY", "data"]], None, ErrorCorrection.LOW, False, None),
+        ]:
+            self.assertNotEqual(key, other)
+
+    def test_detailed_segments_are_part_of_the_key(self):
+        cache = SymbolCache()
+        numeric = DetailedQRCode(version=1, error_correction_level=ErrorCorrection.LOW, symbol_cache=cache)
+        numeric.add_data("123", Mode.NUMERIC)
+        binary = DetailedQRCode(version=1, error_correction_level=ErrorCorrection.LOW, symbol_cache=cache)
+        binary.add_data("123", Mode.BINARY)
+        self.assertNotEqual(numeric.symbol_key(), binary.symbol_key())
+
+    def test_renders(self):
+        cache = SymbolCache()
+        first = make_code(cache).to_png_bytes(scale=3)
+        stream = BytesIO()
+        second = make_code(cache)
+        self.assertEqual(len(first), second.write_png(stream, scale=3))
+        self.assertEqual(first, stream.getvalue())
+        self.assertEqual((1, 1), (cache.render_misses, cache.render_hits))
+        # Other render options are separate entries
+        self.assertNotEqual(first, second.to_png_bytes(scale=4))
+        self.assertEqual(2, cache.render_misses)
+
+    def test_renders_not_cached(self):
+        cache = SymbolCache(cache_renders=False)
+        make_code(cache).to_png_bytes()
+        make_code(cache).to_png_bytes()
+        self.assertEqual((0, 0), (cache.render_hits, cache.render_misses))
+        self.assertEqual(1, cache.hits)
+
+    def test_eviction(self):
+        symbol_bytes = CachedSymbol(1, ErrorCorrection.LOW, 0, 21, bytes(63)).estimate_bytes()
+        cache = SymbolCache(max_bytes=3 * symbol_bytes)
+        for index in range(5):
+            cache.put(bytes([index]), CachedSymbol(1, ErrorCorrection.LOW, 0, 21, bytes(63)))
+        self.assertEqual(3, len(cache))
+        self.assertEqual(2, cache.evictions)
+        self.assertNotIn(bytes([0]), cache)
+        self.assertLessEqual(cache.total_bytes, cache.max_bytes)
+
+        # Reading a symbol makes it the most recently used
+        cache.get(bytes([2]))
+        cache.put(bytes([5]), CachedSymbol(1, ErrorCorrection.LOW, 0, 21, bytes(63)))
+        self.assertIn(bytes([2]), cache)
+        self.assertNotIn(bytes([3]), cache)
+
+    def test_packed_rows_round_trip(self):
+        qrcode = make_code(None)
+        assert qrcode.version is not None and qrcode.error_correction_level is not None and qrcode.mask_pattern is not None
+        symbol = CachedSymbol.from_matrix(qrcode.matrix, qrcode.version, qrcode.error_correction_level, qrcode.mask_pattern)
+        self.assertEqual(qrcode.matrix.rows, symbol.unpack_rows())
+        self.assertEqual(qrcode.matrix.size * ((qrcode.matrix.size + 7) // 8), len(symbol.rows))
+
+    def test_concurrent_access(self):
+        cache = SymbolCache()
+        payloads = [f"payload {index % 5}" for index in range(40)]
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            codes = list(executor.map(lambda payload: str(make_code(cache, payload)), payloads))
+        self.assertEqual([str(make_code(None, payload)) for payload in payloads], codes)
+        self.assertEqual(40, cache.hits + cache.misses)
+        self.assertEqual(5, len(cache))
+
+    def test_batch_generates_repeated_payloads_once(self):
+        payloads = ["a", "b", "a", "a"]
+        with mock.patch.object(SimpleQRCode, "_generate", autospec=True, side_effect=SimpleQRCode._generate) as generate:
+            # Repeats land in different chunks
+            codes = list(batch.generate_many(payloads, 1, ErrorCorrection.LOW, mask_pattern=0, chunk_size=2))
+        self.assertEqual(2, generate.call_count)
+        self.assertEqual([str(code) for code in codes], [str(batch.generate_one(payload, 1, ErrorCorrection.LOW, 0)) for payload in payloads])
+        # Every payload gets its own code, even when it was restored from the cache
+        self.assertEqual(len(payloads), len({id(code) for code in codes}))
+        self.assertIsNot(codes[0].matrix.rows, codes[2].matrix.rows)
+
+    def test_batch_renders_repeated_payloads_once(self):
+        cache = SymbolCache()
+        pngs = list(batch.render_many(["a", "b", "a"], SimpleQRCode.to_png_bytes, 1, ErrorCorrection.LOW, chunk_size=1, symbol_cache=cache))
+        self.assertEqual(pngs[0], pngs[2])
+        self.assertEqual((2, 1), (cache.render_misses, cache.render_hits))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+
+from module_matrix import ModuleMatrix
+from template_cache import FunctionPatternTemplateCache, estimate_matrix_bytes
+
+
+class TestFunctionPatternTemplateCache(unittest.TestCase):
+    def test_builds_once(self):
+        cache = FunctionPatternTemplateCache()
+        builds: list[int] = []
+
+        def build() -> ModuleMatrix:
+            builds.append(1)
+            return ModuleMatrix(21)
+
+        first = cache.get(1, build)
+        self.assertIs(first, cache.get(1, build))
+        self.assertEqual(1, len(builds))
+        self.assertEqual((1, 1), (cache.hits, cache.misses))
+
+    def test_evicts_least_recently_used(self):
+        template_bytes = estimate_matrix_bytes(ModuleMatrix(21))
+        cache = FunctionPatternTemplateCache(max_bytes=2 * template_bytes)
+        _ = cache.get(1, lambda: ModuleMatrix(21))
+        _ = cache.get(2, lambda: ModuleMatrix(21))
+        _ = cache.get(1, lambda: ModuleMatrix(21))
+        _ = cache.get(3, lambda: ModuleMatrix(21))
+
+        self.assertIn(1, cache)
+        self.assertNotIn(2, cache)
+        self.assertIn(3, cache)
+        self.assertLessEqual(cache.total_bytes, cache.max_bytes)
+
+    def test_keeps_newest_template_over_limit(self):
+        cache = FunctionPatternTemplateCache(max_bytes=1)
+        _ = cache.get(1, lambda: ModuleMatrix(21))
+        _ = cache.get(2, lambda: ModuleMatrix(25))
+        self.assertEqual(1, len(cache))
+        self.assertIn(2, cache)
@@ -0,0 +1,59 @@
+import unittest
+
+from error_correction import ErrorCorrection
+from module_matrix import ModuleMatrix
+from qrcode import SimpleQRCode
+from text_renderer import TextStyle, iter_ascii_lines, iter_bitstring_lines, iter_half_block_lines, iter_text_lines
+
+
+class TestTextRenderer(unittest.TestCase):
+    def _matrix(self) -> ModuleMatrix:
+        return ModuleMatrix(3, [0b110, 0b011, 0b101])
+
+    def test_half_block(self):
+        self.assertEqual(["▀█▄", "▀ ▀"], list(iter_half_block_lines(self._matrix(), border=0)))
+
+    def test_half_block_with_border(self):
+        lines = list(iter_half_block_lines(self._matrix(), border=1))
+        # 5 rows take 3 lines, the last one padded with a light row
+        self.assertEqual([" ▄▄  ", " ▄▀█ ", "     "], lines)
+
+    def test_half_block_inverted(self):
+        self.assertEqual(["▄ ▀", "▄█▄"], list(iter_half_block_lines(self._matrix(), border=0, invert=True)))
+
+    def test_ascii(self):
+        self.assertEqual(["##.", ".##", "#.#"], list(iter_ascii_lines(self._matrix(), border=0, dark="#", light=".")))
+        lines = list(iter_ascii_lines(self._matrix(), border=2))
+        self.assertEqual(7, len(lines))
+        self.assertTrue(all(len(line) == 14 for line in lines))
+
+    def test_bitstring_matches_str(self):
+        qrcode = SimpleQRCode(version=1, error_correction_level=ErrorCorrection.LOW, mask_pattern=0)
+        qrcode.add_data("TEXT")
+        qrcode.generate()
+        lines = list(qrcode.iter_text_lines(TextStyle.BITSTRING))
+        self.assertEqual(21, len(lines))
+        self.assertEqual(str(qrcode), "".join(lines))
+        self.assertEqual(list(iter_bitstring_lines(qrcode.matrix)), lines)
+
+    def test_half_block_matches_modules(self):
+        qrcode = SimpleQRCode(version=2, error_correction_level=ErrorCorrection.MEDIUM, mask_pattern=1)
+        qrcode.add_data("HALF BLOCKS")
+        qrcode.generate()
+        lines = qrcode.to_text(border=0).split("\n")
+        self.assertEqual(13, len(lines))
+        for row in range(qrcode.matrix.size):
+            for col in range(qrcode.matrix.size):
+                character = lines[row // 2][col]
+                if row % 2 == 0:
+                    self.assertEqual(qrcode.matrix.is_dark(row, col), character in "▀█")
+                else:
+                    self.assertEqual(qrcode.matrix.is_dark(row, col), character in "▄█")
+
+    def test_invalid_border(self):
+        with self.assertRaises(ValueError):
+            list(iter_text_lines(self._matrix(), TextStyle.ASCII, border=-1))
+
+
+if __name__ == "__main__":
+    unittest.main()
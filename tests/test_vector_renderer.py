@@ -0,0 +1,83 @@
+from io import BytesIO
+import random
+import re
+import unittest
+from xml.etree import ElementTree
+
+from error_correction import ErrorCorrection
+from module_matrix import ModuleMatrix
+from qrcode import SimpleQRCode
+from vector_renderer import iter_dark_rectangles, write_pdf, write_svg
+
+
+def random_matrix(size: int, seed: int) -> ModuleMatrix:
+    generator = random.Random(seed)
+    return ModuleMatrix(size, [generator.getrandbits(size) for _ in range(size)])
+
+
+class TestVectorRenderer(unittest.TestCase):
+    def test_rectangles_cover_dark_modules_exactly_once(self):
+        for size, seed in [(1, 0), (5, 1), (21, 2), (57, 3)]:
+            matrix = random_matrix(size, seed)
+            coverage = [[0] * size for _ in range(size)]
+            for col, row, width, height in iter_dark_rectangles(matrix):
+                for r in range(row, row + height):
+                    for c in range(col, col + width):
+                        coverage[r][c] += 1
+            self.assertEqual(matrix.to_lists(), coverage)
+
+    def test_repeated_runs_are_merged(self):
+        # A 3 module wide bar through every row is a single rectangle
+        matrix = ModuleMatrix(5, [0b01110] * 5)
+        self.assertEqual([(1, 0, 3, 5)], list(iter_dark_rectangles(matrix)))
+
+    def test_svg(self):
+        matrix = ModuleMatrix(2, [0b10, 0b11])
+        stream = BytesIO()
+        written = write_svg(matrix, stream, scale=3, border=1)
+        data = stream.getvalue()
+        self.assertEqual(len(data), written)
+
+        svg = ElementTree.fromstring(data)
+        self.assertEqual("0 0 4 4", svg.get("viewBox"))
+        self.assertEqual("12", svg.get("width"))
+        path = svg.find("{http://www.w3.org/2000/svg}path")
+        assert path is not None
+        self.assertEqual("M1 1h1v1h-1zM1 2h2v1h-2z", path.get("d"))
+
+    def test_svg_is_smaller_than_one_rect_per_module(self):
+        qrcode = SimpleQRCode(version=40, error_correction_level=ErrorCorrection.LOW, mask_pattern=0)
+        qrcode.add_data("vector" * 100)
+        qrcode.generate()
+        svg = qrcode.to_svg()
+        naive_size = qrcode.matrix.dark_count() * len('<rect x="100" y="100" width="1" height="1"/>')
+        self.assertLess(len(svg), naive_size / 3)
+
+    def test_pdf_cross_reference_offsets(self):
+        stream = BytesIO()
+        written = write_pdf(random_matrix(21, 4), stream, scale=2)
+        data = stream.getvalue()
+        self.assertEqual(len(data), written)
+        self.assertTrue(data.startswith(b"%PDF-1.4\n"))
+        self.assertTrue(data.endswith(b"%%EOF\n"))
+
+        xref_start = int(re.search(rb"startxref\n(\d+)\n", data).group(1))
+        self.assertTrue(data[xref_start:].startswith(b"xref\n"))
+        offsets = [int(offset) for offset in re.findall(rb"(\d{10}) 00000 n ", data)]
+        self.assertEqual(5, len(offsets))
+        for number, offset in enumerate(offsets, start=1):
+            self.assertTrue(data[offset:].startswith(f"{number} 0 obj\n".encode()))
+
+        content_start = data.index(b"stream\n") + len(b"stream\n")
+        content_length = int(re.search(rb"5 0 obj\n(\d+)\n", data).group(1))
+        self.assertEqual(b"\nendstream", data[content_start + content_length : content_start + content_length + 10])
+
+    def test_invalid_options(self):
+        with self.assertRaises(ValueError):
+            write_svg(random_matrix(3, 5), BytesIO(), scale=0)
+        with self.assertRaises(ValueError):
+            write_pdf(random_matrix(3, 5), BytesIO(), border=-1)
+
+
+if __name__ == "__main__":
+    unittest.main()
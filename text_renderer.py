@@ -0,0 +1,71 @@
+from collections.abc import Iterator
+from enum import StrEnum
+
+from module_matrix import ModuleMatrix
+
+
+class TextStyle(StrEnum):
+    HALF_BLOCK = "half-block"
+    ASCII = "ascii"
+    BITSTRING = "bitstring"
+
+
+# Upper and lower module of a half-block character, keyed by their "0"/"1" bits. Dark modules are drawn
+# with ink, which reads as a QR code on terminals with a light background. Use invert for dark backgrounds
+HALF_BLOCKS: dict[tuple[str, str], str] = {
+    ("0", "0"): " ",
+    ("1", "0"): "▀",
+    ("0", "1"): "▄",
+    ("1", "1"): "█",
+}
+
+
+def _check_border(border: int) -> None:
+    if border < 0:
+        raise ValueError(f"Cannot add a border of {border} modules. Expected a non-negative border")
+
+
+def _bordered_row_strings(matrix: ModuleMatrix, border: int, invert: bool) -> Iterator[str]:
+    light = ("1" if invert else "0") * (matrix.size + 2 * border)
+    side = ("1" if invert else "0") * border
+    flip = str.maketrans("01", "10")
+    for _ in range(border):
+        yield light
+    for row in range(matrix.size):
+        row_string = matrix.row_string(row)
+        yield side + (row_string.translate(flip) if invert else row_string) + side
+    for _ in range(border):
+        yield light
+
+
+def iter_half_block_lines(matrix: ModuleMatrix, border: int = 4, invert: bool = False) -> Iterator[str]:
+    # Two module rows per line, so the code keeps its aspect ratio with most terminal fonts
+    _check_border(border)
+    rows = _bordered_row_strings(matrix, border, invert)
+    for upper in rows:
+        lower = next(rows, ("1" if invert else "0") * len(upper))
+        yield "".join(map(HALF_BLOCKS.__getitem__, zip(upper, lower)))
+
+
+def iter_ascii_lines(matrix: ModuleMatrix, border: int = 4, dark: str = "##", light: str = "  ") -> Iterator[str]:
+    # Two characters per module by default, since characters are about twice as tall as they are wide
+    _check_border(border)
+    table = str.maketrans({"1": dark, "0": light})
+    for row_string in _bordered_row_strings(matrix, border, invert=False):
+        yield row_string.translate(table)
+
+
+def iter_bitstring_lines(matrix: ModuleMatrix) -> Iterator[str]:
+    # One "0"/"1" line per row, the same bits str(matrix) joins together
+    for row in range(matrix.size):
+        yield matrix.row_string(row)
+
+
+def iter_text_lines(matrix: ModuleMatrix, style: TextStyle = TextStyle.HALF_BLOCK, border: int = 4) -> Iterator[str]:
+    if style == TextStyle.HALF_BLOCK:
+        return iter_half_block_lines(matrix, border)
+    elif style == TextStyle.ASCII:
+        return iter_ascii_lines(matrix, border)
+    elif style == TextStyle.BITSTRING:
+        return iter_bitstring_lines(matrix)
+    raise ValueError(f"Cannot render text with style {style}")
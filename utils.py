@@ -1,3 +1,4 @@
+from collections.abc import Sequence
 from color import BLACK, WHITE
 from functools import cache
 from typing import TypeVar
@@ -13,7 +14,7 @@ def split_into_segments(data: list[T], segment_size: int) -> list[list[T]]:
     return values
 
 
-def interleave(g1: list[list[T]], g2: list[list[T]]) -> list[T]:
+def interleave(g1: Sequence[Sequence[T]], g2: Sequence[Sequence[T]]) -> list[T]:
     interleaved_values: list[T] = []
     for values in zip_longest(*g1, *g2):
         for value in values:
@@ -0,0 +1,102 @@
+from collections.abc import Iterator
+import re
+from typing import BinaryIO
+
+from module_matrix import ModuleMatrix
+from png_writer import check_options
+
+# Rectangles are (col, row, width, height) in modules, relative to the top left of the symbol
+Rectangle = tuple[int, int, int, int]
+
+_dark_run = re.compile(r"1+")
+
+
+def iter_dark_rectangles(matrix: ModuleMatrix) -> Iterator[Rectangle]:
+    # Every horizontal run of dark modules is one rectangle, and runs that repeat in the rows below
+    # (same start and width) grow that rectangle downwards instead of starting a new one.
+    # Rectangles are yielded as soon as they are closed, so only one row of them is held at a time
+    open_rectangles: dict[tuple[int, int], int] = {}
+    for row in range(matrix.size):
+        runs = [(run.start(), run.end() - run.start()) for run in _dark_run.finditer(matrix.row_string(row))]
+        continued: dict[tuple[int, int], int] = {}
+        for run in runs:
+            continued[run] = open_rectangles.pop(run, row)
+        for (col, width), top in open_rectangles.items():
+            yield (col, top, width, row - top)
+        open_rectangles = continued
+    for (col, width), top in open_rectangles.items():
+        yield (col, top, width, matrix.size - top)
+
+
+def iter_svg(matrix: ModuleMatrix, scale: int = 1, border: int = 4) -> Iterator[str]:
+    # The view box is in modules and scale only sets the rendered size, so the path data does not depend on it
+    check_options(scale, border)
+    image_size = matrix.size + 2 * border
+    yield (
+        f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {image_size} {image_size}" '
+        f'width="{image_size * scale}" height="{image_size * scale}" shape-rendering="crispEdges">'
+        f'<rect width="{image_size}" height="{image_size}" fill="#fff"/><path fill="#000" d="'
+    )
+    for col, row, width, height in iter_dark_rectangles(matrix):
+        yield f"M{col + border} {row + border}h{width}v{height}h-{width}z"
+    yield '"/></svg>\n'
+
+
+def write_svg(matrix: ModuleMatrix, stream: BinaryIO, scale: int = 1, border: int = 4) -> int:
+    # Returns the number of bytes written
+    written = 0
+    for part in iter_svg(matrix, scale, border):
+        data = part.encode("ascii")
+        stream.write(data)
+        written += len(data)
+    return written
+
+
+# https://opensource.adobe.com/dc-acrobat-sdk-docs/pdfstandards/PDF32000_2008.pdf#page=48
+def write_pdf(matrix: ModuleMatrix, stream: BinaryIO, scale: int = 1, border: int = 4) -> int:
+    # A single page PDF where scale is the size of a module in points. Returns the number of bytes written.
+    # The content stream length is written as its own object after the stream, so nothing has to be buffered
+    check_options(scale, border)
+    page_size = (matrix.size + 2 * border) * scale
+    offsets: list[int] = []
+    written = 0
+
+    def write(data: str) -> None:
+        nonlocal written
+        encoded = data.encode("ascii")
+        stream.write(encoded)
+        written += len(encoded)
+
+    def start_object() -> None:
+        offsets.append(written)
+        write(f"{len(offsets)} 0 obj\n")
+
+    write("%PDF-1.4\n")
+    start_object()
+    write("<< /Type /Catalog /Pages 2 0 R >>\nendobj\n")
+    start_object()
+    write("<< /Type /Pages /Kids [3 0 R] /Count 1 >>\nendobj\n")
+    start_object()
+    write(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {page_size} {page_size}] /Contents 4 0 R /Resources << >> >>\nendobj\n")
+
+    start_object()
+    write("<< /Length 5 0 R >>\nstream\n")
+    content_start = written
+    # Scale to modules and flip the y axis, so rectangles can be drawn from the top left like everywhere else
+    write(f"{scale} 0 0 -{scale} 0 {page_size} cm\n0 g\n")
+    for col, row, width, height in iter_dark_rectangles(matrix):
+        write(f"{col + border} {row + border} {width} {height} re\n")
+    write("f\n")
+    # The last newline is the end of line marker before endstream and not part of the content
+    content_length = written - content_start - 1
+    write("endstream\nendobj\n")
+
+    start_object()
+    write(f"{content_length}\nendobj\n")
+
+    xref_start = written
+    write(f"xref\n0 {len(offsets) + 1}\n0000000000 65535 f \n")
+    for offset in offsets:
+        write(f"{offset:010d} 00000 n \n")
+    write(f"trailer\n<< /Size {len(offsets) + 1} /Root 1 0 R >>\nstartxref\n{xref_start}\n%%EOF\n")
+    return written